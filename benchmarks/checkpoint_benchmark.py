@@ -0,0 +1,72 @@
+"""Benchmarks delta-encoded checkpoints against naive `np.save` snapshots of a self-play pool."""
+
+import argparse
+import os
+import tempfile
+import time
+
+import jax
+import jax.numpy as jnp
+import numpy as np
+
+import gojax
+from gojax import checkpoint
+
+
+def _simulate_snapshots(board_size, batch_size, num_snapshots, seed):
+    states = gojax.new_states(board_size, batch_size)
+    logits = jnp.zeros((batch_size, board_size ** 2 + 1))
+    step_fn = jax.jit(gojax.sample_next_states_v2)
+    rng_key = jax.random.PRNGKey(seed)
+    snapshots = []
+    for step in range(num_snapshots):
+        states = step_fn(step, states, logits, rng_key)
+        snapshots.append(np.asarray(states))
+    return snapshots
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--board_size', type=int, default=19)
+    parser.add_argument('--batch_size', type=int, default=256)
+    parser.add_argument('--num_snapshots', type=int, default=50)
+    parser.add_argument('--base_interval', type=int, default=25)
+    parser.add_argument('--codec', default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    snapshots = _simulate_snapshots(args.board_size, args.batch_size, args.num_snapshots,
+                                    args.seed)
+    with tempfile.TemporaryDirectory() as naive_dir, tempfile.TemporaryDirectory() as delta_dir:
+        start = time.perf_counter()
+        for i, snapshot in enumerate(snapshots):
+            np.save(os.path.join(naive_dir, f'{i}.npy'), snapshot)
+        naive_write_time = time.perf_counter() - start
+        naive_bytes = sum(
+            os.path.getsize(os.path.join(naive_dir, name)) for name in os.listdir(naive_dir))
+
+        writer = checkpoint.DeltaCheckpointWriter(delta_dir, args.base_interval, args.codec)
+        start = time.perf_counter()
+        for snapshot in snapshots:
+            writer.write(snapshot)
+        delta_write_time = time.perf_counter() - start
+
+        last_index = args.num_snapshots - 1
+        start = time.perf_counter()
+        naive_restored = np.load(os.path.join(naive_dir, f'{last_index}.npy'))
+        naive_restore_time = time.perf_counter() - start
+        start = time.perf_counter()
+        delta_restored = checkpoint.restore_checkpoint(delta_dir, last_index)
+        delta_restore_time = time.perf_counter() - start
+        np.testing.assert_array_equal(naive_restored, delta_restored)
+
+    print(f'codec: {writer.codec}')
+    print(f'np.save: {naive_bytes} bytes, {naive_write_time:.4f}s write, '
+          f'{naive_restore_time * 1e3:.2f}ms restore')
+    print(f'delta:   {writer.num_bytes_written} bytes, {delta_write_time:.4f}s write, '
+          f'{delta_restore_time * 1e3:.2f}ms restore (worst case)')
+    print(f'compression: {naive_bytes / writer.num_bytes_written:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
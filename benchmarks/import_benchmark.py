@@ -0,0 +1,47 @@
+"""Benchmarks the import time of `gojax` in fresh interpreters."""
+
+import argparse
+import statistics
+import subprocess
+import sys
+
+_SNIPPETS = {
+    'import gojax': 'import gojax',
+    'import gojax.constants': 'import gojax.constants',
+    'from gojax import serialize': 'from gojax import serialize',
+    'import gojax + go.new_states': 'import gojax; gojax.new_states(9)',
+}
+
+_TEMPLATE = """
+import sys
+import time
+start = time.perf_counter()
+{snippet}
+elapsed = time.perf_counter() - start
+backend_initialized = False
+if 'jax' in sys.modules:
+    from jax._src import xla_bridge
+    backend_initialized = bool(xla_bridge._backends)
+print(elapsed, 'jax' in sys.modules, backend_initialized)
+"""
+
+
+def _time_snippet(snippet):
+    output = subprocess.run([sys.executable, '-c', _TEMPLATE.format(snippet=snippet)],
+                            check=True, capture_output=True, text=True).stdout.split()
+    return float(output[0]), output[1] == 'True', output[2] == 'True'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+    for name, snippet in _SNIPPETS.items():
+        results = [_time_snippet(snippet) for _ in range(args.repeats)]
+        median_time = statistics.median(result[0] for result in results)
+        print(f'{name:<32} {median_time * 1e3:8.1f}ms  jax imported: {results[0][1]!s:<5}  '
+              f'backend initialized: {results[0][2]}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+"""Benchmarks the compile time and throughput of the jitted ladder detection."""
+
+import argparse
+import time
+
+import jax
+import jax.numpy as jnp
+
+import gojax
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--board_size', type=int, default=19)
+    parser.add_argument('--batch_size', type=int, default=4)
+    parser.add_argument('--num_moves', type=int, default=60)
+    parser.add_argument('--num_repeats', type=int, default=10)
+    args = parser.parse_args()
+
+    states = gojax.sample_random_state_v2(args.board_size, args.batch_size, args.num_moves,
+                                          jnp.zeros((args.batch_size, args.board_size ** 2 + 1)),
+                                          jax.random.PRNGKey(0))
+
+    start = time.perf_counter()
+    jax.block_until_ready(gojax.compute_ladders(states))
+    print(f'compile and first call: {time.perf_counter() - start:.2f}s')
+
+    start = time.perf_counter()
+    for _ in range(args.num_repeats):
+        ladders = gojax.compute_ladders(states)
+    jax.block_until_ready(ladders)
+    elapsed = time.perf_counter() - start
+    print(f'compute_ladders: {elapsed / args.num_repeats * 1e3:.1f}ms per call, '
+          f'{args.num_repeats * args.batch_size / elapsed:.1f} games/s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""Benchmarks `paint_fill` with and without batch compaction on a batch with one slow board."""
+
+import argparse
+import time
+
+import jax
+import numpy as np
+
+import gojax
+
+
+def _new_fill_problems(board_size, batch_size, seed):
+    """Random areas with one seed each, except for the first board which is a long snake."""
+    rng = np.random.default_rng(seed)
+    areas = rng.random((batch_size, 1, board_size, board_size)) < 0.55
+    seeds = np.zeros_like(areas)
+    for i in range(batch_size):
+        points = np.argwhere(areas[i, 0])
+        if len(points):
+            row, col = points[rng.integers(len(points))]
+            seeds[i, 0, row, col] = True
+    snake = np.zeros((board_size, board_size), dtype=bool)
+    snake[::2] = True
+    snake[1::4, -1] = True
+    snake[3::4, 0] = True
+    areas[0, 0] = snake
+    seeds[0] = False
+    seeds[0, 0, 0, 0] = True
+    return seeds, areas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--board_size', type=int, default=19)
+    parser.add_argument('--batch_size', type=int, default=256)
+    parser.add_argument('--num_repeats', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    seeds, areas = jax.device_put(_new_fill_problems(args.board_size, args.batch_size, args.seed))
+    results = {}
+    for compact in (False, True):
+        fill_fn = jax.jit(lambda seeds_, areas_, compact_=compact: gojax.paint_fill(
+            seeds_, areas_, return_iterations=True, compact=compact_))
+        results[compact] = jax.block_until_ready(fill_fn(seeds, areas))
+        start = time.perf_counter()
+        for _ in range(args.num_repeats):
+            jax.block_until_ready(fill_fn(seeds, areas))
+        elapsed = (time.perf_counter() - start) / args.num_repeats
+        print(f'compact={compact}: {elapsed * 1e3:.2f}ms per call')
+    np.testing.assert_array_equal(results[False][0], results[True][0])
+    iterations = np.asarray(results[False][1])
+    print(f'iterations: max {iterations.max()}, median {np.median(iterations):g}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""Benchmarks the insert, sample and priority update throughput of the on-device replay buffer."""
+
+import argparse
+import time
+
+import jax
+import jax.numpy as jnp
+
+import gojax
+from gojax import replay_buffer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--board_size', type=int, default=19)
+    parser.add_argument('--capacity', type=int, default=1 << 21)
+    parser.add_argument('--batch_size', type=int, default=4096)
+    parser.add_argument('--num_repeats', type=int, default=50)
+    args = parser.parse_args()
+
+    action_size = args.board_size ** 2 + 1
+    rng_key = jax.random.PRNGKey(0)
+    states = gojax.sample_random_state_v2(args.board_size, args.batch_size, 20,
+                                          jnp.zeros((args.batch_size, action_size)), rng_key)
+    actions_1d = jnp.zeros(args.batch_size, dtype='int32')
+    policies = jnp.full((args.batch_size, action_size), 1 / action_size)
+    outcomes = jnp.zeros(args.batch_size)
+
+    buffer = replay_buffer.new_replay_buffer(args.capacity, args.board_size)
+    # Fill the buffer once so sampling sees a full tree.
+    start = time.perf_counter()
+    for _ in range(-(-args.capacity // args.batch_size)):
+        buffer = replay_buffer.add(buffer, states, actions_1d, policies, outcomes)
+    jax.block_until_ready(buffer)
+    elapsed = time.perf_counter() - start
+    print(f'filled {args.capacity} positions: {args.capacity / elapsed / 1e6:.2f}M inserts/s')
+
+    start = time.perf_counter()
+    for _ in range(args.num_repeats):
+        buffer = replay_buffer.add(buffer, states, actions_1d, policies, outcomes)
+    jax.block_until_ready(buffer)
+    elapsed = time.perf_counter() - start
+    print(f'add: {args.num_repeats * args.batch_size / elapsed / 1e6:.2f}M positions/s')
+
+    samples = replay_buffer.sample(buffer, rng_key, args.batch_size)
+    jax.block_until_ready(samples)
+    start = time.perf_counter()
+    for i in range(args.num_repeats):
+        samples = replay_buffer.sample(buffer, jax.random.fold_in(rng_key, i), args.batch_size)
+    jax.block_until_ready(samples)
+    elapsed = time.perf_counter() - start
+    print(f'sample: {args.num_repeats * args.batch_size / elapsed / 1e6:.2f}M positions/s')
+
+    buffer = replay_buffer.update_priorities(buffer, samples.indices, samples.probabilities)
+    jax.block_until_ready(buffer)
+    start = time.perf_counter()
+    for _ in range(args.num_repeats):
+        buffer = replay_buffer.update_priorities(buffer, samples.indices,
+                                                 jnp.abs(samples.outcomes) + 1)
+    jax.block_until_ready(buffer)
+    elapsed = time.perf_counter() - start
+    print(f'update_priorities: {args.num_repeats * args.batch_size / elapsed / 1e6:.2f}M '
+          f'positions/s')
+
+
+if __name__ == '__main__':
+    main()
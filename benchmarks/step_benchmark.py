@@ -0,0 +1,49 @@
+"""Benchmarks `next_states` against the indicator action API `next_states_legacy`."""
+
+import argparse
+import time
+
+import jax
+import jax.numpy as jnp
+
+import gojax
+
+
+def _time(step_fn, states, actions, num_steps):
+    jax.block_until_ready(step_fn(states, actions[0]))
+    start = time.perf_counter()
+    for i in range(num_steps):
+        states = step_fn(states, actions[i])
+    jax.block_until_ready(states)
+    return (time.perf_counter() - start) / num_steps
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--board_size', type=int, default=19)
+    parser.add_argument('--batch_size', type=int, default=256)
+    parser.add_argument('--num_steps', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    states = gojax.new_states(args.board_size, args.batch_size)
+    actions_1d = jax.random.randint(jax.random.PRNGKey(args.seed),
+                                    (args.num_steps, args.batch_size), 0,
+                                    args.board_size ** 2 + 1)
+    indicator_actions = jax.vmap(gojax.action_1d_to_indicator, (0, None, None))(
+        actions_1d, args.board_size, args.board_size)
+
+    step_1d = jax.jit(gojax.next_states)
+    step_indicator = jax.jit(gojax.next_states_legacy)
+    time_1d = _time(step_1d, states, actions_1d, args.num_steps)
+    time_indicator = _time(step_indicator, states, indicator_actions, args.num_steps)
+    print(f'next_states:        {time_1d * 1e3:.2f}ms per step')
+    print(f'next_states_legacy: {time_indicator * 1e3:.2f}ms per step')
+    print(f'legacy / 1d: {time_indicator / time_1d:.2f}x')
+    outputs_equal = jnp.all(step_1d(states, actions_1d[0]) ==
+                            step_indicator(states, indicator_actions[0]))
+    print(f'outputs equal: {bool(outputs_equal)}')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,48 @@
-"""Imports all public functions under the `gojax` namespace."""
+"""
+Imports all public functions under the `gojax` namespace.
 
-from .constants import *
-from .go import *
-from .state_index import *
-from .rng import *
-from .serialize import *
+Submodules are imported lazily on first attribute access, so `import gojax` alone does not import
+JAX or initialize its backend.
+"""
+
+import importlib
+
+# Submodules whose public names are exposed under the `gojax` namespace, in lookup order.
+_NAMESPACE_SUBMODULES = ('constants', 'go', 'state_index', 'rng', 'serialize', 'life',
+                         'features', 'ladders', 'trajectory', 'profiling', 'go_state',
+                         'opening_book')
+# Submodules that are only reachable as `gojax.<submodule>`.
+_OTHER_SUBMODULES = ('actor_pool', 'arena', 'batching', 'checkpoint', 'gtp', 'replay_buffer',
+                     'telemetry', 'tuning')
+
+
+def _import_submodule(name):
+    return importlib.import_module(f'.{name}', __name__)
+
+
+def _get_public_names():
+    names = set(_NAMESPACE_SUBMODULES + _OTHER_SUBMODULES)
+    for submodule_name in _NAMESPACE_SUBMODULES:
+        submodule = _import_submodule(submodule_name)
+        # dir() also lists the names a submodule resolves lazily through its own __getattr__.
+        names.update(name for name in dir(submodule) if not name.startswith('_'))
+    return sorted(names)
+
+
+def __getattr__(name):
+    if name in _NAMESPACE_SUBMODULES or name in _OTHER_SUBMODULES:
+        return _import_submodule(name)
+    if name == '__all__':
+        return _get_public_names()
+    if not name.startswith('__'):
+        for submodule_name in _NAMESPACE_SUBMODULES:
+            submodule = _import_submodule(submodule_name)
+            if hasattr(submodule, name):
+                value = getattr(submodule, name)
+                globals()[name] = value
+                return value
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+def __dir__():
+    return _get_public_names()
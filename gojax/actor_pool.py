@@ -0,0 +1,296 @@
+"""A multi-process self-play actor pool that exchanges trajectories through shared memory."""
+
+import contextlib
+import multiprocessing
+import os
+import time
+from multiprocessing import shared_memory
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import jax
+import jax.numpy as jnp
+import numpy as np
+from jax import lax
+
+from gojax import go
+from gojax import rng
+from gojax import state_index
+from gojax import trajectory
+
+# Header entries of every worker ring.
+_WRITE_COUNT = 0
+_READ_COUNT = 1
+_NUM_POSITIONS = 2
+_STALL_NANOSECONDS = 3
+_HEADER_SIZE = 4
+
+
+def random_rollout(rng_key: jnp.ndarray, board_size: int, batch_size: int,
+                   max_length: int) -> trajectory.Trajectories:
+    """
+    Plays a batch of games with uniformly random legal moves.
+
+    Use `functools.partial` to bind everything but the key, e.g. as the rollout function of an
+    ActorPool.
+
+    :param rng_key: JAX RNG key.
+    :param board_size: board size (B).
+    :param batch_size: the number of games (N).
+    :param max_length: the maximum number of plies (L).
+    :return: Trajectories of the N games.
+    """
+    logits = jnp.zeros((batch_size, board_size * board_size + 1))
+
+    def _step(states, step_key):
+        actions_1d = rng.sample_legal_actions1d(states, logits, step_key)
+        return go.next_states(states, actions_1d), (actions_1d, state_index.get_ended(states))
+
+    states, (actions_1d, ended) = lax.scan(_step, go.new_states(board_size, batch_size),
+                                           jax.random.split(rng_key, max_length))
+    return trajectory.new_trajectories(jnp.transpose(actions_1d), go.compute_winning(states),
+                                       lengths=jnp.sum(~ended, axis=0))
+
+
+class _Ring:
+    """Views of a single-producer single-consumer ring of trajectory batches in shared memory."""
+
+    def __init__(self, buffer, num_slots: int, batch_size: int, max_length: int):
+        self.num_slots = num_slots
+        offset = 0
+        views = []
+        for shape, dtype in (((_HEADER_SIZE,), np.int64),
+                             ((num_slots, batch_size, max_length), np.int16),
+                             ((num_slots, batch_size), np.int16),
+                             ((num_slots, batch_size), np.int8)):
+            views.append(np.ndarray(shape, dtype, buffer, offset))
+            offset += views[-1].nbytes
+        self.header, self.actions, self.lengths, self.outcomes = views
+
+    @staticmethod
+    def get_nbytes(num_slots: int, batch_size: int, max_length: int) -> int:
+        """The number of bytes a ring occupies."""
+        return 8 * _HEADER_SIZE + num_slots * batch_size * (2 * max_length + 3)
+
+    @property
+    def num_filled(self) -> int:
+        """The number of written slots that were not released by the consumer yet."""
+        return int(self.header[_WRITE_COUNT] - self.header[_READ_COUNT])
+
+    def write(self, trajectories: trajectory.Trajectories):
+        """Writes a trajectory batch into the next free slot. The ring must not be full."""
+        slot = self.header[_WRITE_COUNT] % self.num_slots
+        self.actions[slot] = trajectories.actions
+        self.lengths[slot] = trajectories.lengths
+        self.outcomes[slot] = trajectories.outcomes
+        self.header[_NUM_POSITIONS] += int(np.sum(trajectories.lengths))
+        # Publish the slot only after its contents are written.
+        self.header[_WRITE_COUNT] += 1
+
+    def peek(self) -> trajectory.Trajectories:
+        """Views the oldest unreleased slot. The ring must not be empty."""
+        slot = self.header[_READ_COUNT] % self.num_slots
+        return trajectory.Trajectories(actions=self.actions[slot], outcomes=self.outcomes[slot],
+                                       lengths=self.lengths[slot])
+
+    def release(self):
+        """Frees the oldest unreleased slot for the producer."""
+        self.header[_READ_COUNT] += 1
+
+
+def _run_worker(worker_id: int, rollout_fn: Callable, shm_name: str,
+                ring_shape: Tuple[int, int, int], seed: int, num_restarts: int, stop_event,
+                poll_interval: float):
+    """Runs jitted rollouts forever and writes them into the worker's ring."""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    ring = _Ring(shm.buf, *ring_shape)
+    rollout_fn = jax.jit(rollout_fn)
+    rng_key = jax.random.fold_in(jax.random.fold_in(jax.random.PRNGKey(seed), worker_id),
+                                 num_restarts)
+    try:
+        while not stop_event.is_set():
+            trajectories = jax.device_get(
+                rollout_fn(jax.random.fold_in(rng_key, int(ring.header[_WRITE_COUNT]))))
+            stall_start = time.perf_counter_ns()
+            while ring.num_filled >= ring.num_slots:
+                if stop_event.wait(poll_interval):
+                    return
+            ring.header[_STALL_NANOSECONDS] += time.perf_counter_ns() - stall_start
+            ring.write(trajectories)
+    finally:
+        del ring
+        shm.close()
+
+
+class ActorPool:
+    """
+    Runs rollouts in N worker processes and hands their trajectories to the consumer zero-copy.
+
+    Every worker writes the compact trajectories (see `gojax.Trajectories`) of each rollout into
+    its own preallocated `multiprocessing.shared_memory` ring, which the consumer reads through
+    NumPy views. A worker blocks while its ring is full, dead workers are restarted, and the pool
+    counts produced and consumed rollouts, positions and stalls.
+
+    Workers are spawned rather than forked, since JAX is not fork-safe. Pin each worker to its own
+    devices by passing environment variables, e.g.
+    `worker_env=lambda i: {'CUDA_VISIBLE_DEVICES': str(i)}`.
+
+    Example:
+    ```
+    rollout_fn = functools.partial(actor_pool.random_rollout, board_size=9, batch_size=256,
+                                   max_length=128)
+    with actor_pool.ActorPool(rollout_fn, num_workers=4) as pool:
+        for _ in range(num_reads):
+            with pool.read() as trajectories:
+                buffer = replay_buffer.add(buffer, ...)
+    ```
+    """
+
+    def __init__(self, rollout_fn: Callable[[jnp.ndarray], trajectory.Trajectories],
+                 num_workers: int, num_slots: int = 4, seed: int = 0,
+                 worker_env: Optional[Callable[[int], Dict[str, str]]] = None,
+                 poll_interval: float = 0.001):
+        """
+        :param rollout_fn: a picklable jittable function mapping an RNG key to Trajectories of a
+        fixed shape, e.g. a `functools.partial` of `random_rollout`.
+        :param num_workers: the number of worker processes.
+        :param num_slots: the number of rollouts each worker can buffer before it blocks.
+        :param seed: the seed the worker RNG keys are derived from.
+        :param worker_env: an optional function mapping a worker index to extra environment
+        variables of its process.
+        :param poll_interval: the number of seconds between checks of a full or empty ring.
+        """
+        self.rollout_fn = rollout_fn
+        self.num_workers = num_workers
+        self.num_slots = num_slots
+        self.seed = seed
+        self.worker_env = worker_env
+        self.poll_interval = poll_interval
+        self.num_restarts = [0] * num_workers
+        shapes = jax.eval_shape(rollout_fn, jax.random.PRNGKey(0))
+        self._ring_shape = (num_slots, *shapes.actions.shape)
+        self._context = multiprocessing.get_context('spawn')
+        self._stop_event = self._context.Event()
+        self._shms: List[shared_memory.SharedMemory] = []
+        self._rings: List[_Ring] = []
+        self._processes: List[Optional[multiprocessing.Process]] = [None] * num_workers
+        self._next_worker = 0
+        self._start_time = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def start(self):
+        """Allocates the rings and starts the workers."""
+        nbytes = _Ring.get_nbytes(*self._ring_shape)
+        for _ in range(self.num_workers):
+            shm = shared_memory.SharedMemory(create=True, size=nbytes)
+            self._shms.append(shm)
+            self._rings.append(_Ring(shm.buf, *self._ring_shape))
+            self._rings[-1].header[:] = 0
+        self._start_time = time.perf_counter()
+        for worker_id in range(self.num_workers):
+            self._start_worker(worker_id)
+
+    def stop(self, timeout: float = 10.):
+        """Stops the workers and frees the shared memory. Views from `read` become invalid."""
+        self._stop_event.set()
+        for process in self._processes:
+            if process is not None:
+                process.join(timeout)
+                if process.is_alive():
+                    process.terminate()
+                    process.join()
+        self._processes = [None] * self.num_workers
+        self._rings.clear()
+        for shm in self._shms:
+            shm.close()
+            shm.unlink()
+        self._shms.clear()
+
+    def _start_worker(self, worker_id: int):
+        process = self._context.Process(
+            target=_run_worker, daemon=True,
+            args=(worker_id, self.rollout_fn, self._shms[worker_id].name, self._ring_shape,
+                  self.seed, self.num_restarts[worker_id], self._stop_event, self.poll_interval))
+        extra_env = self.worker_env(worker_id) if self.worker_env is not None else {}
+        # Spawned processes inherit the environment at start time, before they import JAX.
+        original_env = {name: os.environ.get(name) for name in extra_env}
+        os.environ.update(extra_env)
+        try:
+            process.start()
+        finally:
+            for name, value in original_env.items():
+                if value is None:
+                    del os.environ[name]
+                else:
+                    os.environ[name] = value
+        self._processes[worker_id] = process
+
+    def restart_dead_workers(self) -> int:
+        """
+        Restarts the workers that exited, e.g. because they crashed or ran out of memory.
+
+        A restarted worker continues writing into its ring after the last published rollout.
+
+        :return: the number of restarted workers.
+        """
+        num_restarted = 0
+        for worker_id, process in enumerate(self._processes):
+            if process is not None and not process.is_alive() and not self._stop_event.is_set():
+                process.join()
+                self.num_restarts[worker_id] += 1
+                self._start_worker(worker_id)
+                num_restarted += 1
+        return num_restarted
+
+    @contextlib.contextmanager
+    def read(self, timeout: float = None) -> Iterator[trajectory.Trajectories]:
+        """
+        Waits for the oldest unread rollout of the next worker with data, round-robin.
+
+        The yielded Trajectories are NumPy views into shared memory, so copy what is needed before
+        the context exits and the slot is handed back to its worker.
+
+        :param timeout: the maximum number of seconds to wait, or None to wait forever.
+        :return: a context manager of Trajectories.
+        """
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        while True:
+            for offset in range(self.num_workers):
+                worker_id = (self._next_worker + offset) % self.num_workers
+                ring = self._rings[worker_id]
+                if ring.num_filled > 0:
+                    self._next_worker = (worker_id + 1) % self.num_workers
+                    try:
+                        yield ring.peek()
+                    finally:
+                        ring.release()
+                    return
+            if deadline is not None and time.perf_counter() >= deadline:
+                raise TimeoutError(f'No rollout arrived within {timeout} seconds')
+            self.restart_dead_workers()
+            time.sleep(self.poll_interval)
+
+    def metrics(self) -> Dict[str, float]:
+        """
+        Returns the throughput counters summed over the workers.
+
+        :return: a dictionary of the number of produced, consumed and buffered rollouts, the number
+        of produced positions and positions per second since start, the total number of seconds
+        workers stalled on full rings, and the number of worker restarts.
+        """
+        headers = np.zeros(_HEADER_SIZE, dtype='int64')
+        for ring in self._rings:
+            headers += ring.header
+        elapsed = time.perf_counter() - self._start_time if self._start_time else 0.
+        return {'num_produced': int(headers[_WRITE_COUNT]),
+                'num_consumed': int(headers[_READ_COUNT]),
+                'num_buffered': int(headers[_WRITE_COUNT] - headers[_READ_COUNT]),
+                'num_positions': int(headers[_NUM_POSITIONS]),
+                'positions_per_second': headers[_NUM_POSITIONS] / elapsed if elapsed else 0.,
+                'stall_seconds': headers[_STALL_NANOSECONDS] / 1e9,
+                'num_restarts': sum(self.num_restarts)}
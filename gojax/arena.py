@@ -0,0 +1,149 @@
+"""Batched policy-versus-policy evaluation with win rates and Elo estimates."""
+
+import functools
+import itertools
+from typing import Callable, Dict, NamedTuple, Sequence
+
+import jax
+import jax.numpy as jnp
+import numpy as np
+from jax import lax
+
+from gojax import go
+from gojax import rng
+from gojax import state_index
+
+
+class MatchResults(NamedTuple):
+    """
+    The results of N arena games.
+
+    black_ids: an N integer array of the policy indices that played black.
+    white_ids: an N integer array of the policy indices that played white.
+    winning: an N integer array of the results (1 = black won, 0 = tie, -1 = white won).
+    lengths: an N integer array of the number of plies of each game.
+    """
+    black_ids: jnp.ndarray
+    white_ids: jnp.ndarray
+    winning: jnp.ndarray
+    lengths: jnp.ndarray
+
+
+def _get_pairings(num_policies: int, games_per_pairing: int):
+    """The black and white policy indices of every ordered pair of distinct policies."""
+    pairings = np.array(list(itertools.permutations(range(num_policies), 2)))
+    pairings = np.repeat(pairings, games_per_pairing, axis=0)
+    return pairings[:, 0], pairings[:, 1]
+
+
+@functools.partial(jax.jit, static_argnames=('policies', 'board_size', 'games_per_pairing',
+                                             'max_length'))
+def play_match(policies: Sequence[Callable], rng_key: jnp.ndarray, board_size: int,
+               games_per_pairing: int, max_length: int, komi=None) -> MatchResults:
+    """
+    Plays every ordered pair of distinct policies against each other in one jitted loop.
+
+    Each policy plays black and white equally often. At every ply each policy is evaluated on the
+    whole batch and each game takes the action of the policy whose turn it is. Games that do not
+    end within `max_length` plies are scored as they stand.
+
+    :param policies: a tuple of P policies. A policy maps a batch array of Go games and a JAX RNG
+    key to an integer array of 1D actions. Invalid actions are played as passes.
+    :param rng_key: JAX RNG key.
+    :param board_size: board size (B).
+    :param games_per_pairing: the number of games of every ordered pair of policies.
+    :param max_length: the maximum number of plies per game.
+    :param komi: an optional scalar komi given to white.
+    :return: MatchResults of P x (P - 1) x `games_per_pairing` games.
+    """
+    black_ids, white_ids = map(jnp.asarray, _get_pairings(len(policies), games_per_pairing))
+    batch_size = len(black_ids)
+
+    def _cond_fn(carry):
+        states, ply, _ = carry
+        return (ply < max_length) & ~jnp.all(state_index.get_ended(states))
+
+    def _body_fn(carry):
+        states, ply, lengths = carry
+        step_key = jax.random.fold_in(rng_key, ply)
+        all_actions_1d = jnp.stack([policy(states, jax.random.fold_in(step_key, i))
+                                    for i, policy in enumerate(policies)])
+        movers = jnp.where(state_index.get_turns(states), white_ids, black_ids)
+        actions_1d = all_actions_1d[movers, jnp.arange(batch_size)]
+        lengths = lengths + ~state_index.get_ended(states)
+        return go.next_states(states, actions_1d), ply + 1, lengths
+
+    states, _, lengths = lax.while_loop(
+        _cond_fn, _body_fn, (go.new_states(board_size, batch_size), 0,
+                             jnp.zeros(batch_size, dtype='int32')))
+    return MatchResults(black_ids=black_ids, white_ids=white_ids,
+                        winning=go.compute_winning(states, komi), lengths=lengths)
+
+
+def _wilson_interval(scores: np.ndarray, num_games: np.ndarray, z: float) -> np.ndarray:
+    """The Wilson score interval of win rates, stacked on the last axis."""
+    safe_num_games = np.maximum(num_games, 1)
+    rates = scores / safe_num_games
+    denominator = 1 + z ** 2 / safe_num_games
+    center = (rates + z ** 2 / (2 * safe_num_games)) / denominator
+    half_width = z * np.sqrt(rates * (1 - rates) / safe_num_games +
+                             z ** 2 / (4 * safe_num_games ** 2)) / denominator
+    intervals = np.stack((center - half_width, center + half_width), axis=-1)
+    return np.where(np.expand_dims(num_games > 0, -1), intervals, [0., 1.])
+
+
+def _fit_elo(scores: np.ndarray, num_games: np.ndarray, num_iterations: int) -> np.ndarray:
+    """
+    Fits Bradley-Terry strengths with minorization-maximization and converts them to Elo.
+
+    A prior of one tied game against every other policy keeps the ratings of unbeaten or winless
+    policies finite.
+    """
+    num_policies = len(scores)
+    off_diagonal = 1 - np.eye(num_policies)
+    scores = scores + 0.5 * off_diagonal
+    num_games = num_games + off_diagonal
+    strengths = np.ones(num_policies)
+    for _ in range(num_iterations):
+        pair_weights = num_games / (strengths[:, None] + strengths[None, :])
+        strengths = np.sum(scores, axis=1) / np.sum(pair_weights * off_diagonal, axis=1)
+        strengths /= strengths[0]
+    return 400 * np.log10(strengths)
+
+
+def compute_standings(results: MatchResults, num_policies: int, z: float = 1.96,
+                      num_elo_iterations: int = 1000) -> Dict[str, np.ndarray]:
+    """
+    Summarizes arena results.
+
+    Wins count as 1 point and ties as half a point.
+
+    :param results: MatchResults.
+    :param num_policies: the number of policies (P).
+    :param z: the standard normal quantile of the confidence intervals, e.g. 1.96 for 95%.
+    :param num_elo_iterations: the number of Bradley-Terry fitting iterations.
+    :return: a dictionary of
+    'num_games': a P x P array of the games between each pair of policies in either color,
+    'scores': a P x P array of the points policy i scored against policy j,
+    'win_rates': a P x P array of the scores divided by the games,
+    'win_rate_intervals': a P x P x 2 array of Wilson confidence intervals of the win rates,
+    'elo': a P array of Elo ratings relative to the first policy.
+    """
+    black_ids, white_ids, winning = map(np.asarray, results[:3])
+    num_games = np.zeros((num_policies, num_policies))
+    scores = np.zeros((num_policies, num_policies))
+    np.add.at(num_games, (black_ids, white_ids), 1)
+    np.add.at(num_games, (white_ids, black_ids), 1)
+    black_points = (winning + 1) / 2
+    np.add.at(scores, (black_ids, white_ids), black_points)
+    np.add.at(scores, (white_ids, black_ids), 1 - black_points)
+    return {'num_games': num_games, 'scores': scores,
+            'win_rates': scores / np.maximum(num_games, 1),
+            'win_rate_intervals': _wilson_interval(scores, num_games, z),
+            'elo': _fit_elo(scores, num_games, num_elo_iterations)}
+
+
+def random_policy(states: jnp.ndarray, rng_key: jnp.ndarray) -> jnp.ndarray:
+    """A policy that plays uniformly random legal moves, including passing."""
+    return rng.sample_legal_actions1d(
+        states, jnp.zeros((len(states), state_index.get_action_size(states))), rng_key)
@@ -0,0 +1,243 @@
+"""Dynamic request batching of single-game calls into batched GoJAX calls."""
+
+import asyncio
+import collections
+import time
+from typing import Callable, Dict, List
+
+import jax
+import jax.numpy as jnp
+import numpy as np
+
+from gojax import constants
+from gojax import go
+
+NEXT_STATES = 'next_states'
+LEGAL_ACTIONS = 'legal_actions'
+SCORES = 'scores'
+
+
+def _get_bucket_size(num_requests: int) -> int:
+    """Returns the smallest power of two that fits the requests."""
+    return 1 << (num_requests - 1).bit_length()
+
+
+class BatchingMetrics:
+    """Running statistics of a BatchingService."""
+
+    def __init__(self):
+        self.num_requests = 0
+        self.num_batches = 0
+        self.num_padded_slots = 0
+        self.total_queueing_latency = 0.
+        self.max_queueing_latency = 0.
+
+    def record_batch(self, num_requests: int, bucket_size: int, queueing_latencies: List[float]):
+        """Records a dispatched batch."""
+        self.num_requests += num_requests
+        self.num_batches += 1
+        self.num_padded_slots += bucket_size
+        self.total_queueing_latency += sum(queueing_latencies)
+        self.max_queueing_latency = max([self.max_queueing_latency, *queueing_latencies])
+
+    @property
+    def fill_ratio(self) -> float:
+        """The fraction of dispatched batch slots that held real requests."""
+        return self.num_requests / self.num_padded_slots if self.num_padded_slots else 0.
+
+    @property
+    def mean_queueing_latency(self) -> float:
+        """The mean number of seconds a request waited before its batch was dispatched."""
+        return self.total_queueing_latency / self.num_requests if self.num_requests else 0.
+
+    def as_dict(self) -> Dict[str, float]:
+        """Returns the metrics as a dictionary."""
+        return {'num_requests': self.num_requests, 'num_batches': self.num_batches,
+                'fill_ratio': self.fill_ratio,
+                'mean_queueing_latency': self.mean_queueing_latency,
+                'max_queueing_latency': self.max_queueing_latency}
+
+
+class BatchingService:
+    """
+    Coalesces single-game requests from many coroutines or threads into batched jitted calls.
+
+    Requests are queued per kind and dispatched once `max_batch_size` requests are waiting or the
+    oldest request waited `max_latency` seconds. Batches are padded with new games to a power of
+    two so that at most log2(max_batch_size) + 1 shapes are ever compiled per kind.
+
+    Example:
+    ```
+    async with BatchingService(board_size=9) as service:
+        state = await service.next_states(state, action_1d)
+    ```
+    """
+
+    def __init__(self, board_size: int, max_batch_size: int = 256, max_latency: float = 0.002):
+        """
+        :param board_size: board size (B) of every game.
+        :param max_batch_size: the maximum number of requests per batch. Must be a power of two.
+        :param max_latency: the maximum number of seconds a request waits for more requests.
+        """
+        if max_batch_size & (max_batch_size - 1):
+            raise ValueError(f'max_batch_size must be a power of two: {max_batch_size}')
+        self.board_size = board_size
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency
+        self.metrics = collections.defaultdict(BatchingMetrics)
+        self._batch_fns: Dict[str, Callable] = {
+            NEXT_STATES: jax.jit(go.next_states),
+            LEGAL_ACTIONS: jax.jit(go.compute_legal_actions1d),
+            SCORES: jax.jit(go.compute_scores)}
+        self._queues: Dict[str, collections.deque] = {}
+        self._wakeups: Dict[str, asyncio.Event] = {}
+        self._workers: List[asyncio.Task] = []
+        self._loop = None
+
+    async def __aenter__(self):
+        self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.stop()
+
+    def start(self):
+        """Starts the dispatch workers on the running event loop."""
+        self._loop = asyncio.get_running_loop()
+        for kind in self._batch_fns:
+            self._queues[kind] = collections.deque()
+            self._wakeups[kind] = asyncio.Event()
+            self._workers.append(self._loop.create_task(self._dispatch_forever(kind)))
+
+    async def stop(self):
+        """Stops the dispatch workers."""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers.clear()
+
+    def warmup(self):
+        """Compiles every batch shape ahead of time."""
+        bucket_size = 1
+        while bucket_size <= self.max_batch_size:
+            states = go.new_states(self.board_size, bucket_size)
+            self._batch_fns[NEXT_STATES](states, jnp.zeros(bucket_size, dtype='int32'))
+            self._batch_fns[LEGAL_ACTIONS](states)
+            self._batch_fns[SCORES](states, jnp.zeros(bucket_size))
+            bucket_size *= 2
+
+    async def submit(self, kind: str, *args):
+        """
+        Queues a single-game request and waits for its result.
+
+        :param kind: one of NEXT_STATES, LEGAL_ACTIONS or SCORES.
+        :param args: the single-game arguments of the request, without a batch dimension.
+        :return: the single-game result.
+        """
+        future = self._loop.create_future()
+        self._queues[kind].append((args, future, time.perf_counter()))
+        self._wakeups[kind].set()
+        return await future
+
+    def submit_threadsafe(self, kind: str, *args):
+        """
+        Queues a single-game request from another thread.
+
+        :return: a `concurrent.futures.Future` of the single-game result.
+        """
+        return asyncio.run_coroutine_threadsafe(self.submit(kind, *args), self._loop)
+
+    async def next_states(self, state: np.ndarray, action_1d: int) -> np.ndarray:
+        """
+        Computes the next state of a single game.
+
+        :param state: a C x B x B boolean array.
+        :param action_1d: an integer in range [0, B^2].
+        :return: a C x B x B boolean array.
+        """
+        return await self.submit(NEXT_STATES, state, action_1d)
+
+    async def legal_actions(self, state: np.ndarray) -> np.ndarray:
+        """
+        Computes the legal 1D actions of a single game.
+
+        :param state: a C x B x B boolean array.
+        :return: a boolean array of length A.
+        """
+        return await self.submit(LEGAL_ACTIONS, state)
+
+    async def scores(self, state: np.ndarray, komi: float = 0.) -> float:
+        """
+        Computes the area score of a single game from black's perspective.
+
+        :param state: a C x B x B boolean array.
+        :param komi: the points given to white.
+        :return: a float.
+        """
+        return await self.submit(SCORES, state, float(komi))
+
+    async def _dispatch_forever(self, kind: str):
+        queue = self._queues[kind]
+        wakeup = self._wakeups[kind]
+        while True:
+            if not queue:
+                wakeup.clear()
+                await wakeup.wait()
+            deadline = queue[0][2] + self.max_latency
+            while len(queue) < self.max_batch_size and time.perf_counter() < deadline:
+                wakeup.clear()
+                try:
+                    await asyncio.wait_for(wakeup.wait(), deadline - time.perf_counter())
+                except asyncio.TimeoutError:
+                    break
+            requests = [queue.popleft() for _ in range(min(len(queue), self.max_batch_size))]
+            await self._dispatch(kind, requests)
+
+    def _reject_malformed(self, kind: str, requests: list) -> list:
+        """Fails the futures of malformed requests and returns the well-formed ones."""
+        state_shape = (constants.NUM_CHANNELS, self.board_size, self.board_size)
+        well_formed = []
+        for args, future, enqueue_time in requests:
+            try:
+                if np.shape(args[0]) != state_shape:
+                    raise ValueError(f'expected a state of shape {state_shape}, got '
+                                     f'{np.shape(args[0])}')
+                if kind in (NEXT_STATES, SCORES) and np.ndim(args[1]) != 0:
+                    raise ValueError(f'expected a scalar argument, got {args[1]!r}')
+            except Exception as exception:  # pylint: disable=broad-except
+                if not future.done():
+                    future.set_exception(exception)
+                continue
+            well_formed.append((args, future, enqueue_time))
+        return well_formed
+
+    async def _dispatch(self, kind: str, requests: list):
+        dispatch_time = time.perf_counter()
+        requests = self._reject_malformed(kind, requests)
+        if not requests:
+            return
+        bucket_size = _get_bucket_size(len(requests))
+        num_padding = bucket_size - len(requests)
+        try:
+            states = np.stack([args[0] for args, _, _ in requests] + [
+                np.zeros((constants.NUM_CHANNELS, self.board_size, self.board_size),
+                         dtype=bool)] * num_padding)
+            batch_args = [states]
+            if kind in (NEXT_STATES, SCORES):
+                # A fixed dtype keeps e.g. int and float komis on one compiled signature.
+                batch_args.append(
+                    np.array([args[1] for args, _, _ in requests] + [0] * num_padding,
+                             dtype='float32' if kind == SCORES else 'int32'))
+            results = await self._loop.run_in_executor(None, lambda: np.asarray(
+                self._batch_fns[kind](*batch_args)))
+        except Exception as exception:  # pylint: disable=broad-except
+            for _, future, _ in requests:
+                if not future.done():
+                    future.set_exception(exception)
+            return
+        self.metrics[kind].record_batch(len(requests), bucket_size,
+                                        [dispatch_time - enqueue_time for _, _, enqueue_time in
+                                         requests])
+        for i, (_, future, _) in enumerate(requests):
+            if not future.done():
+                future.set_result(results[i])
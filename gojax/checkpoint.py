@@ -0,0 +1,137 @@
+"""Delta-encoded checkpointing of batches of Go states."""
+
+import json
+import os
+import zlib
+from typing import Tuple
+
+import numpy as np
+
+from gojax import constants
+
+_PLANE_CHANNELS = (constants.BLACK_CHANNEL_INDEX, constants.WHITE_CHANNEL_INDEX,
+                   constants.KILLED_CHANNEL_INDEX)
+_FLAG_CHANNELS = (constants.TURN_CHANNEL_INDEX, constants.PASS_CHANNEL_INDEX,
+                  constants.END_CHANNEL_INDEX)
+_MANIFEST_FILENAME = 'manifest.json'
+
+
+def _get_codec(name: str):
+    """Returns the (compress, decompress) functions of the codec."""
+    if name == 'zlib':
+        return lambda data: zlib.compress(data, 1), zlib.decompress
+    if name == 'lz4':
+        import lz4.frame  # pylint: disable=import-outside-toplevel
+        return lz4.frame.compress, lz4.frame.decompress
+    if name == 'zstd':
+        import zstandard  # pylint: disable=import-outside-toplevel
+        return zstandard.ZstdCompressor(level=1).compress, zstandard.ZstdDecompressor().decompress
+    raise ValueError(f'Unknown codec: {name}')
+
+
+def _get_default_codec() -> str:
+    """Returns the fastest available codec."""
+    try:
+        import lz4.frame  # pylint: disable=import-outside-toplevel,unused-import
+        return 'lz4'
+    except ImportError:
+        return 'zlib'
+
+
+def _encode_states(states: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Packs the plane channels and the scalar flag channels of the states into bits."""
+    states = np.asarray(states)
+    packed_planes = np.packbits(states[:, _PLANE_CHANNELS])
+    packed_flags = np.packbits(states[:, _FLAG_CHANNELS, 0, 0])
+    return packed_planes, packed_flags
+
+
+def _decode_states(packed_planes: np.ndarray, packed_flags: np.ndarray, batch_size: int,
+                   board_size: int) -> np.ndarray:
+    """The inverse of `_encode_states`."""
+    states = np.zeros((batch_size, constants.NUM_CHANNELS, board_size, board_size), dtype=bool)
+    num_plane_bits = batch_size * len(_PLANE_CHANNELS) * board_size * board_size
+    states[:, _PLANE_CHANNELS] = np.unpackbits(packed_planes, count=num_plane_bits).reshape(
+        (batch_size, len(_PLANE_CHANNELS), board_size, board_size))
+    flags = np.unpackbits(packed_flags, count=batch_size * len(_FLAG_CHANNELS)).reshape(
+        (batch_size, len(_FLAG_CHANNELS), 1, 1))
+    states[:, _FLAG_CHANNELS] = flags.astype(bool)
+    return states
+
+
+def _get_snapshot_path(directory: str, index: int) -> str:
+    return os.path.join(directory, f'{index:08d}.snapshot')
+
+
+class DeltaCheckpointWriter:
+    """
+    Writes snapshots of a fixed-shape batch of Go states as XOR deltas of their predecessors.
+
+    Every `base_interval`-th snapshot is written in full so that restoring never applies more
+    than `base_interval - 1` deltas. Consecutive snapshots of self-play pools differ in a few
+    stones per game, so their deltas are mostly zero bits and compress to a few bytes per game.
+    """
+
+    def __init__(self, directory: str, base_interval: int = 100, codec: str = None):
+        """
+        :param directory: the directory to write to. Created if it does not exist.
+        :param base_interval: the number of snapshots between full snapshots.
+        :param codec: 'zlib', 'lz4' or 'zstd'. Defaults to lz4 if it is installed, otherwise zlib.
+        """
+        self.directory = directory
+        self.base_interval = base_interval
+        self.codec = codec or _get_default_codec()
+        self._compress, _ = _get_codec(self.codec)
+        self.num_snapshots = 0
+        self.num_bytes_written = 0
+        self._previous = None
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, states) -> int:
+        """
+        Writes a snapshot of the states.
+
+        :param states: a batch array of N Go games. Must have the same shape for every snapshot.
+        :return: the number of bytes written.
+        """
+        packed_planes, packed_flags = _encode_states(states)
+        if self.num_snapshots % self.base_interval == 0:
+            payload = np.concatenate((packed_planes, packed_flags))
+        else:
+            payload = np.concatenate((packed_planes ^ self._previous[0],
+                                      packed_flags ^ self._previous[1]))
+        data = self._compress(payload.tobytes())
+        with open(_get_snapshot_path(self.directory, self.num_snapshots), 'wb') as file:
+            file.write(data)
+        self._previous = (packed_planes, packed_flags)
+        if self.num_snapshots == 0:
+            with open(os.path.join(self.directory, _MANIFEST_FILENAME), 'w',
+                      encoding='utf-8') as file:
+                json.dump({'batch_size': states.shape[0], 'board_size': states.shape[2],
+                           'base_interval': self.base_interval, 'codec': self.codec}, file)
+        self.num_snapshots += 1
+        self.num_bytes_written += len(data)
+        return len(data)
+
+
+def restore_checkpoint(directory: str, index: int) -> np.ndarray:
+    """
+    Restores a snapshot written by a `DeltaCheckpointWriter`.
+
+    :param directory: the checkpoint directory.
+    :param index: the snapshot index.
+    :return: a batch array of N Go games as a NumPy boolean array.
+    """
+    with open(os.path.join(directory, _MANIFEST_FILENAME), encoding='utf-8') as file:
+        manifest = json.load(file)
+    batch_size, board_size = manifest['batch_size'], manifest['board_size']
+    _, decompress = _get_codec(manifest['codec'])
+    num_plane_bytes = -(-batch_size * len(_PLANE_CHANNELS) * board_size * board_size // 8)
+
+    payload = None
+    for snapshot_index in range(index - index % manifest['base_interval'], index + 1):
+        with open(_get_snapshot_path(directory, snapshot_index), 'rb') as file:
+            snapshot_payload = np.frombuffer(decompress(file.read()), dtype=np.uint8)
+        payload = snapshot_payload if payload is None else payload ^ snapshot_payload
+    return _decode_states(payload[:num_plane_bytes], payload[num_plane_bytes:], batch_size,
+                          board_size)
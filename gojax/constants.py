@@ -1,6 +1,6 @@
 """Go constants."""
 
-import jax.numpy as jnp
+import functools
 
 BLACKS_TURN = False
 WHITES_TURN = True
@@ -14,8 +14,27 @@ END_CHANNEL_INDEX = 5
 
 NUM_CHANNELS = 6
 
-# A kernel (OIHW format) used to in convolution used to expand a batch of 2D boolean arrays in
-# all four cardinal directions. Temporarily returns a float array until CUDNN can support
-# convolutions with booleans or integers.
-CARDINALLY_CONNECTED_KERNEL = jnp.array([[[[0., 1., 0.], [1., 1., 1.], [0., 1., 0.]]]],
-                                        dtype='bfloat16')
+
+@functools.lru_cache(maxsize=None)
+def _get_cardinally_connected_kernel():
+    # Imported here so that importing the constants does not import JAX.
+    import jax  # pylint: disable=import-outside-toplevel
+    import jax.numpy as jnp  # pylint: disable=import-outside-toplevel
+
+    # The kernel may first be requested while tracing, so force a concrete array to cache.
+    with jax.ensure_compile_time_eval():
+        return jnp.array([[[[0., 1., 0.], [1., 1., 1.], [0., 1., 0.]]]], dtype='bfloat16')
+
+
+def __getattr__(name):
+    # A kernel (OIHW format) used to in convolution used to expand a batch of 2D boolean arrays in
+    # all four cardinal directions. Temporarily returns a float array until CUDNN can support
+    # convolutions with booleans or integers. Constructed lazily on first access so that
+    # importing the constants does not initialize the JAX backend.
+    if name == 'CARDINALLY_CONNECTED_KERNEL':
+        return _get_cardinally_connected_kernel()
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+def __dir__():
+    return sorted(list(globals()) + ['CARDINALLY_CONNECTED_KERNEL'])
@@ -9,7 +9,7 @@ from gojax import go
 
 if __name__ == '__main__':
     state = go.new_states(7)
-    while not jnp.alltrue(state[0, constants.END_CHANNEL_INDEX]):
+    while not jnp.all(state[0, constants.END_CHANNEL_INDEX]):
         print(serialize.get_pretty_string(state[0]))
         USER_INPUT = input('row col: ').strip()
         # pylint: disable=invalid-name
@@ -0,0 +1,139 @@
+"""Neural network input features of Go states."""
+
+from typing import NamedTuple
+
+import jax
+import jax.numpy as jnp
+
+from gojax import constants
+from gojax import go
+from gojax import state_index
+
+
+class History(NamedTuple):
+    """
+    A device-resident ring buffer of the last K positions of N Go games.
+
+    pieces: an N x K x 2 x B x B boolean array of the black and white pieces.
+    index: an integer scalar of the slot the next position will be written to, shared by all games
+    (see `reset_history` to restart single games).
+    """
+    pieces: jnp.ndarray
+    index: jnp.ndarray
+
+
+def get_num_feature_channels(history_size: int) -> int:
+    """
+    The number of feature planes returned by `make_features`.
+
+    :param history_size: history size (K).
+    :return: an integer.
+    """
+    return 2 * history_size + 10
+
+
+def new_history(states: jnp.ndarray, history_size: int) -> History:
+    """
+    Creates a history ring buffer holding the given states as the only known position.
+
+    :param states: a batch array of N Go games.
+    :param history_size: the number of positions to remember (K).
+    :return: a History.
+    """
+    batch_size, _, nrows, ncols = states.shape
+    history = History(pieces=jnp.zeros((batch_size, history_size, 2, nrows, ncols), dtype=bool),
+                      index=jnp.zeros((), dtype='int32'))
+    return update_history(history, states)
+
+
+def update_history(history: History, states: jnp.ndarray) -> History:
+    """
+    Pushes the states into the history ring buffer, overwriting the oldest position.
+
+    Meant to be called inside the rollout loop after every `next_states`.
+
+    :param history: a History of N Go games.
+    :param states: a batch array of N Go games.
+    :return: a History.
+    """
+    pieces = states[:, (constants.BLACK_CHANNEL_INDEX, constants.WHITE_CHANNEL_INDEX)]
+    history_size = history.pieces.shape[1]
+    return History(pieces=history.pieces.at[:, history.index].set(pieces),
+                   index=jnp.remainder(history.index + 1, history_size))
+
+
+def reset_history(history: History, reset_mask: jnp.ndarray) -> History:
+    """
+    Forgets every remembered position of the masked games.
+
+    The games share one ring index, so a game that is re-initialized inside the rollout loop
+    (e.g. with `reset_ended_states`) must be reset here before its new position is pushed with
+    `update_history`.
+
+    :param history: a History of N Go games.
+    :param reset_mask: a boolean array of the N games to reset.
+    :return: a History.
+    """
+    return history._replace(pieces=history.pieces & ~jnp.reshape(reset_mask, (-1, 1, 1, 1, 1)))
+
+
+def get_history_pieces(history: History) -> jnp.ndarray:
+    """
+    Gets the remembered positions ordered from the most recent to the oldest.
+
+    :param history: a History of N Go games.
+    :return: an N x K x 2 x B x B boolean array.
+    """
+    history_size = history.pieces.shape[1]
+    slots = jnp.remainder(history.index - 1 - jnp.arange(history_size), history_size)
+    return history.pieces[:, slots]
+
+
+@jax.jit
+def make_features(states: jnp.ndarray, history: History) -> jnp.ndarray:
+    """
+    Computes AlphaGo/KataGo-style input feature planes from the perspective of the player to move.
+
+    Channels (K = history size):
+    • [0, K): the player's pieces in the last K positions, most recent first.
+    • [K, 2K): the opponent's pieces in the last K positions, most recent first.
+    • [2K, 2K + 3): the player's pieces whose groups have 1, 2 and 3+ liberties.
+    • [2K + 3, 2K + 6): the opponent's pieces whose groups have 1, 2 and 3+ liberties.
+    • 2K + 6: legal moves that capture at least one opponent piece.
+    • 2K + 7: legal moves.
+    • 2K + 8: all true if black is to move.
+    • 2K + 9: all true.
+
+    :param states: a batch array of N Go games.
+    :param history: a History of the same N Go games with the states as the most recent position.
+    :return: an N x (2K + 10) x B x B boolean array.
+    """
+    batch_size, _, nrows, ncols = states.shape
+    turns = state_index.get_turns(states)
+    turn_idcs = turns.astype('int32')
+    batch_idcs = jnp.arange(batch_size)
+
+    history_pieces = get_history_pieces(history)
+    player_history = history_pieces[batch_idcs, :, turn_idcs]
+    opponent_history = history_pieces[batch_idcs, :, 1 - turn_idcs]
+
+    liberty_counts = go.compute_liberty_counts(states)
+    player_liberties = liberty_counts[batch_idcs, turn_idcs]
+    opponent_liberties = liberty_counts[batch_idcs, 1 - turn_idcs]
+
+    def _bucket_liberties(liberties):
+        return jnp.stack((liberties == 1, liberties == 2, liberties >= 3), axis=1)
+
+    invalid_actions, children = jax.vmap(go.compute_actions1d_are_invalid, (None, 0), 1)(
+        states, jnp.arange(nrows * ncols))
+    legal_actions = jnp.reshape(~invalid_actions, (batch_size, nrows, ncols))
+    captures = jnp.reshape(
+        jnp.any(children[:, :, constants.KILLED_CHANNEL_INDEX], axis=(2, 3)),
+        (batch_size, nrows, ncols)) & legal_actions
+
+    planes = jnp.ones((batch_size, 2, nrows, ncols), dtype=bool)
+    planes = planes.at[:, 0].set(jnp.expand_dims(turns == constants.BLACKS_TURN, (1, 2)))
+    return jnp.concatenate(
+        (player_history, opponent_history, _bucket_liberties(player_liberties),
+         _bucket_liberties(opponent_liberties), jnp.expand_dims(captures, 1),
+         jnp.expand_dims(legal_actions, 1), planes), axis=1)
@@ -1,6 +1,7 @@
 """Main Go game functions."""
 
-from typing import Tuple
+import functools
+from typing import NamedTuple, Tuple
 
 import jax
 import jax.numpy as jnp
@@ -8,7 +9,9 @@ import numpy as np
 from jax import lax
 
 from gojax import constants
+from gojax import go_state
 from gojax import state_index
+from gojax import tuning
 
 
 def new_states(board_size: int, batch_size: int = 1) -> jnp.ndarray:
@@ -23,7 +26,59 @@ def new_states(board_size: int, batch_size: int = 1) -> jnp.ndarray:
     return state
 
 
-def paint_fill(seeds: jnp.ndarray, areas: jnp.ndarray) -> jnp.ndarray:
+def _accepts_go_state(fn):
+    """Lets a function of a batch array of Go games also take a GoState by converting it."""
+
+    @functools.wraps(fn)
+    def _wrapper(states, *args, **kwargs):
+        if isinstance(states, go_state.GoState):
+            states = go_state.from_go_state(states)
+        return fn(states, *args, **kwargs)
+
+    return _wrapper
+
+
+def _go_state_form(go_state_fn):
+    """
+    Routes the GoState calls of a function that returns Go games to its GoState form.
+
+    Functions that only read games convert a GoState with `_accepts_go_state` instead.
+    """
+
+    def _decorator(fn):
+        @functools.wraps(fn)
+        def _wrapper(states, *args, **kwargs):
+            if isinstance(states, go_state.GoState):
+                return go_state_fn(states, *args, **kwargs)
+            return fn(states, *args, **kwargs)
+
+        return _wrapper
+
+    return _decorator
+
+
+def new_board_masks(board_sizes: jnp.ndarray, max_board_size: int) -> jnp.ndarray:
+    """
+    Returns the on-board masks of games of mixed sizes padded to the same board size.
+
+    Each game is embedded in the top left corner of a `max_board_size` board. Functions that
+    accept `board_masks` treat points outside of the masks as if they were off the board, so one
+    compiled program can step a batch of mixed board sizes.
+
+    :param board_sizes: an integer array of N board sizes.
+    :param max_board_size: the padded board size (B).
+    :return: an N x B x B boolean array.
+    """
+    board_sizes = jnp.expand_dims(jnp.asarray(board_sizes), (1, 2))
+    indices = jnp.arange(max_board_size)
+    return (jnp.expand_dims(indices, (0, 2)) < board_sizes) & (
+            jnp.expand_dims(indices, (0, 1)) < board_sizes)
+
+
+@jax.named_scope('paint_fill')
+def paint_fill(seeds: jnp.ndarray, areas: jnp.ndarray, board_masks: jnp.ndarray = None,
+               return_iterations: bool = False, expansions_per_iteration: int = None,
+               compact: bool = False):
     """
     Paint fills the seeds to expand as much area as they can expand to in all 4 cardinal directions.
 
@@ -34,33 +89,112 @@ def paint_fill(seeds: jnp.ndarray, areas: jnp.ndarray) -> jnp.ndarray:
 
     :param seeds: an N x 1 x B x B float array where the True entries are the seeds.
     :param areas: an N x 1 x B x B float array where the True entries are areas.
-    :return: an N x 1 x B x B float array.
+    :param board_masks: an optional N x B x B boolean array of on-board points. Areas outside of
+    the board are ignored.
+    :param return_iterations: whether to also return the number of `while_loop` iterations each
+    game needed to converge.
+    :param expansions_per_iteration: the number of expansions unrolled in each `while_loop`
+    iteration. Defaults to the value tuned for the board size on the current backend (see
+    `gojax.tuning.tune_paint_fill`), or 3. Does not change the result.
+    :param compact: whether to run the loop on a shrinking set of the unconverged games (see
+    `_compacted_while_loop`), so that one slow game does not keep the whole batch expanding. Does
+    not change the result.
+    :return: an N x 1 x B x B float array, and an integer array of length N if
+    `return_iterations` is True. Without compaction, the loop runs for as many iterations as the
+    slowest game.
     """
+    if board_masks is not None:
+        areas = jnp.logical_and(areas, jnp.expand_dims(board_masks, 1))
+    if expansions_per_iteration is None:
+        expansions_per_iteration = tuning.get_expansions_per_iteration(max(seeds.shape[-2:]))
     float_seeds = seeds.astype('bfloat16')
     float_areas = areas.astype('bfloat16')
     second_expansion = lax.min(
         lax.conv(float_seeds, constants.CARDINALLY_CONNECTED_KERNEL, window_strides=(1, 1),
                  padding='same'), float_areas)
 
-    def _last_expansion_no_change(last_two_expansions_):
-        return jnp.any(last_two_expansions_[0] != last_two_expansions_[1])
+    def _last_expansion_no_change(carry_):
+        return jnp.any(carry_[0] != carry_[1])
+
+    def _expand_some(carry_):
+        previous, last, iterations_, areas_ = carry_
+        iterations_ = iterations_ + jnp.any(previous != last, axis=(1, 2, 3))
+        expanded = last
+        for _ in range(expansions_per_iteration):
+            expanded = lax.min(
+                lax.conv(expanded, constants.CARDINALLY_CONNECTED_KERNEL, window_strides=(1, 1),
+                         padding='same'), areas_)
+        return last, expanded, iterations_, areas_
+
+    carry = (float_seeds, second_expansion, jnp.zeros(len(seeds), dtype='int32'), float_areas)
+    if compact:
+        _, filled, iterations, _ = _compacted_while_loop(_expand_some, carry)
+    else:
+        _, filled, iterations, _ = lax.while_loop(_last_expansion_no_change, _expand_some, carry)
+    if return_iterations:
+        return filled, iterations
+    return filled
+
+
+def _compacted_while_loop(expand_fn, carry):
+    """
+    Runs the `paint_fill` loop in stages of halving capacity.
 
-    def _expand_some(last_two_expansions_):
-        expanded = lax.min(lax.conv(last_two_expansions_[1], constants.CARDINALLY_CONNECTED_KERNEL,
-                                    window_strides=(1, 1), padding='same'), float_areas)
-        expanded = lax.min(
-            lax.conv(expanded, constants.CARDINALLY_CONNECTED_KERNEL, window_strides=(1, 1),
-                     padding='same'), float_areas)
-        expanded = lax.min(
-            lax.conv(expanded, constants.CARDINALLY_CONNECTED_KERNEL, window_strides=(1, 1),
-                     padding='same'), float_areas)
-        return last_two_expansions_[1], expanded
+    Each stage gathers the unconverged games into an active set of the stage capacity and loops
+    until at most half of the capacity is still unconverged. The active set is then scattered back
+    and the next stage gathers the remaining games. Stage capacities are static, so the whole loop
+    compiles to log2(N) + 1 while loops.
 
-    return lax.while_loop(_last_expansion_no_change, _expand_some, (float_seeds, second_expansion))[
-        1]
+    :param expand_fn: the loop body over (previous, last, iterations, areas) of M games.
+    :param carry: the initial (previous, last, iterations, areas) of N games.
+    :return: the final carry of the N games.
+    """
+    batch_size = len(carry[0])
+    capacity = batch_size
+    while capacity > 0:
+        next_capacity = capacity // 2
+        unconverged = jnp.any(carry[0] != carry[1], axis=(1, 2, 3))
+        (indices,) = jnp.nonzero(unconverged, size=capacity, fill_value=batch_size)
+        # Padding slots are all zeros, which are already converged.
+        active_carry = tuple(
+            jnp.take(array, indices, axis=0, mode='fill', fill_value=0) for array in carry)
+
+        def _many_unconverged(carry_, next_capacity_=next_capacity):
+            return jnp.sum(jnp.any(carry_[0] != carry_[1], axis=(1, 2, 3))) > next_capacity_
+
+        active_carry = lax.while_loop(_many_unconverged, expand_fn, active_carry)
+        carry = tuple(array.at[indices].set(active_array, mode='drop') for array, active_array in
+                      zip(carry, active_carry))
+        capacity = next_capacity
+    return carry
+
+
+@jax.named_scope('compute_components')
+def compute_components(masks: jnp.ndarray) -> jnp.ndarray:
+    """
+    Computes the cardinally connected component of every point of the masks.
 
+    Every point is used as its own seed to `paint_fill`, so the cost grows with B^4 per board.
 
-def compute_free_groups(states: jnp.ndarray, turns: jnp.ndarray) -> jnp.ndarray:
+    :param masks: an N x B x B boolean array.
+    :return: an N x B^2 x B x B boolean array, where the i-th entry of the 2nd dimension is the
+    component containing the point `i = row x B + col`, or all false if the point is not part of
+    the mask.
+    """
+    batch_size, nrows, ncols = masks.shape
+    num_points = nrows * ncols
+    point_seeds = jnp.reshape(jnp.eye(num_points, dtype=bool), (1, num_points, nrows, ncols))
+    seeds = jnp.logical_and(point_seeds, jnp.expand_dims(masks, 1))
+    areas = jnp.broadcast_to(jnp.expand_dims(masks, 1), seeds.shape)
+    components = paint_fill(jnp.reshape(seeds, (batch_size * num_points, 1, nrows, ncols)),
+                            jnp.reshape(areas, (batch_size * num_points, 1, nrows, ncols)))
+    return jnp.reshape(components, (batch_size, num_points, nrows, ncols)).astype(bool)
+
+
+@jax.named_scope('compute_free_groups')
+@_accepts_go_state
+def compute_free_groups(states: jnp.ndarray, turns: jnp.ndarray, board_masks: jnp.ndarray = None,
+                        return_iterations: bool = False):
     """
     Computes the free groups for each turn in the state of states.
 
@@ -68,20 +202,58 @@ def compute_free_groups(states: jnp.ndarray, turns: jnp.ndarray) -> jnp.ndarray:
 
     :param states: a batch array of N Go games.
     :param turns: a boolean array of length N.
-    :return: an N x B x B boolean array.
+    :param board_masks: an optional N x B x B boolean array of on-board points (see
+    `new_board_masks`).
+    :param return_iterations: whether to also return the `paint_fill` iteration counts.
+    :return: an N x B x B boolean array, and an integer array of length N if `return_iterations`
+    is True.
     """
     float_pieces = jnp.expand_dims(state_index.get_pieces_per_turn(states, turns), 1).astype(
         'bfloat16')
-    float_empty_spaces = state_index.get_empty_spaces(states, keepdims=True).astype(
-        'bfloat16')  # N x 1 x B x B array.
+    empty_spaces = state_index.get_empty_spaces(states, keepdims=True)
+    if board_masks is not None:
+        empty_spaces = jnp.logical_and(empty_spaces, jnp.expand_dims(board_masks, 1))
+    float_empty_spaces = empty_spaces.astype('bfloat16')  # N x 1 x B x B array.
     immediate_free_pieces = lax.min(
         lax.conv(float_empty_spaces, constants.CARDINALLY_CONNECTED_KERNEL, (1, 1), padding='same'),
         float_pieces)
 
-    return jnp.squeeze(paint_fill(immediate_free_pieces, float_pieces), 1).astype(bool)
+    free_groups, iterations = paint_fill(immediate_free_pieces, float_pieces,
+                                         return_iterations=True)
+    free_groups = jnp.squeeze(free_groups, 1).astype(bool)
+    if return_iterations:
+        return free_groups, iterations
+    return free_groups
 
 
-def compute_areas(states: jnp.ndarray) -> jnp.ndarray:
+@jax.named_scope('compute_liberty_counts')
+@_accepts_go_state
+def compute_liberty_counts(states: jnp.ndarray) -> jnp.ndarray:
+    """
+    Computes the number of liberties of the group each piece belongs to.
+
+    :param states: a batch array of N Go games.
+    :return: an N x 2 x B x B integer array, where the 0th and 1st indices of the 2nd dimension
+    represent the black and white pieces respectively. Points without such a piece are 0.
+    """
+    batch_size, _, nrows, ncols = states.shape
+    pieces = jnp.reshape(states[:, (constants.BLACK_CHANNEL_INDEX, constants.WHITE_CHANNEL_INDEX)],
+                         (batch_size * 2, nrows, ncols))
+    groups = jnp.reshape(compute_components(pieces), (-1, 1, nrows, ncols)).astype('bfloat16')
+    expanded_groups = jnp.reshape(
+        lax.conv(groups, constants.CARDINALLY_CONNECTED_KERNEL, (1, 1), padding='same'),
+        (batch_size, 2, nrows * ncols, nrows, ncols)).astype(bool)
+    empty_spaces = state_index.get_empty_spaces(states, keepdims=True)
+    liberty_counts = jnp.sum(expanded_groups & jnp.expand_dims(empty_spaces, 1), axis=(3, 4),
+                             dtype='int32')
+    return jnp.reshape(liberty_counts, (batch_size, 2, nrows, ncols)) * states[:, (
+        constants.BLACK_CHANNEL_INDEX, constants.WHITE_CHANNEL_INDEX)]
+
+
+@jax.named_scope('compute_areas')
+@_accepts_go_state
+def compute_areas(states: jnp.ndarray, board_masks: jnp.ndarray = None,
+                  return_iterations: bool = False):
     """
     Compute the black and white areas of the states.
 
@@ -91,57 +263,329 @@ def compute_areas(states: jnp.ndarray) -> jnp.ndarray:
     opponent's pieces).
 
     :param states: a batch array of N Go games.
+    :param board_masks: an optional N x B x B boolean array of on-board points (see
+    `new_board_masks`).
+    :param return_iterations: whether to also return the `paint_fill` iteration counts.
     :return: an N x 2 x B x B boolean array, where the 0th and 1st indices of the 2nd dimension
     represent the black and
-    white areas respectively.
+    white areas respectively, and an N x 2 integer array of the iteration counts of the black and
+    white fills if `return_iterations` is True.
     """
     black_pieces = states[:, constants.BLACK_CHANNEL_INDEX].astype('bfloat16')
     white_pieces = states[:, constants.WHITE_CHANNEL_INDEX].astype('bfloat16')
-    empty_spaces = state_index.get_empty_spaces(states, keepdims=True).astype('bfloat16')
-
-    immediately_connected_to_black_pieces = lax.min(
-        lax.conv(jnp.expand_dims(black_pieces, 1), constants.CARDINALLY_CONNECTED_KERNEL, (1, 1),
-                 padding="same"), empty_spaces)
-    immediately_connected_to_white_pieces = lax.min(
-        lax.conv(jnp.expand_dims(white_pieces, 1), constants.CARDINALLY_CONNECTED_KERNEL, (1, 1),
-                 padding="same"), empty_spaces)
-    connected_to_black_pieces = paint_fill(immediately_connected_to_black_pieces, empty_spaces)
-    connected_to_white_pieces = paint_fill(immediately_connected_to_white_pieces, empty_spaces)
-
-    connected_to_pieces = jnp.concatenate((connected_to_black_pieces, connected_to_white_pieces),
-                                          1).astype(bool)
-    pieces = states[:, (constants.BLACK_CHANNEL_INDEX, constants.WHITE_CHANNEL_INDEX)]
-    return jnp.logical_or(jnp.logical_and(connected_to_pieces, ~connected_to_pieces[:, ::-1]),
-                          pieces)
-
-
-def compute_area_sizes(states: jnp.ndarray) -> jnp.ndarray:
+    empty_spaces = state_index.get_empty_spaces(states, keepdims=True)
+    if board_masks is not None:
+        empty_spaces = jnp.logical_and(empty_spaces, jnp.expand_dims(board_masks, 1))
+    empty_spaces = empty_spaces.astype('bfloat16')
+
+    with jax.named_scope('black_reach'):
+        immediately_connected_to_black_pieces = lax.min(
+            lax.conv(jnp.expand_dims(black_pieces, 1), constants.CARDINALLY_CONNECTED_KERNEL,
+                     (1, 1), padding="same"), empty_spaces)
+        connected_to_black_pieces, black_iterations = paint_fill(
+            immediately_connected_to_black_pieces, empty_spaces, return_iterations=True)
+    with jax.named_scope('white_reach'):
+        immediately_connected_to_white_pieces = lax.min(
+            lax.conv(jnp.expand_dims(white_pieces, 1), constants.CARDINALLY_CONNECTED_KERNEL,
+                     (1, 1), padding="same"), empty_spaces)
+        connected_to_white_pieces, white_iterations = paint_fill(
+            immediately_connected_to_white_pieces, empty_spaces, return_iterations=True)
+
+    with jax.named_scope('combine_areas'):
+        connected_to_pieces = jnp.concatenate(
+            (connected_to_black_pieces, connected_to_white_pieces), 1).astype(bool)
+        pieces = states[:, (constants.BLACK_CHANNEL_INDEX, constants.WHITE_CHANNEL_INDEX)]
+        areas = jnp.logical_or(jnp.logical_and(connected_to_pieces, ~connected_to_pieces[:, ::-1]),
+                               pieces)
+    if return_iterations:
+        return areas, jnp.stack((black_iterations, white_iterations), axis=1)
+    return areas
+
+
+@_accepts_go_state
+def compute_area_sizes(states: jnp.ndarray, board_masks: jnp.ndarray = None) -> jnp.ndarray:
     """
     Compute the size of the black and white areas (i.e. the number of pieces and empty spaces
     controlled by each player).
 
     :param states: a batch array of N Go games.
+    :param board_masks: an optional N x B x B boolean array of on-board points.
     :return: an N x 2 integer array.
     """
-    return jnp.sum(compute_areas(states), axis=(2, 3), dtype='uint16')
+    return jnp.sum(compute_areas(states, board_masks), axis=(2, 3), dtype='uint16')
 
 
-def compute_winning(states: jnp.ndarray) -> jnp.ndarray:
+@_accepts_go_state
+def compute_scores(states: jnp.ndarray, komi=0., board_masks: jnp.ndarray = None) -> jnp.ndarray:
     """
-    Computes which player has the higher amount of area.
+    Computes the Tromp-Taylor (area) scores from black's perspective.
+
+    The score is the size of black's area minus the size of white's area minus the komi.
+
+    :param states: a batch array of N Go games.
+    :param komi: a scalar or an array of N floats with the points given to white in each game.
+    :param board_masks: an optional N x B x B boolean array of on-board points.
+    :return: an N float array.
+    """
+    area_sizes = jnp.sum(compute_areas(states, board_masks), axis=(2, 3), dtype='float32')
+    return area_sizes[:, 0] - area_sizes[:, 1] - jnp.asarray(komi, dtype='float32')
+
+
+@_accepts_go_state
+def compute_winning(states: jnp.ndarray, komi=None, board_masks: jnp.ndarray = None) -> \
+        jnp.ndarray:
+    """
+    Computes which player has the higher amount of area after komi.
 
     1 = black is winning
     0 = tie
     -1 = white is winning
 
     :param states: a batch array of N Go games.
+    :param komi: an optional scalar or array of N floats with the points given to white in each
+    game. Defaults to no komi.
+    :param board_masks: an optional N x B x B boolean array of on-board points.
     :return: an N integer array.
     """
-    return lax.clamp(-1,
-                     -jnp.squeeze(jnp.diff(jnp.sum(compute_areas(states), axis=(2, 3))), axis=1), 1)
+    if komi is None:
+        return lax.clamp(-1, -jnp.squeeze(
+            jnp.diff(jnp.sum(compute_areas(states, board_masks), axis=(2, 3))), axis=1), 1)
+    return jnp.sign(compute_scores(states, komi, board_masks)).astype('int32')
+
+
+@_accepts_go_state
+def compute_territories(states: jnp.ndarray, board_masks: jnp.ndarray = None) -> jnp.ndarray:
+    """
+    Compute the black and white territories of the states.
+
+    A territory is the empty part of an area (see `compute_areas`). Every piece on the board is
+    considered alive.
+
+    :param states: a batch array of N Go games.
+    :param board_masks: an optional N x B x B boolean array of on-board points.
+    :return: an N x 2 x B x B boolean array of the black and white territories.
+    """
+    return compute_areas(states, board_masks) & ~jnp.expand_dims(
+        state_index.get_occupied_spaces(states), 1)
+
+
+def _compute_go_area_and_territory_scores(states: go_state.GoState, prisoners: jnp.ndarray = None,
+                                         komi=0., board_masks: jnp.ndarray = None) -> jnp.ndarray:
+    """The GoState form of `compute_area_and_territory_scores`, which counts its own prisoners."""
+    return compute_area_and_territory_scores(
+        go_state.from_go_state(states), states.prisoners if prisoners is None else prisoners,
+        komi, board_masks)
+
+
+@_go_state_form(_compute_go_area_and_territory_scores)
+def compute_area_and_territory_scores(states: jnp.ndarray, prisoners: jnp.ndarray = None,
+                                      komi=0., board_masks: jnp.ndarray = None) -> jnp.ndarray:
+    """
+    Computes the area and the territory scores from black's perspective with one flood fill.
+
+    The area (Chinese) score is black's area minus white's area minus the komi. The territory
+    (Japanese) score is black's territory plus the pieces black captured minus white's territory
+    minus the pieces white captured minus the komi.
+
+    :param states: a batch array of N Go games, or a GoState.
+    :param prisoners: an N x 2 integer array of the number of pieces captured by black and white
+    (see `next_states`). Defaults to the prisoners of a GoState, or to none.
+    :param komi: a scalar or an array of N floats with the points given to white in each game.
+    :param board_masks: an optional N x B x B boolean array of on-board points.
+    :return: an N x 2 float array of the area and territory scores.
+    """
+    areas = compute_areas(states, board_masks)
+    area_sizes = jnp.sum(areas, axis=(2, 3), dtype='float32')
+    territory_sizes = jnp.sum(areas & ~jnp.expand_dims(state_index.get_occupied_spaces(states), 1),
+                              axis=(2, 3), dtype='float32')
+    if prisoners is not None:
+        territory_sizes = territory_sizes + jnp.asarray(prisoners, dtype='float32')
+    komi = jnp.asarray(komi, dtype='float32')
+    return jnp.stack((area_sizes[:, 0] - area_sizes[:, 1] - komi,
+                      territory_sizes[:, 0] - territory_sizes[:, 1] - komi), axis=1)
+
+
+def compute_territory_scores(states: jnp.ndarray, prisoners: jnp.ndarray = None, komi=0.,
+                             board_masks: jnp.ndarray = None) -> jnp.ndarray:
+    """
+    Computes the territory (Japanese) scores from black's perspective.
+
+    The score is black's territory plus the pieces black captured minus white's territory minus
+    the pieces white captured minus the komi. Dead pieces are not removed.
+
+    :param states: a batch array of N Go games, or a GoState.
+    :param prisoners: an N x 2 integer array of the number of pieces captured by black and white
+    (see `next_states`). Defaults to the prisoners of a GoState, or to none.
+    :param komi: a scalar or an array of N floats with the points given to white in each game.
+    :param board_masks: an optional N x B x B boolean array of on-board points.
+    :return: an N float array.
+    """
+    return compute_area_and_territory_scores(states, prisoners, komi, board_masks)[:, 1]
+
+
+def _get_handicap_points(board_size: int) -> list:
+    """
+    Returns the fixed handicap points of the board in GTP placement order.
+
+    Like GTP, boards smaller than 7 have no handicap points, and boards with an even size or of
+    size 7 only have the corner points.
+
+    :param board_size: board size (B).
+    :return: a list of (row, col) tuples.
+    """
+    if board_size < 7:
+        return []
+    low = 2 if board_size < 13 else 3
+    high = board_size - 1 - low
+    mid = board_size // 2
+    corners = [(high, low), (low, high), (low, low), (high, high)]
+    if board_size % 2 == 0 or board_size == 7:
+        return corners
+    return corners + [(mid, low), (mid, high), (high, mid), (low, mid), (mid, mid)]
+
+
+def _get_handicap_tables(board_size: int) -> np.ndarray:
+    """
+    Returns the fixed handicap stone placements for each number of handicap stones.
 
+    :param board_size: board size (B).
+    :return: a (H + 1) x B x B boolean NumPy array, where the i-th entry has the i handicap stones.
+    """
+    points = _get_handicap_points(board_size)
+    # Orders in which the handicap points are used (GTP fixed_handicap).
+    if not points:
+        orders = [[], []]
+    elif len(points) == 4:
+        orders = [[], [], [0, 1], [0, 1, 2], [0, 1, 2, 3]]
+    else:
+        orders = [[], [], [0, 1], [0, 1, 2], [0, 1, 2, 3], [0, 1, 2, 3, 8], [0, 1, 2, 3, 4, 5],
+                  [0, 1, 2, 3, 4, 5, 8], [0, 1, 2, 3, 4, 5, 6, 7], [0, 1, 2, 3, 4, 5, 6, 7, 8]]
+    tables = np.zeros((len(orders), board_size, board_size), dtype=bool)
+    for num_stones, order in enumerate(orders):
+        for point_index in order:
+            tables[num_stones][points[point_index]] = True
+    return tables
+
+
+def _get_handicap_stones(board_size: int, handicaps: jnp.ndarray) -> \
+        Tuple[jnp.ndarray, jnp.ndarray]:
+    """Clips the handicaps to the board and returns them with N x B x B arrays of their stones."""
+    tables = _get_handicap_tables(board_size)
+    handicaps = jnp.clip(jnp.asarray(handicaps), 0, len(tables) - 1)
+    return handicaps, jnp.asarray(tables)[handicaps]
+
+
+def _set_go_handicaps(states: go_state.GoState, handicaps: jnp.ndarray) -> go_state.GoState:
+    """The GoState form of `set_handicaps`."""
+    handicaps, handicap_stones = _get_handicap_stones(states.board_shape[0], handicaps)
+    return states.replace(
+        pieces=states.pieces.at[:, constants.BLACK_CHANNEL_INDEX].set(
+            states.pieces[:, constants.BLACK_CHANNEL_INDEX] | handicap_stones),
+        turns=jnp.where(handicaps >= 2, constants.WHITES_TURN, states.turns))
+
+
+@_go_state_form(_set_go_handicaps)
+def set_handicaps(states: jnp.ndarray, handicaps: jnp.ndarray) -> jnp.ndarray:
+    """
+    Places fixed handicap stones for black and gives white the turn.
+
+    Uses the GTP fixed handicap placement. Handicaps below 2 leave the game unchanged. Handicaps
+    above the maximum for the board size (9, or 4 for even boards and 7 x 7 boards, or none for
+    boards smaller than 7 x 7) are clipped, so boards smaller than 7 x 7 never get handicaps.
+
+    :param states: a batch array of N new Go games, or a GoState.
+    :param handicaps: an integer array of N handicap stone counts.
+    :return: a batch array of N Go games, or a GoState.
+    """
+    handicaps, handicap_stones = _get_handicap_stones(states.shape[2], handicaps)
+    has_handicap = jnp.expand_dims(handicaps >= 2, (1, 2))
+    states = states.at[:, constants.BLACK_CHANNEL_INDEX].set(
+        states[:, constants.BLACK_CHANNEL_INDEX] | handicap_stones)
+    return states.at[:, constants.TURN_CHANNEL_INDEX].set(
+        jnp.where(has_handicap, constants.WHITES_TURN, states[:, constants.TURN_CHANNEL_INDEX]))
+
+
+def expand_cardinally(masks: jnp.ndarray) -> jnp.ndarray:
+    """
+    Expands masks by one point in all four cardinal directions.
+
+    :param masks: an M x B x B boolean array.
+    :return: an M x B x B boolean array of the masks and their cardinal neighbors.
+    """
+    padded = jnp.pad(masks, ((0, 0), (1, 1), (1, 1)))
+    return (masks | padded[:, :-2, 1:-1] | padded[:, 2:, 1:-1] | padded[:, 1:-1, :-2] |
+            padded[:, 1:-1, 2:])
 
-def compute_indicator_actions_are_invalid(states: jnp.ndarray, indicator_actions: jnp.ndarray) -> \
+
+# Jitted so that eager callers do not retrace the loop on every call.
+@jax.jit
+def _compute_neighbor_captures(piece_added: jnp.ndarray, rows: jnp.ndarray, cols: jnp.ndarray,
+                               passed: jnp.ndarray, turns: jnp.ndarray,
+                               board_masks: jnp.ndarray = None) -> Tuple[jnp.ndarray, jnp.ndarray]:
+    """
+    Computes the opponent pieces captured by the moves and whether the moves are suicides.
+
+    Only the groups touching a move can lose their last liberty, so instead of filling the free
+    groups of the whole board, the up to four opponent groups adjacent to the move and the group
+    of the move itself are flooded from their seed points, as 5 lanes per game. A lane stops
+    flooding as soon as it touches a liberty, so quiet moves resolve after a single expansion and
+    only groups that are really captured are flooded completely.
+
+    :param piece_added: a batch array of N Go games with the moves' pieces placed.
+    :param rows: an integer array of N move rows, or a scalar shared by all games.
+    :param cols: an integer array of N move columns, or a scalar shared by all games.
+    :param passed: a boolean array of length N indicating passes, or a scalar.
+    :param turns: a boolean array of length N of the players who moved.
+    :param board_masks: an optional N x B x B boolean array of on-board points.
+    :return: an N x B x B boolean array of the captured opponent pieces and a boolean array of
+    length N indicating whether the group of the move has no liberties and captured nothing.
+    """
+    batch_size, _, nrows, ncols = piece_added.shape
+    rows, cols, passed = (jnp.broadcast_to(array, (batch_size,)) for array in (rows, cols, passed))
+    opponent_pieces = state_index.get_pieces_per_turn(piece_added, ~turns)
+    player_pieces = state_index.get_pieces_per_turn(piece_added, turns)
+    empty_spaces = state_index.get_empty_spaces(piece_added)
+    if board_masks is not None:
+        empty_spaces = empty_spaces & board_masks
+
+    # Lanes 0-3 are the four neighbors of the move and lane 4 is the move itself.
+    moves = jnp.reshape(jax.nn.one_hot(jnp.where(passed, nrows * ncols, rows * ncols + cols),
+                                       nrows * ncols, dtype=bool), (batch_size, nrows, ncols))
+    padded_moves = jnp.pad(moves, ((0, 0), (1, 1), (1, 1)))
+    seeds = jnp.stack((padded_moves[:, 2:, 1:-1], padded_moves[:, :-2, 1:-1],
+                       padded_moves[:, 1:-1, 2:], padded_moves[:, 1:-1, :-2], moves), axis=1)
+    lane_pieces = jnp.stack((opponent_pieces,) * 4 + (player_pieces,), axis=1)
+    seeds = seeds & lane_pieces
+
+    def _flatten(array):
+        return jnp.reshape(array, (batch_size * 5, *array.shape[2:]))
+
+    def _expand_unresolved(carry_):
+        groups_, pieces_, empty_spaces_, free_, active_ = carry_
+        expanded = expand_cardinally(groups_)
+        free_ = free_ | (active_ & jnp.any(expanded & empty_spaces_, axis=(1, 2)))
+        next_groups = jnp.where(jnp.expand_dims(active_, (1, 2)), expanded & pieces_, groups_)
+        active_ = active_ & ~free_ & jnp.any(next_groups != groups_, axis=(1, 2))
+        return next_groups, pieces_, empty_spaces_, free_, active_
+
+    flat_seeds = _flatten(seeds)
+    groups, _, _, free, _ = lax.while_loop(lambda carry_: jnp.any(carry_[4]), _expand_unresolved, (
+        flat_seeds, _flatten(lane_pieces),
+        _flatten(jnp.broadcast_to(jnp.expand_dims(empty_spaces, 1), seeds.shape)),
+        jnp.zeros(len(flat_seeds), dtype=bool), jnp.any(flat_seeds, axis=(1, 2))))
+    groups = jnp.reshape(groups, seeds.shape)
+    free = jnp.reshape(free, (batch_size, 5))
+
+    has_seed = jnp.any(seeds, axis=(2, 3))
+    captured_lanes = has_seed[:, :4] & ~free[:, :4]
+    captured = jnp.any(groups[:, :4] & jnp.expand_dims(captured_lanes, (2, 3)), axis=1)
+    suicides = has_seed[:, 4] & ~free[:, 4] & ~jnp.any(captured_lanes, axis=1)
+    return captured, suicides
+
+
+@jax.named_scope('compute_indicator_actions_are_invalid')
+def compute_indicator_actions_are_invalid(states: jnp.ndarray, indicator_actions: jnp.ndarray,
+                                          board_masks: jnp.ndarray = None) -> \
         Tuple[jnp.ndarray, jnp.ndarray]:
     """
     Computes whether the given actions are valid for each state.
@@ -149,61 +593,59 @@ def compute_indicator_actions_are_invalid(states: jnp.ndarray, indicator_actions
     An action is invalid if any of the following are met:
     • The space is occupied by a piece.
     • The action does not remove any opponent groups and the resulting group has no liberties.
-    • The move is blocked by Komi.
+    • The move is blocked by Ko.
 
-    Komi is defined as a special type of invalid move where the following criteria are met:
+    Ko is defined as a special type of invalid move where the following criteria are met:
     • The previous move by the opponent killed exactly one of our pieces.
     • The move would 'revive' said single killed piece, that is the move is the same location
     where our piece died.
     • The move would kill exactly one of the opponent's pieces.
 
+    The indicator actions are converted with `action_indicator_to_1d` and checked by
+    `compute_actions1d_are_invalid`, so both action encodings share one pipeline.
+
     :param states: a batch array of N Go games.
     :param indicator_actions: an N x B x B partial one-hot boolean array of actions.
-    the action would be `row x B + col`. The actions are in 1D form so that this function can be
-    `jax.vmap`-ed.
+    :param board_masks: an optional N x B x B boolean array of on-board points (see
+    `new_board_masks`). Actions off the board are invalid.
     :return:
         • a boolean array of length N indicating whether the moves are invalid,
         • a batch array of N partial next Go states with the piece set, opponents removed,
         and killed channel set.
             • would need to update the turn, pass, and end channels.
     """
-    turns = state_index.get_turns(states)
-    opponents = ~turns
-    piece_added = state_index.at_pieces_per_turn(states, turns).set(
-        indicator_actions | state_index.get_pieces_per_turn(states, turns))
-    piece_added_and_opponents_removed = state_index.at_pieces_per_turn(piece_added, opponents).set(
-        compute_free_groups(piece_added, opponents))
-    ghost_killed = jnp.logical_xor(state_index.get_pieces_per_turn(piece_added, opponents),
-                                   state_index.get_pieces_per_turn(
-                                       piece_added_and_opponents_removed, opponents))
-    previously_killed_pieces = states[:, constants.KILLED_CHANNEL_INDEX]
-    num_casualties = jnp.sum(previously_killed_pieces, axis=(1, 2))
-    num_ghost_kills = jnp.sum(ghost_killed, axis=(1, 2))
-    komi = (num_ghost_kills == 1) & jnp.sum(previously_killed_pieces & indicator_actions,
-                                            axis=(1, 2)) & (num_casualties == 1)
-    occupied = jnp.sum(
-        jnp.sum(states[:, [constants.BLACK_CHANNEL_INDEX, constants.WHITE_CHANNEL_INDEX]], axis=1,
-                dtype=bool) & indicator_actions, axis=(1, 2))
-    no_liberties = jnp.sum(
-        jnp.logical_xor(compute_free_groups(piece_added_and_opponents_removed, turns),
-                        state_index.get_pieces_per_turn(piece_added_and_opponents_removed, turns)),
-        axis=(1, 2), dtype=bool)
-
-    partial_next_states = piece_added_and_opponents_removed.at[:,
-                          constants.KILLED_CHANNEL_INDEX].set(ghost_killed)
-    return jnp.logical_or(jnp.logical_or(occupied, no_liberties), komi), partial_next_states
-
-
-def compute_actions1d_are_invalid(states: jnp.ndarray, actions_1d: jnp.ndarray) -> Tuple[jnp.ndarray, jnp.ndarray]:
+    return compute_actions1d_are_invalid(states,
+                                         state_index.action_indicator_to_1d(indicator_actions),
+                                         board_masks)
+
+
+def _compute_go_actions1d_are_invalid(states: go_state.GoState, actions_1d: jnp.ndarray,
+                                      board_masks: jnp.ndarray = None) -> \
+        Tuple[jnp.ndarray, go_state.GoState]:
+    """The GoState form of `compute_actions1d_are_invalid`."""
+    invalid_actions, pieces, killed = _play_pieces(states.pieces, states.turns, states.ko_points,
+                                                   actions_1d, board_masks)
+    num_killed = jnp.sum(killed, axis=(1, 2), dtype='int32')
+    prisoners = states.prisoners.at[jnp.arange(len(pieces)), states.turns.astype('uint8')].add(
+        num_killed)
+    return invalid_actions, states.replace(pieces=pieces, ko_points=go_state.get_ko_points(killed),
+                                           prisoners=prisoners)
+
+
+@jax.named_scope('compute_actions1d_are_invalid')
+@_go_state_form(_compute_go_actions1d_are_invalid)
+def compute_actions1d_are_invalid(states: jnp.ndarray, actions_1d: jnp.ndarray,
+                                  board_masks: jnp.ndarray = None) -> \
+        Tuple[jnp.ndarray, jnp.ndarray]:
     """
     Computes whether the given actions are valid for each state.
 
     An action is invalid if any of the following are met:
     • The space is occupied by a piece.
     • The action does not remove any opponent groups and the resulting group has no liberties.
-    • The move is blocked by Komi.
+    • The move is blocked by Ko.
 
-    Komi is defined as a special type of invalid move where the following criteria are met:
+    Ko is defined as a special type of invalid move where the following criteria are met:
     • The previous move by the opponent killed exactly one of our pieces.
     • The move would 'revive' said single killed piece, that is the move is the same location
     where our piece died.
@@ -215,144 +657,474 @@ def compute_actions1d_are_invalid(states: jnp.ndarray, actions_1d: jnp.ndarray)
     the action would be `row x B + col`. The actions are in 1D form so that this function can be
     `jax.vmap`-ed.
     previous state.
-    :return: a boolean array of length N indicating whether the moves are invalid.
-    """
-    rows = jnp.floor_divide(actions_1d, states.shape[2])
-    cols = jnp.remainder(actions_1d, states.shape[3])
-    n_indices = jnp.arange(len(states))
-    passed = (actions_1d == np.prod(states.shape[-2:]))
-    turns = state_index.get_turns(states)
-    opponents = ~turns
-    turn_idcs = turns.astype('uint8')
-    piece_added = states.at[n_indices, turn_idcs, rows, cols].set(~passed)
-    piece_added_and_opponents_removed = state_index.at_pieces_per_turn(piece_added, opponents).set(
-        compute_free_groups(piece_added, opponents))
-    ghost_killed = jnp.logical_xor(state_index.get_pieces_per_turn(piece_added, opponents),
-                                   state_index.get_pieces_per_turn(
-                                       piece_added_and_opponents_removed, opponents))
-    previously_killed_pieces = states[:, constants.KILLED_CHANNEL_INDEX]
-    num_casualties = jnp.sum(previously_killed_pieces, axis=(1, 2))
-    num_ghost_kills = jnp.sum(ghost_killed, axis=(1, 2))
-    komi = (num_ghost_kills == 1) & previously_killed_pieces[n_indices, rows, cols] & ~passed & (
-            num_casualties == 1)
-    occupied = \
-        jnp.sum(states[:, [constants.BLACK_CHANNEL_INDEX, constants.WHITE_CHANNEL_INDEX]], axis=1,
-                dtype=bool)[n_indices, rows, cols] & ~passed
-    no_liberties = jnp.sum(
-        jnp.logical_xor(compute_free_groups(piece_added_and_opponents_removed, turns),
-                        state_index.get_pieces_per_turn(piece_added_and_opponents_removed, turns)),
-        axis=(1, 2), dtype=bool)
-    partial_next_states = piece_added_and_opponents_removed.at[:,
-                          constants.KILLED_CHANNEL_INDEX].set(ghost_killed)
-    return jnp.logical_or(jnp.logical_or(occupied, no_liberties), komi), partial_next_states
-
-
-def compute_invalid_actions(states: jnp.ndarray) -> jnp.ndarray:
+    :param board_masks: an optional N x B x B boolean array of on-board points (see
+    `new_board_masks`). Actions off the board are invalid. Padded games still index actions on
+    the full B x B board, so passing is always `B^2`.
+    :return: a boolean array of length N indicating whether the moves are invalid, and the
+    partial next states with the pieces placed, opponents removed and killed channel set. A
+    GoState also gets its ko points and prisoners updated, but not its turns, passes, ended flags
+    or move numbers.
+    """
+    pieces = states[:, (constants.BLACK_CHANNEL_INDEX, constants.WHITE_CHANNEL_INDEX)]
+    with jax.named_scope('ko_points'):
+        ko_points = go_state.get_ko_points(states[:, constants.KILLED_CHANNEL_INDEX])
+    invalid_actions, pieces, killed = _play_pieces(pieces, state_index.get_turns(states),
+                                                   ko_points, actions_1d, board_masks)
+    partial_next_states = states.at[:, (constants.BLACK_CHANNEL_INDEX,
+                                        constants.WHITE_CHANNEL_INDEX)].set(pieces)
+    return invalid_actions, partial_next_states.at[:, constants.KILLED_CHANNEL_INDEX].set(killed)
+
+
+def _play_pieces(pieces: jnp.ndarray, turns: jnp.ndarray, ko_points: jnp.ndarray,
+                 actions_1d: jnp.ndarray, board_masks: jnp.ndarray = None) -> \
+        Tuple[jnp.ndarray, jnp.ndarray, jnp.ndarray]:
+    """
+    The step engine shared by the array and GoState forms of `compute_actions1d_are_invalid`.
+
+    :param pieces: an N x 2 x B x B boolean array of the black and white pieces.
+    :param turns: a boolean array of length N indicating whose turn it is.
+    :param ko_points: an integer array of N 1D points of the single piece the previous move
+    killed, or B^2.
+    :param actions_1d: an integer array of N actions in range [0, B^2], or a scalar action.
+    :param board_masks: an optional N x B x B boolean array of on-board points.
+    :return: a boolean array of length N indicating whether the moves are invalid, the N x 2 x B x
+    B pieces with the moves played and the captured pieces removed, and an N x B x B boolean
+    array of the captured pieces.
+    """
+    with jax.named_scope('place_piece'):
+        rows = jnp.floor_divide(actions_1d, pieces.shape[2])
+        cols = jnp.remainder(actions_1d, pieces.shape[3])
+        n_indices = jnp.arange(len(pieces))
+        passed = (actions_1d == np.prod(pieces.shape[-2:]))
+        opponents = ~turns
+        turn_idcs = turns.astype('uint8')
+        piece_added = pieces.at[n_indices, turn_idcs, rows, cols].set(~passed)
+    with jax.named_scope('neighbor_captures'):
+        killed, no_liberties = _compute_neighbor_captures(piece_added, rows, cols, passed, turns,
+                                                          board_masks)
+        next_pieces = state_index.at_pieces_per_turn(piece_added, opponents).set(
+            state_index.get_pieces_per_turn(piece_added, opponents) & ~killed)
+    with jax.named_scope('ko'):
+        ko = (jnp.sum(killed, axis=(1, 2)) == 1) & (actions_1d == ko_points) & ~passed
+    with jax.named_scope('occupied'):
+        occupied = jnp.any(pieces, axis=1)[n_indices, rows, cols] & ~passed
+        if board_masks is not None:
+            occupied = occupied | (~board_masks[n_indices, rows, cols] & ~passed)
+    return occupied | no_liberties | ko, next_pieces, killed
+
+
+@jax.named_scope('compute_invalid_actions')
+@_accepts_go_state
+def compute_invalid_actions(states: jnp.ndarray, board_masks: jnp.ndarray = None) -> jnp.ndarray:
     """
     Computes the invalid moves for the turns of each state.
 
     :param states: a batch of N Go games.
+    :param board_masks: an optional N x B x B boolean array of on-board points.
     :return: an N x B x B indicator array of invalid moves.
     """
 
-    invalid_moves, _ = jax.vmap(compute_actions1d_are_invalid, (None, 0), 1)(states, jnp.arange(
-        states.shape[2] * states.shape[3]))
+    invalid_moves, _ = jax.vmap(compute_actions1d_are_invalid, (None, 0, None), 1)(
+        states, jnp.arange(states.shape[2] * states.shape[3]), board_masks)
     return jnp.reshape(invalid_moves, (states.shape[0], states.shape[2], states.shape[3]))
 
 
-def next_states_legacy(states: jnp.ndarray, indicator_actions: jnp.ndarray) -> jnp.ndarray:
+@_accepts_go_state
+def compute_legal_actions1d(states: jnp.ndarray, board_masks: jnp.ndarray = None) -> jnp.ndarray:
+    """
+    Computes the legal 1D actions for the turns of each state.
+
+    Passing is always legal.
+
+    :param states: a batch of N Go games.
+    :param board_masks: an optional N x B x B boolean array of on-board points.
+    :return: an N x A boolean array.
+    """
+    invalid_actions = jnp.reshape(compute_invalid_actions(states, board_masks), (len(states), -1))
+    return jnp.concatenate((~invalid_actions, jnp.ones((len(states), 1), dtype=bool)), axis=1)
+
+
+@jax.named_scope('next_states_legacy')
+def next_states_legacy(states: jnp.ndarray, indicator_actions: jnp.ndarray,
+                       board_masks: jnp.ndarray = None) -> jnp.ndarray:
     """
     Compute the next batch of states in Go.
 
+    Equivalent to `next_states` on the actions converted with `action_indicator_to_1d`.
+
     :param states: a batch array of N Go games.
     :param indicator_actions: A (N x B x B) indicator array. For each state
     in the batch, there should be at most one non-zero element representing the move. If all
     elements are 0,
     then it's considered a pass.
+    :param board_masks: an optional N x B x B boolean array of on-board points.
     :return: an N x C x B x B boolean array.
     """
-    invalid_actions, partial_next_states = compute_indicator_actions_are_invalid(states,
-                                                                                 indicator_actions)
-
-    # Set turn, pass, and end channels.
-    partial_next_states = change_turns(partial_next_states)
-    previously_passed = jnp.alltrue(partial_next_states[:, constants.PASS_CHANNEL_INDEX],
-                                    axis=(1, 2), keepdims=True)
-    passed = jnp.alltrue(~indicator_actions, axis=(1, 2), keepdims=True)
-    partial_next_states = partial_next_states.at[:, constants.PASS_CHANNEL_INDEX].set(passed)
-    next_states_ = partial_next_states.at[:, constants.END_CHANNEL_INDEX].set(
-        previously_passed & passed)
-
-    # If the action is invalid or the game ended, set the move to pass, otherwise return what
-    # would be the next state.
-    return jnp.where(jnp.expand_dims(invalid_actions | state_index.get_ended(states), (1, 2, 3)),
-                     change_turns(states).at[:, constants.PASS_CHANNEL_INDEX].set(True),
-                     next_states_)
+    return next_states(states, state_index.action_indicator_to_1d(indicator_actions), board_masks)
 
 
-def next_states(states: jnp.ndarray, actions_1d: jnp.ndarray) -> jnp.ndarray:
+class UndoRecord(NamedTuple):
     """
-    Compute the next batch of states in Go.
+    What `undo_states` needs to restore the parents of N states produced by `next_states`.
+
+    actions_1d: an int32 array of N 1D points where a piece was placed, or B^2 if the move was a
+    pass, invalid or played in an ended game.
+    captured: an N x ceil(B x B / 8) uint8 array of the packed bits of the captured pieces.
+    killed: an N x ceil(B x B / 8) uint8 array of the packed bits of the parents' killed planes,
+    which for a GoState only hold the ko point.
+    turns: a boolean array of the N parents' turns.
+    passes: a boolean array of the N parents' pass flags.
+    ended: a boolean array of the N parents' end flags.
+    """
+    actions_1d: jnp.ndarray
+    captured: jnp.ndarray
+    killed: jnp.ndarray
+    turns: jnp.ndarray
+    passes: jnp.ndarray
+    ended: jnp.ndarray
+
+
+def _pack_planes(planes: jnp.ndarray) -> jnp.ndarray:
+    return jnp.packbits(jnp.reshape(planes, (len(planes), -1)), axis=1)
+
+
+def _unpack_planes(packed_planes: jnp.ndarray, board_shape: Tuple[int, int]) -> jnp.ndarray:
+    return jnp.reshape(jnp.unpackbits(packed_planes, axis=1, count=np.prod(board_shape)),
+                       (len(packed_planes), *board_shape)).astype(bool)
+
+
+def _where_games(conditions: jnp.ndarray, states, other_states):
+    """Picks every game from `states` where the condition holds and from `other_states` else."""
+    return jax.tree_util.tree_map(
+        lambda x, y: jnp.where(jnp.reshape(conditions, (-1,) + (1,) * (x.ndim - 1)), x, y),
+        states, other_states)
+
+
+def _get_undo_record(states, actions_1d: jnp.ndarray, use_fallback: jnp.ndarray,
+                     captured: jnp.ndarray, killed: jnp.ndarray) -> UndoRecord:
+    """Packs the UndoRecord of moves from a batch array of Go games or a GoState."""
+    pass_action = state_index.get_action_size(states) - 1
+    return UndoRecord(actions_1d=jnp.where(use_fallback, pass_action, actions_1d).astype('int32'),
+                      captured=_pack_planes(captured), killed=_pack_planes(killed),
+                      turns=state_index.get_turns(states), passes=state_index.get_passes(states),
+                      ended=state_index.get_ended(states))
+
+
+def _play_go_moves(states: go_state.GoState, actions_1d: jnp.ndarray,
+                   board_masks: jnp.ndarray = None) -> Tuple[go_state.GoState, jnp.ndarray]:
+    """The GoState form of `_play_moves`, which reads its flags as scalars."""
+    invalid_actions, partial_next_states = compute_actions1d_are_invalid(states, actions_1d,
+                                                                         board_masks)
+    passed = actions_1d == np.prod(states.board_shape)
+    move_numbers = states.move_numbers + ~states.ended
+    next_states_ = partial_next_states.replace(turns=~states.turns, passes=passed,
+                                               ended=states.passes & passed,
+                                               move_numbers=move_numbers)
+    # Invalid actions and ended games equate to passes that keep everything else.
+    fallback_states = states.replace(turns=~states.turns,
+                                     passes=jnp.ones_like(states.passes),
+                                     move_numbers=move_numbers)
+    use_fallback = invalid_actions | states.ended
+    return _where_games(use_fallback, fallback_states, next_states_), use_fallback
+
+
+@_go_state_form(_play_go_moves)
+def _play_moves(states: jnp.ndarray, actions_1d: jnp.ndarray, board_masks: jnp.ndarray = None):
+    """
+    The step engine of `next_states` and `get_children`.
 
-    :param states: a batch array of N Go games.
-    :param actions_1d: An array of N integers in range [0, B^2].
-    :return: an N x C x B x B boolean array.
+    :return: the next states, and a boolean array of the N moves that equate to passes that keep
+    everything but the turn because they were invalid or their game ended.
     """
-    invalid_actions, partial_next_states = compute_actions1d_are_invalid(states, actions_1d)
+    invalid_actions, partial_next_states = compute_actions1d_are_invalid(states, actions_1d,
+                                                                         board_masks)
 
     # Set turn, pass, and end channels.
-    partial_next_states = change_turns(partial_next_states)
-    previously_passed = jnp.alltrue(partial_next_states[:, constants.PASS_CHANNEL_INDEX],
-                                    axis=(1, 2), keepdims=True)
-    passed = jnp.expand_dims(actions_1d == np.prod(states.shape[-2:]), (1, 2))
-    partial_next_states = partial_next_states.at[:, constants.PASS_CHANNEL_INDEX].set(passed)
-    next_states_ = partial_next_states.at[:, constants.END_CHANNEL_INDEX].set(
-        previously_passed & passed)
+    with jax.named_scope('update_flags'):
+        partial_next_states = change_turns(partial_next_states)
+        previously_passed = jnp.expand_dims(state_index.get_passes(partial_next_states), (1, 2))
+        passed = jnp.expand_dims(actions_1d == np.prod(states.shape[-2:]), (1, 2))
+        partial_next_states = partial_next_states.at[:, constants.PASS_CHANNEL_INDEX].set(passed)
+        next_states_ = partial_next_states.at[:, constants.END_CHANNEL_INDEX].set(
+            previously_passed & passed)
 
     # If the action is invalid or the game ended, set the move to pass, otherwise return what
     # would be the next state.
-    return jnp.where(jnp.expand_dims(invalid_actions | state_index.get_ended(states), (1, 2, 3)),
-                     change_turns(states).at[:, constants.PASS_CHANNEL_INDEX].set(True),
-                     next_states_)
+    with jax.named_scope('invalid_fallback'):
+        use_fallback = invalid_actions | state_index.get_ended(states)
+        next_states_ = jnp.where(
+            jnp.expand_dims(use_fallback, (1, 2, 3)),
+            change_turns(states).at[:, constants.PASS_CHANNEL_INDEX].set(True), next_states_)
+    return next_states_, use_fallback
+
+
+def _next_go_states(states: go_state.GoState, actions_1d: jnp.ndarray,
+                    board_masks: jnp.ndarray = None, prisoners: jnp.ndarray = None,
+                    return_undo: bool = False):
+    """The GoState form of `next_states`, which accumulates its own prisoners."""
+    if prisoners is not None:
+        raise ValueError('A GoState accumulates its own prisoners.')
+    next_states_, use_fallback = _play_moves(states, actions_1d, board_masks)
+    if not return_undo:
+        return next_states_
+    with jax.named_scope('undo_record'):
+        n_indices = jnp.arange(len(states.turns))
+        opponents = (~states.turns).astype('uint8')
+        captured = states.pieces[n_indices, opponents] & ~next_states_.pieces[n_indices, opponents]
+        killed = jax.nn.one_hot(states.ko_points, np.prod(states.board_shape), dtype=bool)
+        return next_states_, _get_undo_record(states, actions_1d, use_fallback, captured, killed)
+
+
+@jax.named_scope('next_states')
+@_go_state_form(_next_go_states)
+def next_states(states: jnp.ndarray, actions_1d: jnp.ndarray, board_masks: jnp.ndarray = None,
+                prisoners: jnp.ndarray = None, return_undo: bool = False):
+    """
+    Compute the next batch of states in Go.
 
+    :param states: a batch array of N Go games, or a GoState.
+    :param actions_1d: An array of N integers in range [0, B^2].
+    :param board_masks: an optional N x B x B boolean array of on-board points (see
+    `new_board_masks`). Off-board actions are invalid and equate to passes.
+    :param prisoners: an optional N x 2 integer array of the number of pieces captured by black
+    and white so far, for territory scoring. A GoState accumulates its own prisoners instead.
+    :param return_undo: whether to also return an UndoRecord to restore the states with
+    `undo_states`.
+    :return: an N x C x B x B boolean array, or a GoState if the states are a GoState. If
+    prisoners are given, also the prisoners with the pieces captured by the moves added. If
+    `return_undo` is True, also an UndoRecord.
+    """
+    next_states_, use_fallback = _play_moves(states, actions_1d, board_masks)
+    # The killed plane of a played move holds its captures.
+    captured = next_states_[:, constants.KILLED_CHANNEL_INDEX] & jnp.expand_dims(~use_fallback,
+                                                                                  (1, 2))
+    outputs = (next_states_,)
+    if prisoners is not None:
+        with jax.named_scope('count_prisoners'):
+            num_captured = jnp.sum(captured, axis=(1, 2), dtype='int32')
+            turns = state_index.get_turns(states).astype('uint8')
+            next_prisoners = jnp.asarray(prisoners, dtype='int32').at[
+                jnp.arange(len(states)), turns].add(num_captured)
+        outputs += (next_prisoners,)
+    if return_undo:
+        with jax.named_scope('undo_record'):
+            outputs += (_get_undo_record(states, actions_1d, use_fallback, captured,
+                                         states[:, constants.KILLED_CHANNEL_INDEX]),)
+    return outputs[0] if len(outputs) == 1 else outputs
+
+
+def _undo_pieces(pieces: jnp.ndarray, undo_records: UndoRecord) -> \
+        Tuple[jnp.ndarray, jnp.ndarray]:
+    """
+    Takes back the placed pieces and restores the captured ones.
 
-def get_children(states: jnp.ndarray) -> jnp.ndarray:
+    :param pieces: an N x 2 x B x B boolean array of the black and white pieces.
+    :param undo_records: an UndoRecord of N moves.
+    :return: the N x 2 x B x B pieces of the parents, and an N x B x B boolean array of the
+    restored pieces.
+    """
+    n_indices = jnp.arange(len(pieces))
+    movers = undo_records.turns.astype('uint8')
+    rows, cols = jnp.divmod(undo_records.actions_1d, pieces.shape[3])
+    captured = _unpack_planes(undo_records.captured, pieces.shape[2:])
+    # Passes index past the last row, so their removals are dropped.
+    pieces = pieces.at[n_indices, movers, rows, cols].set(False, mode='drop')
+    return pieces.at[n_indices, 1 - movers].set(pieces[n_indices, 1 - movers] | captured), captured
+
+
+def _undo_go_states(states: go_state.GoState, undo_records: UndoRecord,
+                    prisoners: jnp.ndarray = None) -> go_state.GoState:
+    """The GoState form of `undo_states`, which restores its own prisoners and move numbers."""
+    if prisoners is not None:
+        raise ValueError('A GoState accumulates its own prisoners.')
+    pieces, captured = _undo_pieces(states.pieces, undo_records)
+    killed = _unpack_planes(undo_records.killed, states.board_shape)
+    return states.replace(
+        pieces=pieces, turns=undo_records.turns, passes=undo_records.passes,
+        ended=undo_records.ended, ko_points=go_state.get_ko_points(killed),
+        move_numbers=states.move_numbers - ~undo_records.ended,
+        prisoners=states.prisoners.at[jnp.arange(len(pieces)), undo_records.turns.astype(
+            'uint8')].add(-jnp.sum(captured, axis=(1, 2), dtype='int32')))
+
+
+@jax.named_scope('undo_states')
+@_go_state_form(_undo_go_states)
+def undo_states(states: jnp.ndarray, undo_records: UndoRecord, prisoners: jnp.ndarray = None):
+    """
+    Restores the exact parents of states produced by `next_states(..., return_undo=True)`.
+
+    :param states: a batch array of N Go games, or a GoState, which restores its own prisoners
+    and move numbers.
+    :param undo_records: the UndoRecord `next_states` returned with the states.
+    :param prisoners: an optional N x 2 integer array of prisoners to remove the captures from.
+    :return: a batch array of the N parent games or a GoState, and the prisoners before the moves
+    if given.
+    """
+    batch_size, _, nrows, ncols = states.shape
+    pieces, captured = _undo_pieces(
+        states[:, (constants.BLACK_CHANNEL_INDEX, constants.WHITE_CHANNEL_INDEX)], undo_records)
+
+    def _plane(flags):
+        return jnp.broadcast_to(jnp.reshape(flags, (batch_size, 1, 1)), (batch_size, nrows, ncols))
+
+    parents = states.at[:, (constants.BLACK_CHANNEL_INDEX, constants.WHITE_CHANNEL_INDEX)].set(
+        pieces)
+    parents = parents.at[:, constants.TURN_CHANNEL_INDEX].set(_plane(undo_records.turns))
+    parents = parents.at[:, constants.KILLED_CHANNEL_INDEX].set(
+        _unpack_planes(undo_records.killed, (nrows, ncols)))
+    parents = parents.at[:, constants.PASS_CHANNEL_INDEX].set(_plane(undo_records.passes))
+    parents = parents.at[:, constants.END_CHANNEL_INDEX].set(_plane(undo_records.ended))
+    if prisoners is None:
+        return parents
+    return parents, jnp.asarray(prisoners, dtype='int32').at[
+        jnp.arange(batch_size), undo_records.turns.astype('uint8')].add(
+        -jnp.sum(captured, axis=(1, 2), dtype='int32'))
+
+
+def _get_words(packed_states: jnp.ndarray) -> jnp.ndarray:
+    """Joins the bytes of packed states into an N x ceil(num_bytes / 4) uint32 array."""
+    num_bytes = packed_states.shape[1]
+    packed_states = jnp.pad(packed_states, ((0, 0), (0, -num_bytes % 4))).astype('uint32')
+    return jnp.sum(jnp.reshape(packed_states, (len(packed_states), -1, 4)) << jnp.array(
+        [0, 8, 16, 24], dtype='uint32'), axis=2, dtype='uint32')
+
+
+def _hash_words(words: jnp.ndarray, multiplier: int) -> jnp.ndarray:
+    """Hashes the words of packed states into uint32s with a mixed polynomial hash."""
+    words = (words ^ (words >> 16)) * jnp.uint32(0x45d9f3b)
+    words = words ^ (words >> 16)
+    powers = jnp.cumprod(jnp.full(words.shape[1], multiplier, dtype='uint32'), dtype='uint32')
+    return jnp.sum(words * powers, axis=1, dtype='uint32')
+
+
+def _pack_go_games(states: go_state.GoState) -> jnp.ndarray:
+    """The GoState form of `_pack_games`, which packs all of its fields."""
+    rows = []
+    for leaf in jax.tree_util.tree_leaves(states):
+        leaf = jnp.reshape(leaf, (len(leaf), -1))
+        if leaf.dtype == bool:
+            rows.append(jnp.packbits(leaf, axis=1))
+        else:
+            rows.append(jnp.reshape(lax.bitcast_convert_type(leaf, jnp.uint8), (len(leaf), -1)))
+    return jnp.concatenate(rows, axis=1)
+
+
+@_go_state_form(_pack_go_games)
+def _pack_games(states: jnp.ndarray) -> jnp.ndarray:
+    """Packs every game into a row of bytes, so that equal rows mean equal games."""
+    return state_index.pack_states(states)
+
+
+@jax.named_scope('dedupe_states')
+def dedupe_states(states: jnp.ndarray) -> Tuple[jnp.ndarray, jnp.ndarray, jnp.ndarray,
+                                                jnp.ndarray]:
+    """
+    Finds the unique states of a batch.
+
+    States are sorted by two 32-bit hashes and then by their exact bits, so equal states are
+    always adjacent and neighbors are compared exactly. Distinct states are never merged and
+    equal states are always merged, even if hashes collide. The outputs have a fixed size so this
+    can be jitted: only the first `num_unique` unique states and counts are valid, and the rest
+    are padding.
+
+    Evaluate a function on the unique states only and scatter the results back with
+    `unique_values[inverse_indices]`.
+
+    :param states: a batch array of N Go games, or a GoState, whose games are equal only if all
+    their fields are.
+    :return: a batch array of N Go games (or a GoState) whose first `num_unique` games are the
+    unique states, an integer array of N indices of the unique state of every game, an integer
+    array of N counts of every unique state, and the scalar number of unique states.
+    """
+    packed_states = _pack_games(states)
+    batch_size = len(packed_states)
+    words = _get_words(packed_states)
+    # lexsort sorts by the last key first, so the exact words only break hash ties.
+    order = jnp.lexsort(tuple(words.T) + (_hash_words(words, 0x01000193),
+                                          _hash_words(words, 0x9e3779b1)))
+    sorted_packed_states = packed_states[order]
+    new_groups = jnp.concatenate((jnp.ones(1, dtype=bool), jnp.any(
+        sorted_packed_states[1:] != sorted_packed_states[:-1], axis=1)))
+    sorted_group_ids = jnp.cumsum(new_groups) - 1
+    inverse_indices = jnp.zeros(batch_size, dtype=sorted_group_ids.dtype).at[order].set(
+        sorted_group_ids)
+    first_indices = jnp.full(batch_size, batch_size - 1, dtype=order.dtype).at[
+        sorted_group_ids].min(order)
+    counts = jnp.zeros(batch_size, dtype='int32').at[sorted_group_ids].add(1)
+    unique_states = jax.tree_util.tree_map(lambda x: x[first_indices], states)
+    return unique_states, inverse_indices, counts, sorted_group_ids[-1] + 1
+
+
+@jax.named_scope('get_children')
+def get_children(states: jnp.ndarray, board_masks: jnp.ndarray = None, dedupe: bool = False):
     """
     Compute all next states for every state.
 
     Invalid moves equate to passes.
 
-    :param states: an N x C x B x B boolean array.
-    :return: an N x A x C x B x B boolean array.
+    :param states: an N x C x B x B boolean array, or a GoState of N games.
+    :param board_masks: an optional N x B x B boolean array of on-board points.
+    :param dedupe: whether to play invalid moves as actual passes and return only the unique
+    children of the whole batch (see `dedupe_states`).
+    :return: an N x A x C x B x B boolean array, or a GoState whose fields have an N x A leading
+    shape. If `dedupe` is True, a batch array of N x A Go games (or a GoState) whose first
+    `num_unique` games are the unique children, an N x A integer array of the index of the
+    unique child of every action, an integer array of N x A counts of the unique children, and
+    the scalar number of unique children.
     """
-    batch_size = len(states)
+    batch_size = len(state_index.get_turns(states))
     action_size = state_index.get_action_size(states)
-    all_actions_1d = jnp.arange(action_size)
-    all_actions_1d = jnp.repeat(jnp.expand_dims(all_actions_1d, axis=0), batch_size, axis=0)
-    states = jnp.repeat(jnp.expand_dims(states, axis=1), action_size, axis=1)
-    state_shape = states.shape[-3:]
-    flattened_states = jnp.reshape(states, (batch_size * action_size, *state_shape))
-    flattened_all_actions_1d = jnp.reshape(all_actions_1d, batch_size * action_size)
-    flattened_children = next_states(flattened_states, flattened_all_actions_1d)
-    return jnp.reshape(flattened_children, (batch_size, action_size, *state_shape))
-
-
+    flattened_all_actions_1d = jnp.tile(jnp.arange(action_size), batch_size)
+    flattened_states = jax.tree_util.tree_map(lambda x: jnp.repeat(x, action_size, axis=0),
+                                              states)
+    flattened_board_masks = None
+    if board_masks is not None:
+        flattened_board_masks = jnp.repeat(board_masks, action_size, axis=0)
+    flattened_children, use_fallback = _play_moves(flattened_states, flattened_all_actions_1d,
+                                                   flattened_board_masks)
+    if dedupe:
+        # Invalid moves keep the parent's killed plane and end flag, so swap them for the real
+        # pass child, which is the last child of every game.
+        pass_children = jax.tree_util.tree_map(
+            lambda x: jnp.repeat(x[action_size - 1::action_size], action_size, axis=0),
+            flattened_children)
+        unique_children, inverse_indices, counts, num_unique = dedupe_states(
+            _where_games(use_fallback, pass_children, flattened_children))
+        return unique_children, jnp.reshape(inverse_indices, (batch_size, action_size)), counts, \
+            num_unique
+    return jax.tree_util.tree_map(
+        lambda x: jnp.reshape(x, (batch_size, action_size, *x.shape[1:])), flattened_children)
+
+
+def _change_go_turns(states: go_state.GoState) -> go_state.GoState:
+    """The GoState form of `change_turns`."""
+    return states.replace(turns=~states.turns)
+
+
+@_go_state_form(_change_go_turns)
 def change_turns(states: jnp.ndarray) -> jnp.ndarray:
     """
     Changes the turn for each state in states.
 
-    :param states: a batch array of N Go games.
-    :return: a boolean array with the same shape as states.
+    :param states: a batch array of N Go games, or a GoState.
+    :return: a boolean array with the same shape as states, or a GoState.
     """
     return states.at[:, constants.TURN_CHANNEL_INDEX].set(~states[:, constants.TURN_CHANNEL_INDEX])
 
 
+def _swap_go_perspectives(states: go_state.GoState) -> go_state.GoState:
+    """The GoState form of `swap_perspectives`, which swaps the prisoners too."""
+    return states.replace(pieces=states.pieces[:, ::-1], turns=~states.turns,
+                          prisoners=states.prisoners[:, ::-1])
+
+
+@_go_state_form(_swap_go_perspectives)
 def swap_perspectives(states: jnp.ndarray) -> jnp.ndarray:
     """
     Returns the same states but with the turns and pieces swapped.
 
-    :param states: a batch array of N Go games.
-    :return: a boolean array with the same shape as states.
+    :param states: a batch array of N Go games, or a GoState, whose prisoners are swapped too.
+    :return: a boolean array with the same shape as states, or a GoState.
     """
     swapped_pieces = states.at[:,
                      [constants.BLACK_CHANNEL_INDEX, constants.WHITE_CHANNEL_INDEX]].set(
@@ -0,0 +1,116 @@
+"""An optional structured pytree form of Go states."""
+
+import chex
+import jax
+import jax.numpy as jnp
+
+from gojax import constants
+
+
+@chex.dataclass(frozen=True)
+class GoState:
+    """
+    A batch of N Go games that stores the per-game flags as scalars instead of constant planes.
+
+    Every `gojax.go` function that takes a batch array of Go games also takes a GoState, and the
+    functions that return games then return a GoState.
+
+    pieces: an N x 2 x B x B boolean array of the black and white pieces.
+    turns: a boolean array of length N indicating whose turn it is.
+    passes: a boolean array of length N indicating whether the previous move was a pass.
+    ended: a boolean array of length N indicating which games ended.
+    ko_points: an integer array of N 1D points of the single piece the previous move killed, or
+    B^2 if the previous move did not kill exactly one piece.
+    move_numbers: an integer array of the number of moves (including passes) played in each game.
+    prisoners: an N x 2 integer array of the number of pieces captured by black and white.
+    """
+    pieces: jnp.ndarray
+    turns: jnp.ndarray
+    passes: jnp.ndarray
+    ended: jnp.ndarray
+    ko_points: jnp.ndarray
+    move_numbers: jnp.ndarray
+    prisoners: jnp.ndarray
+
+    @property
+    def board_shape(self):
+        """The (B, B) board shape."""
+        return self.pieces.shape[-2:]
+
+
+def new_go_states(board_size: int, batch_size: int = 1) -> GoState:
+    """
+    Returns a GoState of new Go games.
+
+    :param board_size: board size (B).
+    :param batch_size: batch size (N).
+    :return: a GoState.
+    """
+    return GoState(pieces=jnp.zeros((batch_size, 2, board_size, board_size), dtype=bool),
+                   turns=jnp.zeros(batch_size, dtype=bool),
+                   passes=jnp.zeros(batch_size, dtype=bool),
+                   ended=jnp.zeros(batch_size, dtype=bool),
+                   ko_points=jnp.full(batch_size, board_size * board_size, dtype='int32'),
+                   move_numbers=jnp.zeros(batch_size, dtype='int32'),
+                   prisoners=jnp.zeros((batch_size, 2), dtype='int32'))
+
+
+def get_ko_points(killed: jnp.ndarray) -> jnp.ndarray:
+    """
+    Gets the ko points from killed planes.
+
+    :param killed: an N x B x B boolean array of the pieces killed by the previous moves.
+    :return: an integer array of N 1D points of the single killed piece, or B^2 if not exactly one
+    piece was killed.
+    """
+    flat_killed = jnp.reshape(killed, (len(killed), -1))
+    return jnp.where(jnp.sum(flat_killed, axis=1) == 1,
+                     jnp.argmax(flat_killed, axis=1).astype('int32'), flat_killed.shape[1])
+
+
+def to_go_state(states: jnp.ndarray, move_numbers: jnp.ndarray = None,
+                prisoners: jnp.ndarray = None) -> GoState:
+    """
+    Converts a batch array of Go games into a GoState.
+
+    The pieces are a slice of the array and the flags are read from a single point of their
+    planes, so under `jax.jit` the conversion fuses into the surrounding computation.
+
+    :param states: a batch array of N Go games.
+    :param move_numbers: an optional integer array of N move numbers. Defaults to zeros.
+    :param prisoners: an optional N x 2 integer array of prisoner counts. Defaults to zeros.
+    :return: a GoState.
+    """
+    batch_size = len(states)
+    return GoState(
+        pieces=states[:, (constants.BLACK_CHANNEL_INDEX, constants.WHITE_CHANNEL_INDEX)],
+        turns=states[:, constants.TURN_CHANNEL_INDEX, 0, 0],
+        passes=states[:, constants.PASS_CHANNEL_INDEX, 0, 0],
+        ended=states[:, constants.END_CHANNEL_INDEX, 0, 0],
+        ko_points=get_ko_points(states[:, constants.KILLED_CHANNEL_INDEX]),
+        move_numbers=(jnp.zeros(batch_size, dtype='int32') if move_numbers is None else
+                      jnp.asarray(move_numbers, dtype='int32')),
+        prisoners=(jnp.zeros((batch_size, 2), dtype='int32') if prisoners is None else
+                   jnp.asarray(prisoners, dtype='int32')))
+
+
+def from_go_state(go_state: GoState) -> jnp.ndarray:
+    """
+    Converts a GoState into a batch array of Go games.
+
+    The killed plane only holds the ko point, and the move numbers and prisoners are dropped.
+
+    :param go_state: a GoState of N Go games.
+    :return: a batch array of N Go games.
+    """
+    batch_size = len(go_state.turns)
+    nrows, ncols = go_state.board_shape
+
+    def _plane(flags):
+        return jnp.broadcast_to(jnp.reshape(flags, (batch_size, 1, 1, 1)),
+                                (batch_size, 1, nrows, ncols))
+
+    killed = jnp.reshape(jax.nn.one_hot(go_state.ko_points, nrows * ncols, dtype=bool),
+                         (batch_size, 1, nrows, ncols))
+    return jnp.concatenate((go_state.pieces, _plane(go_state.turns), killed,
+                            _plane(go_state.passes), _plane(go_state.ended)), axis=1)
@@ -0,0 +1,266 @@
+"""Go Text Protocol (GTP) engine backed by the batched GoJAX functions."""
+
+import argparse
+import importlib
+import sys
+from typing import Callable, List, Optional
+
+import jax
+import jax.numpy as jnp
+import numpy as np
+from jax import lax
+
+from gojax import constants
+from gojax import go
+from gojax import rng
+from gojax import serialize
+from gojax import state_index
+
+GTP_COLUMNS = 'ABCDEFGHJKLMNOPQRST'
+
+
+def random_legal_move_generator(states: jnp.ndarray, komi: jnp.ndarray, rng_key) -> jnp.ndarray:
+    """
+    Samples a uniformly random legal move, only passing if there is no other legal move.
+
+    :param states: a batch array of N Go games.
+    :param komi: an array of N floats (unused).
+    :param rng_key: JAX RNG key.
+    :return: an integer array of length N.
+    """
+    del komi
+    legal_actions = go.compute_legal_actions1d(states)
+    legal_actions = legal_actions.at[:, -1].set(~jnp.any(legal_actions[:, :-1], axis=1))
+    return jax.random.categorical(rng_key, jnp.where(legal_actions, 0., float('-inf')))
+
+
+def make_playout_move_generator(num_playouts: int = 16, playout_length: int = 64) -> Callable:
+    """
+    Creates a flat Monte Carlo move generator.
+
+    Every legal move is evaluated with `num_playouts` random playouts of `playout_length` moves
+    and the move with the best mean area score for the player to move is chosen.
+
+    :param num_playouts: the number of playouts per candidate move.
+    :param playout_length: the number of moves per playout.
+    :return: a move generator.
+    """
+
+    def _playout_move_generator(states, komi, rng_key):
+        batch_size = len(states)
+        action_size = state_index.get_action_size(states)
+        children = go.get_children(states)
+        playout_states = jnp.reshape(jnp.repeat(children, num_playouts, axis=1),
+                                     (-1, *states.shape[1:]))
+        logits = jnp.zeros((len(playout_states), action_size))
+        final_states = lax.fori_loop(0, playout_length, jax.tree_util.Partial(
+            rng.sample_next_states_v2, logits=logits, rng_key=rng_key), playout_states)
+        scores = jnp.reshape(go.compute_scores(final_states, jnp.repeat(komi, action_size *
+                                                                        num_playouts)),
+                             (batch_size, action_size, num_playouts))
+        player_scores = jnp.mean(scores, axis=2) * jnp.where(
+            jnp.expand_dims(state_index.get_turns(states), 1), -1., 1.)
+        return jnp.argmax(jnp.where(go.compute_legal_actions1d(states), player_scores,
+                                    float('-inf')), axis=1)
+
+    return _playout_move_generator
+
+
+def _load_move_generator(name: str, num_playouts: int, playout_length: int) -> Callable:
+    """Loads a move generator by name or by `module:function` import path."""
+    if name == 'random':
+        return random_legal_move_generator
+    if name == 'playouts':
+        return make_playout_move_generator(num_playouts, playout_length)
+    module_name, _, function_name = name.partition(':')
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+class GTPEngine:
+    """
+    A GTP engine playing a single persistent game.
+
+    All batched functions are compiled once at construction, so commands only dispatch
+    pre-compiled programs on a batch of one game.
+    """
+
+    COMMANDS = ['protocol_version', 'name', 'version', 'known_command', 'list_commands', 'quit',
+                'boardsize', 'clear_board', 'komi', 'play', 'genmove', 'undo', 'final_score',
+                'showboard']
+
+    def __init__(self, board_size: int = 9, komi: float = 7.5,
+                 move_generator: Optional[Callable] = None, seed: int = 0):
+        """
+        :param board_size: board size (B).
+        :param komi: the points given to white.
+        :param move_generator: a function `(states, komi, rng_key) -> actions_1d` used by
+        `genmove`. Defaults to `random_legal_move_generator`.
+        :param seed: the RNG seed of the move generator.
+        """
+        self.komi = komi
+        self._move_generator = jax.jit(move_generator or random_legal_move_generator)
+        self._next_states = jax.jit(go.next_states)
+        self._legal_actions = jax.jit(go.compute_legal_actions1d)
+        self._scores = jax.jit(go.compute_scores)
+        self._rng_key = jax.random.PRNGKey(seed)
+        self._history: List[jnp.ndarray] = []
+        self.done = False
+        self._set_board_size(board_size)
+
+    @property
+    def states(self) -> jnp.ndarray:
+        """The current game as a batch of one state."""
+        return self._history[-1]
+
+    def _set_board_size(self, board_size: int):
+        self.board_size = board_size
+        self._history = [go.new_states(board_size)]
+        # Compile everything for the new board size ahead of the first command.
+        self._next_states(self.states, jnp.zeros(1, dtype='int32')).block_until_ready()
+        self._legal_actions(self.states).block_until_ready()
+        self._scores(self.states, jnp.zeros(1)).block_until_ready()
+        self._move_generator(self.states, jnp.zeros(1), self._rng_key).block_until_ready()
+
+    def _parse_vertex(self, vertex: str) -> int:
+        """Converts a GTP vertex (e.g. `D4` or `pass`) into a 1D action."""
+        vertex = vertex.upper()
+        if vertex == 'PASS':
+            return self.board_size ** 2
+        col = GTP_COLUMNS.index(vertex[0])
+        row = self.board_size - int(vertex[1:])
+        if not (0 <= row < self.board_size and 0 <= col < self.board_size):
+            raise ValueError(f'vertex out of bounds: {vertex}')
+        return row * self.board_size + col
+
+    def _format_vertex(self, action_1d: int) -> str:
+        """Converts a 1D action into a GTP vertex."""
+        if action_1d == self.board_size ** 2:
+            return 'pass'
+        row, col = divmod(action_1d, self.board_size)
+        return f'{GTP_COLUMNS[col]}{self.board_size - row}'
+
+    def _get_turn_states(self, color: str) -> jnp.ndarray:
+        """
+        The current position with the turn given to the GTP color.
+
+        The history is left untouched, so undoing an out-of-turn move restores the player to move.
+        """
+        turn = {'B': constants.BLACKS_TURN, 'BLACK': constants.BLACKS_TURN,
+                'W': constants.WHITES_TURN, 'WHITE': constants.WHITES_TURN}[color.upper()]
+        if bool(state_index.get_turns(self.states)[0]) != turn:
+            return go.change_turns(self.states)
+        return self.states
+
+    def _play(self, states: jnp.ndarray, action_1d: int):
+        if not self._legal_actions(states)[0, action_1d]:
+            raise ValueError('illegal move')
+        self._history.append(self._next_states(states, jnp.array([action_1d])))
+
+    def _final_score(self) -> str:
+        score = float(self._scores(self.states, jnp.array([self.komi]))[0])
+        if score == 0:
+            return '0'
+        return f"{'B' if score > 0 else 'W'}+{abs(score):g}"
+
+    def execute(self, command: str, args: List[str]) -> str:
+        """
+        Executes a GTP command.
+
+        :param command: the command name.
+        :param args: the command arguments.
+        :return: the response text.
+        :raises ValueError: if the command fails.
+        """
+        if command == 'protocol_version':
+            return '2'
+        if command == 'name':
+            return 'GoJAX'
+        if command == 'version':
+            return '0.0.1'
+        if command == 'known_command':
+            return str(args[0] in self.COMMANDS).lower()
+        if command == 'list_commands':
+            return '\n'.join(self.COMMANDS)
+        if command == 'quit':
+            self.done = True
+            return ''
+        if command == 'boardsize':
+            board_size = int(args[0])
+            if not 1 < board_size <= len(GTP_COLUMNS):
+                raise ValueError('unacceptable size')
+            self._set_board_size(board_size)
+            return ''
+        if command == 'clear_board':
+            self._history = [go.new_states(self.board_size)]
+            return ''
+        if command == 'komi':
+            self.komi = float(args[0])
+            return ''
+        if command == 'play':
+            self._play(self._get_turn_states(args[0]), self._parse_vertex(args[1]))
+            return ''
+        if command == 'genmove':
+            states = self._get_turn_states(args[0])
+            self._rng_key, subkey = jax.random.split(self._rng_key)
+            action_1d = int(self._move_generator(states, jnp.array([self.komi]), subkey)[0])
+            self._play(states, action_1d)
+            return self._format_vertex(action_1d)
+        if command == 'undo':
+            if len(self._history) == 1:
+                raise ValueError('cannot undo')
+            self._history.pop()
+            return ''
+        if command == 'final_score':
+            return self._final_score()
+        if command == 'showboard':
+            return '\n' + serialize.get_pretty_string(np.asarray(self.states[0])).rstrip()
+        raise ValueError('unknown command')
+
+    def handle(self, line: str) -> Optional[str]:
+        """
+        Handles one line of GTP input.
+
+        :param line: a line of GTP input.
+        :return: the full GTP response, or None if the line is empty or a comment.
+        """
+        line = line.split('#', 1)[0].strip()
+        if not line:
+            return None
+        tokens = line.split()
+        command_id = ''
+        if tokens[0].isdigit():
+            command_id = tokens.pop(0)
+        try:
+            return f'={command_id} {self.execute(tokens[0], tokens[1:])}'.rstrip(' ') + '\n\n'
+        except (ValueError, IndexError, KeyError) as error:
+            return f'?{command_id} {error}\n\n'
+        except Exception as error:  # pylint: disable=broad-except
+            # Any other failure is reported to the controller instead of ending the main loop.
+            return f'?{command_id} {type(error).__name__}: {error}\n\n'
+
+
+def main(argv: Optional[List[str]] = None):
+    """Runs a GTP engine over stdin and stdout."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--board_size', type=int, default=9)
+    parser.add_argument('--komi', type=float, default=7.5)
+    parser.add_argument('--move_generator', default='random',
+                        help="'random', 'playouts' or a 'module:function' import path.")
+    parser.add_argument('--num_playouts', type=int, default=16)
+    parser.add_argument('--playout_length', type=int, default=64)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    engine = GTPEngine(args.board_size, args.komi,
+                       _load_move_generator(args.move_generator, args.num_playouts,
+                                            args.playout_length), args.seed)
+    for line in sys.stdin:
+        response = engine.handle(line)
+        if response is not None:
+            sys.stdout.write(response)
+            sys.stdout.flush()
+        if engine.done:
+            break
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,222 @@
+"""Atari and ladder detection of Go states."""
+
+import functools
+from typing import Tuple
+
+import jax
+import jax.numpy as jnp
+from jax import lax
+
+from gojax import constants
+from gojax import go
+from gojax import state_index
+
+
+def _fill_groups(seeds: jnp.ndarray, pieces: jnp.ndarray) -> jnp.ndarray:
+    """Paint fills the M x B x B seeds over the M x B x B pieces."""
+    return jnp.squeeze(go.paint_fill(jnp.expand_dims(seeds, 1), jnp.expand_dims(pieces, 1)),
+                       1).astype(bool)
+
+
+def _get_point_masks(points: jnp.ndarray, nrows: int, ncols: int) -> jnp.ndarray:
+    """Converts an M integer array of 1D points into an M x B x B one-hot boolean array."""
+    return jnp.reshape(jax.nn.one_hot(points, nrows * ncols, dtype=bool), (-1, nrows, ncols))
+
+
+def _find_group_in_atari(pieces: jnp.ndarray, empty_spaces: jnp.ndarray, seeds: jnp.ndarray,
+                         max_groups: int = 4) -> Tuple[jnp.ndarray, jnp.ndarray]:
+    """
+    Finds a group in atari among the groups touching the seeds.
+
+    Only the first `max_groups` distinct groups are inspected.
+
+    :param pieces: an M x B x B boolean array of the pieces the groups are made of.
+    :param empty_spaces: an M x B x B boolean array of the empty spaces.
+    :param seeds: an M x B x B boolean array of points of the groups to inspect.
+    :param max_groups: the maximum number of distinct groups to inspect.
+    :return: a boolean array of length M indicating whether a group in atari was found and an
+    integer array of length M with the 1D index of a piece in that group.
+    """
+    nrows, ncols = pieces.shape[1:]
+    remaining = seeds & pieces
+
+    def _inspect_next_group(_, carry):
+        remaining_, found_, points_ = carry
+        seed_points = jnp.argmax(jnp.reshape(remaining_, (len(remaining_), -1)), axis=1)
+        any_remaining = jnp.any(remaining_, axis=(1, 2))
+        group = _fill_groups(_get_point_masks(seed_points, nrows, ncols) & remaining_, pieces)
+        num_liberties = jnp.sum(go.expand_cardinally(group) & empty_spaces, axis=(1, 2))
+        in_atari = any_remaining & (num_liberties == 1)
+        points_ = jnp.where(~found_ & in_atari, seed_points, points_)
+        return remaining_ & ~group, found_ | in_atari, points_
+
+    _, found, points = lax.fori_loop(0, max_groups, _inspect_next_group, (
+        remaining, jnp.zeros(len(pieces), dtype=bool), jnp.zeros(len(pieces), dtype='int32')))
+    return found, points
+
+
+def _get_prey_liberties(states: jnp.ndarray, prey_points: jnp.ndarray,
+                        prey_colors: jnp.ndarray) -> Tuple[jnp.ndarray, jnp.ndarray]:
+    """Returns the M x B x B group and M x B x B liberties of the prey."""
+    nrows, ncols = states.shape[2:]
+    prey_group = _fill_groups(_get_point_masks(prey_points, nrows, ncols),
+                              state_index.get_pieces_per_turn(states, prey_colors))
+    return prey_group, go.expand_cardinally(prey_group) & state_index.get_empty_spaces(states)
+
+
+def _count_liberties_after_extension(states, prey_points, prey_colors):
+    """
+    Lets the prey extend at one of its liberties.
+
+    :return: the number of liberties of the prey after the extension, and whether the extension
+    was invalid.
+    """
+    _, prey_liberties = _get_prey_liberties(states, prey_points, prey_colors)
+    extended_states = go.next_states(
+        states, jnp.argmax(jnp.reshape(prey_liberties, (len(states), -1)), axis=1))
+    _, extended_liberties = _get_prey_liberties(extended_states, prey_points, prey_colors)
+    return jnp.sum(extended_liberties, axis=(1, 2)), state_index.get_passes(extended_states)
+
+
+def _hunter_step(states, prey_points, prey_colors):
+    """
+    The hunter ataris the prey if the prey has exactly two liberties.
+
+    The hunter tries both liberties and looks one extension of the prey ahead. It plays the one
+    that leaves the prey the fewest liberties after the prey extends, breaking ties with the
+    liberty with the most empty neighbors. The lookahead ignores captures of hunter groups, which
+    the prey step checks, so a choice that only fails later in the ladder is not revisited.
+
+    :return: the next states, whether the prey was captured and whether the prey escaped.
+    """
+    _, prey_liberties = _get_prey_liberties(states, prey_points, prey_colors)
+    num_liberties = jnp.sum(prey_liberties, axis=(1, 2))
+    empty_neighbors = jnp.squeeze(
+        lax.conv(state_index.get_empty_spaces(states, keepdims=True).astype('bfloat16'),
+                 constants.CARDINALLY_CONNECTED_KERNEL, (1, 1), padding='same'), 1)
+    flat_liberties = jnp.reshape(prey_liberties, (len(states), -1))
+    first_actions = jnp.argmax(
+        jnp.reshape(jnp.where(prey_liberties, empty_neighbors.astype('int32') + 1, 0),
+                    (len(states), -1)), axis=1)
+    second_actions = jnp.argmax(
+        flat_liberties & (jnp.arange(flat_liberties.shape[1]) != first_actions[:, None]), axis=1)
+
+    def _play(hunter_actions):
+        hunted_states = go.next_states(states, hunter_actions)
+        hunter_invalid = state_index.get_passes(hunted_states)
+        extended_liberties, extension_invalid = _count_liberties_after_extension(
+            hunted_states, prey_points, prey_colors)
+        remaining_liberties = jnp.where(hunter_invalid, num_liberties + 1,
+                                        jnp.where(extension_invalid, 0, extended_liberties))
+        return hunted_states, hunter_invalid, remaining_liberties
+
+    first_states, first_invalid, first_remaining = _play(first_actions)
+    second_states, second_invalid, second_remaining = _play(second_actions)
+    use_second = second_remaining < first_remaining
+    hunted_states = jnp.where(jnp.expand_dims(use_second, (1, 2, 3)), second_states, first_states)
+    hunter_invalid = jnp.where(use_second, second_invalid, first_invalid)
+    atari_possible = num_liberties == 2
+    return (jnp.where(jnp.expand_dims(atari_possible, (1, 2, 3)), hunted_states, states),
+            num_liberties <= 1, (num_liberties >= 3) | (atari_possible & hunter_invalid))
+
+
+def _simulate_ladders(states, prey_points, prey_colors, active, max_depth):
+    """
+    Simulates the ladders of M independent lanes where the prey is to move and in atari.
+
+    :return: a boolean array of length M indicating whether the prey escaped. Ladders still
+    unresolved after `max_depth` rounds are considered escaped.
+    """
+
+    def _prey_step(carry):
+        states_, active_, escaped_, depth_ = carry
+        prey_group, prey_liberties = _get_prey_liberties(states_, prey_points, prey_colors)
+        num_liberties = jnp.sum(prey_liberties, axis=(1, 2))
+        hunter_pieces = state_index.get_pieces_per_turn(states_, ~prey_colors)
+        can_capture, _ = _find_group_in_atari(hunter_pieces,
+                                              state_index.get_empty_spaces(states_),
+                                              go.expand_cardinally(prey_group) & hunter_pieces)
+        prey_actions = jnp.argmax(jnp.reshape(prey_liberties, (len(states_), -1)), axis=1)
+        extended_states = go.next_states(states_, prey_actions)
+        extension_invalid = state_index.get_passes(extended_states)
+        next_states_, captured, escaped_by_extension = _hunter_step(extended_states, prey_points,
+                                                                    prey_colors)
+        escaped_now = (num_liberties >= 2) | can_capture
+        captured = (num_liberties == 0) | extension_invalid | captured
+        newly_escaped = active_ & (escaped_now | (~captured & escaped_by_extension))
+        still_active = active_ & ~escaped_now & ~captured & ~escaped_by_extension
+        states_ = jnp.where(jnp.expand_dims(still_active, (1, 2, 3)), next_states_, states_)
+        return states_, still_active, escaped_ | newly_escaped, depth_ + 1
+
+    def _any_active(carry):
+        return jnp.any(carry[1]) & (carry[3] < max_depth)
+
+    _, active, escaped, _ = lax.while_loop(_any_active, _prey_step, (
+        states, active, jnp.zeros(len(states), dtype=bool), jnp.zeros((), dtype='int32')))
+    return escaped | active
+
+
+def compute_atari(states: jnp.ndarray) -> jnp.ndarray:
+    """
+    Computes the pieces whose groups are in atari (i.e. have exactly one liberty).
+
+    :param states: a batch array of N Go games.
+    :return: an N x 2 x B x B boolean array, where the 0th and 1st indices of the 2nd dimension
+    represent the black and white pieces respectively.
+    """
+    return go.compute_liberty_counts(states) == 1
+
+
+@functools.partial(jax.jit, static_argnames=('max_depth',))
+def compute_ladders(states: jnp.ndarray, max_depth: int = None) -> Tuple[jnp.ndarray, jnp.ndarray]:
+    """
+    Computes the ladder capture and ladder escape moves for the player to move.
+
+    Every candidate move of every game is simulated in parallel with a bounded-depth
+    `lax.while_loop`:
+    • A ladder capture is a legal move that puts an opponent group in atari, where the group
+    cannot escape the following ladder.
+    • A ladder escape is a legal move that extends a group of the player from atari, where the
+    group then escapes the following ladder.
+
+    :param states: a batch array of N Go games.
+    :param max_depth: the maximum number of ladder rounds to simulate. Defaults to 2B. Unresolved
+    ladders are considered escaped.
+    :return: an N x B x B boolean array of ladder captures and an N x B x B boolean array of
+    ladder escapes.
+    """
+    batch_size, _, nrows, ncols = states.shape
+    num_points = nrows * ncols
+    if max_depth is None:
+        max_depth = 2 * max(nrows, ncols)
+    turns = state_index.get_turns(states)
+
+    # Lay out every candidate move of every game as an independent lane.
+    lane_states = jnp.reshape(jnp.repeat(jnp.expand_dims(states, 1), num_points, axis=1),
+                              (batch_size * num_points, *states.shape[1:]))
+    lane_actions = jnp.tile(jnp.arange(num_points), batch_size)
+    lane_turns = jnp.repeat(turns, num_points)
+    played_states = go.next_states(lane_states, lane_actions)
+    legal = ~state_index.get_passes(played_states) & ~jnp.repeat(state_index.get_ended(states),
+                                                                 num_points)
+    action_masks = _get_point_masks(lane_actions, nrows, ncols)
+
+    # Ladder captures: the player hunts an adjacent opponent group it put in atari.
+    opponent_pieces = state_index.get_pieces_per_turn(played_states, ~lane_turns)
+    ataried, prey_points = _find_group_in_atari(
+        opponent_pieces, state_index.get_empty_spaces(played_states),
+        go.expand_cardinally(action_masks) & opponent_pieces)
+    capture_lanes = legal & ataried
+    captures = capture_lanes & ~_simulate_ladders(played_states, prey_points, ~lane_turns,
+                                                  capture_lanes, max_depth)
+
+    # Ladder escapes: the player extends one of its groups in atari.
+    player_atari = compute_atari(states)[jnp.arange(batch_size), turns.astype('uint8')]
+    atari_liberties = go.expand_cardinally(player_atari) & state_index.get_empty_spaces(states)
+    escape_lanes = legal & jnp.reshape(atari_liberties, -1)
+    hunted_states, captured, escaped = _hunter_step(played_states, lane_actions, lane_turns)
+    escapes = escape_lanes & ~captured & (escaped | _simulate_ladders(
+        hunted_states, lane_actions, lane_turns, escape_lanes & ~captured & ~escaped, max_depth))
+
+    return (jnp.reshape(captures, (batch_size, nrows, ncols)),
+            jnp.reshape(escapes, (batch_size, nrows, ncols)))
@@ -0,0 +1,80 @@
+"""Unconditional life analysis of Go states (Benson's algorithm)."""
+
+import jax.numpy as jnp
+from jax import lax
+
+from gojax import constants
+from gojax import go
+from gojax import state_index
+
+
+def _compute_pass_alive_per_color(pieces: jnp.ndarray, empty_spaces: jnp.ndarray) -> jnp.ndarray:
+    """
+    Runs Benson's algorithm for one color.
+
+    :param pieces: an M x B x B boolean array of the pieces of the color to analyze.
+    :param empty_spaces: an M x B x B boolean array of the empty spaces.
+    :return: an M x B x B boolean array of pass-alive pieces and the regions they enclose.
+    """
+    batch_size, nrows, ncols = pieces.shape
+    num_points = nrows * ncols
+    chains = go.compute_components(pieces)
+    regions = go.compute_components(~pieces)
+    expanded_chains = jnp.reshape(go.expand_cardinally(jnp.reshape(chains, (-1, nrows, ncols))),
+                                  (batch_size, num_points, num_points))
+    chains = jnp.reshape(chains, (batch_size, num_points, num_points))
+    regions = jnp.reshape(regions, (batch_size, num_points, num_points))
+    flat_empty_spaces = jnp.reshape(empty_spaces, (batch_size, 1, num_points))
+    liberties = expanded_chains & flat_empty_spaces
+
+    # [m, p, q] = whether the chain of point p touches the region of point q.
+    adjacent = jnp.einsum('mpk,mqk->mpq', expanded_chains.astype('float32'),
+                          regions.astype('float32')) > 0
+    # A region is vital (healthy) to a chain if all of its empty points are liberties of the chain.
+    num_non_liberties = jnp.einsum('mpk,mqk->mpq', (~liberties).astype('float32'),
+                                   (regions & flat_empty_spaces).astype('float32'))
+    vital = adjacent & (num_non_liberties == 0)
+
+    flat_pieces = jnp.reshape(pieces, (batch_size, num_points))
+    region_representatives = ~flat_pieces & (
+            jnp.argmax(regions, axis=2) == jnp.arange(num_points))
+
+    def _body(alive_):
+        alive_chains, alive_regions = alive_
+        num_vital_regions = jnp.sum(
+            vital & jnp.expand_dims(alive_regions & region_representatives, 1), axis=2)
+        alive_chains = alive_chains & (num_vital_regions >= 2)
+        dead_chains = flat_pieces & ~alive_chains
+        alive_regions = alive_regions & ~jnp.any(adjacent & jnp.expand_dims(dead_chains, 2),
+                                                 axis=1)
+        return alive_chains, alive_regions
+
+    def _changed(last_two_alive_):
+        return jnp.any(last_two_alive_[0][0] != last_two_alive_[1][0]) | jnp.any(
+            last_two_alive_[0][1] != last_two_alive_[1][1])
+
+    initial_alive = (flat_pieces, ~flat_pieces)
+    _, (alive_chains, alive_regions) = lax.while_loop(_changed, lambda last_two_alive_: (
+        last_two_alive_[1], _body(last_two_alive_[1])), (initial_alive, _body(initial_alive)))
+    alive_territory = alive_regions & jnp.any(vital & jnp.expand_dims(alive_chains, 2), axis=1)
+    return jnp.reshape(alive_chains | alive_territory, (batch_size, nrows, ncols))
+
+
+def compute_pass_alive(states: jnp.ndarray) -> jnp.ndarray:
+    """
+    Computes the unconditionally alive (pass-alive) areas of the states with Benson's algorithm.
+
+    A chain is pass-alive if it cannot be captured even if its owner passes every move. The
+    returned areas are the pass-alive chains together with the enclosed regions that are vital to
+    them (i.e. every empty point of the region is a liberty of an alive chain).
+
+    :param states: a batch array of N Go games.
+    :return: an N x 2 x B x B boolean array, where the 0th and 1st indices of the 2nd dimension
+    represent the black and white pass-alive areas respectively.
+    """
+    batch_size = states.shape[0]
+    pieces = jnp.concatenate(
+        (states[:, constants.BLACK_CHANNEL_INDEX], states[:, constants.WHITE_CHANNEL_INDEX]))
+    empty_spaces = jnp.tile(state_index.get_empty_spaces(states), (2, 1, 1))
+    pass_alive = _compute_pass_alive_per_color(pieces, empty_spaces)
+    return jnp.stack((pass_alive[:batch_size], pass_alive[batch_size:]), axis=1)
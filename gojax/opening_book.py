@@ -0,0 +1,89 @@
+"""Device-resident opening books for diverse self-play starting positions."""
+
+import functools
+from typing import NamedTuple
+
+import jax
+import jax.numpy as jnp
+
+from gojax import state_index
+from gojax import trajectory
+
+
+class OpeningBook(NamedTuple):
+    """
+    P starting positions kept on device as packed states.
+
+    packed_states: a P x ceil(C x B x B / 8) uint8 array of packed states (see
+    `gojax.pack_states`).
+    log_weights: a float array of P unnormalized log sampling weights.
+    """
+    packed_states: jnp.ndarray
+    log_weights: jnp.ndarray
+
+
+def new_opening_book(states: jnp.ndarray, weights: jnp.ndarray = None) -> OpeningBook:
+    """
+    Creates an opening book from starting positions.
+
+    :param states: a batch array of P Go games.
+    :param weights: an optional array of P non-negative sampling weights. Defaults to uniform.
+    :return: an OpeningBook on the default device.
+    """
+    if weights is None:
+        weights = jnp.ones(len(states))
+    return jax.device_put(OpeningBook(packed_states=state_index.pack_states(states),
+                                      log_weights=jnp.log(jnp.asarray(weights, dtype=float))))
+
+
+def new_opening_book_from_actions(actions_1d: jnp.ndarray, board_size: int,
+                                  lengths: jnp.ndarray = None,
+                                  weights: jnp.ndarray = None) -> OpeningBook:
+    """
+    Creates an opening book by replaying action prefixes in one batch.
+
+    :param actions_1d: a P x L integer array of 1D action prefixes.
+    :param board_size: board size (B).
+    :param lengths: an optional array of P prefix lengths. Defaults to L.
+    :param weights: an optional array of P non-negative sampling weights. Defaults to uniform.
+    :return: an OpeningBook on the default device.
+    """
+    trajectories = trajectory.new_trajectories(actions_1d, jnp.zeros(len(actions_1d)), lengths)
+    states = trajectory.replay_states(trajectories, jnp.arange(len(actions_1d)),
+                                      trajectories.lengths.astype('int32'), board_size)
+    return new_opening_book(states, weights)
+
+
+@functools.partial(jax.jit, static_argnames=('batch_size', 'board_size'))
+def sample_openings(opening_book: OpeningBook, rng_key: jnp.ndarray, batch_size: int,
+                    board_size: int) -> jnp.ndarray:
+    """
+    Samples starting positions from the opening book with replacement.
+
+    :param opening_book: an OpeningBook.
+    :param rng_key: JAX RNG key.
+    :param batch_size: batch size (N).
+    :param board_size: board size (B).
+    :return: a batch array of N Go games.
+    """
+    book_indices = jax.random.categorical(rng_key, opening_book.log_weights, shape=(batch_size,))
+    return state_index.unpack_states(opening_book.packed_states[book_indices], board_size)
+
+
+@jax.jit
+def reset_ended_states(states: jnp.ndarray, opening_book: OpeningBook,
+                       rng_key: jnp.ndarray, reset_mask: jnp.ndarray = None) -> jnp.ndarray:
+    """
+    Replaces games with freshly sampled starting positions from the opening book.
+
+    :param states: a batch array of N Go games.
+    :param opening_book: an OpeningBook of the same board size.
+    :param rng_key: JAX RNG key.
+    :param reset_mask: an optional boolean array of the N games to reset. Defaults to the ended
+    games.
+    :return: a batch array of N Go games.
+    """
+    if reset_mask is None:
+        reset_mask = state_index.get_ended(states)
+    openings = sample_openings(opening_book, rng_key, len(states), states.shape[-1])
+    return jnp.where(jnp.expand_dims(reset_mask, (1, 2, 3)), openings, states)
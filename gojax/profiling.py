@@ -0,0 +1,58 @@
+"""Profiling helpers for the GoJAX functions."""
+
+import contextlib
+from typing import Callable, Dict
+
+import jax
+
+
+@contextlib.contextmanager
+def profile(log_dir: str, create_perfetto_link: bool = False):
+    """
+    Captures a `jax.profiler` trace of everything run inside the context.
+
+    The stages of `next_states`, `compute_actions1d_are_invalid` and `compute_areas` are annotated
+    with `jax.named_scope`, so they show up by name in TensorBoard or Perfetto.
+
+    Example:
+    ```
+    with gojax.profile('/tmp/gojax-trace'):
+        gojax.next_states(states, actions_1d).block_until_ready()
+    ```
+
+    :param log_dir: the local directory to write the trace to.
+    :param create_perfetto_link: whether to serve the trace to Perfetto when the context exits.
+    """
+    with jax.profiler.trace(log_dir, create_perfetto_link=create_perfetto_link):
+        yield
+
+
+def cost_analysis(fn: Callable, *args, static_argnums=(), **kwargs) -> Dict[str, float]:
+    """
+    Compiles the function for the shapes of the given arguments and reports its XLA costs.
+
+    :param fn: a jittable function, e.g. `gojax.next_states`.
+    :param args: the positional arguments, either arrays or `jax.ShapeDtypeStruct`s.
+    :param static_argnums: the indices of the static positional arguments.
+    :param kwargs: the keyword arguments, either arrays or `jax.ShapeDtypeStruct`s.
+    :return: a dictionary with the estimated 'flops' and 'bytes_accessed', and the
+    'argument_bytes', 'output_bytes' and 'temp_bytes' of the compiled program. Entries the backend
+    does not report are omitted.
+    """
+    compiled = jax.jit(fn, static_argnums=static_argnums).lower(*args, **kwargs).compile()
+    costs = compiled.cost_analysis()
+    # Older JAX versions return one dictionary per device program.
+    if isinstance(costs, (list, tuple)):
+        costs = costs[0] if costs else {}
+    report = {}
+    for key, name in (('flops', 'flops'), ('bytes accessed', 'bytes_accessed')):
+        if costs and key in costs:
+            report[name] = float(costs[key])
+    memory_stats = compiled.memory_analysis()
+    if memory_stats is not None:
+        for attribute, name in (('argument_size_in_bytes', 'argument_bytes'),
+                                ('output_size_in_bytes', 'output_bytes'),
+                                ('temp_size_in_bytes', 'temp_bytes')):
+            if hasattr(memory_stats, attribute):
+                report[name] = float(getattr(memory_stats, attribute))
+    return report
@@ -0,0 +1,182 @@
+"""A fixed-capacity on-device replay buffer of Go positions with prioritized sampling."""
+
+import functools
+import math
+from typing import NamedTuple
+
+import jax
+import jax.numpy as jnp
+
+from gojax import constants
+from gojax import state_index
+
+
+class ReplayBuffer(NamedTuple):
+    """
+    A ring of at most K positions stored entirely on device.
+
+    Sampling priorities live in a sum-tree: `priority_tree[1]` is the root holding the total
+    priority, node i has children 2i and 2i + 1, and the leaf of slot j is `priority_tree[L + j]`,
+    where L is the smallest power of two that is at least K.
+
+    packed_states: a K x ceil(C x B x B / 8) uint8 array of packed states (see
+    `gojax.pack_states`).
+    actions: a K int32 array of the 1D actions played.
+    policies: a K x A float32 array of policy targets.
+    outcomes: a K float32 array of game outcomes from the perspective of the player to move.
+    priority_tree: a 2L float32 array.
+    max_priority: the largest priority ever inserted or updated, given to inserts without one.
+    next_index: the slot the next position is written to.
+    size: the number of stored positions.
+    """
+    packed_states: jnp.ndarray
+    actions: jnp.ndarray
+    policies: jnp.ndarray
+    outcomes: jnp.ndarray
+    priority_tree: jnp.ndarray
+    max_priority: jnp.ndarray
+    next_index: jnp.ndarray
+    size: jnp.ndarray
+
+
+class Samples(NamedTuple):
+    """
+    A batch of N positions sampled from a replay buffer.
+
+    indices: an N int32 array of buffer slots, for `update_priorities`.
+    probabilities: an N float32 array of the probabilities the slots were sampled with, for
+    importance sampling weights.
+    states: a batch array of N Go games.
+    actions: an N int32 array of 1D actions.
+    policies: an N x A float32 array of policy targets.
+    outcomes: an N float32 array of outcomes.
+    """
+    indices: jnp.ndarray
+    probabilities: jnp.ndarray
+    states: jnp.ndarray
+    actions: jnp.ndarray
+    policies: jnp.ndarray
+    outcomes: jnp.ndarray
+
+
+def new_replay_buffer(capacity: int, board_size: int) -> ReplayBuffer:
+    """
+    Creates an empty replay buffer.
+
+    :param capacity: the maximum number of positions (K).
+    :param board_size: board size (B).
+    :return: a ReplayBuffer.
+    """
+    num_leaves = 1 << max(capacity - 1, 0).bit_length()
+    packed_size = math.ceil(constants.NUM_CHANNELS * board_size * board_size / 8)
+    return ReplayBuffer(packed_states=jnp.zeros((capacity, packed_size), dtype='uint8'),
+                        actions=jnp.zeros(capacity, dtype='int32'),
+                        policies=jnp.zeros((capacity, board_size * board_size + 1),
+                                           dtype='float32'),
+                        outcomes=jnp.zeros(capacity, dtype='float32'),
+                        priority_tree=jnp.zeros(2 * num_leaves, dtype='float32'),
+                        max_priority=jnp.ones((), dtype='float32'),
+                        next_index=jnp.zeros((), dtype='int32'),
+                        size=jnp.zeros((), dtype='int32'))
+
+
+def _set_leaves(priority_tree: jnp.ndarray, indices: jnp.ndarray,
+                priorities: jnp.ndarray) -> jnp.ndarray:
+    """Sets the leaves of the slots and recomputes only their ancestors."""
+    num_leaves = len(priority_tree) // 2
+    nodes = indices + num_leaves
+    priority_tree = priority_tree.at[nodes].set(priorities)
+    for _ in range(num_leaves.bit_length() - 1):
+        nodes = nodes // 2
+        priority_tree = priority_tree.at[nodes].set(priority_tree[2 * nodes] +
+                                                    priority_tree[2 * nodes + 1])
+    return priority_tree
+
+
+@functools.partial(jax.jit, donate_argnums=0)
+def add(buffer: ReplayBuffer, states: jnp.ndarray, actions_1d: jnp.ndarray,
+        policies: jnp.ndarray, outcomes: jnp.ndarray,
+        priorities: jnp.ndarray = None) -> ReplayBuffer:
+    """
+    Inserts a batch of positions, overwriting the oldest ones once the buffer is full.
+
+    The buffer is donated and updated in place, so the passed buffer must not be used afterwards.
+
+    :param buffer: a ReplayBuffer.
+    :param states: a batch array of N Go games, with N at most the capacity.
+    :param actions_1d: an integer array of N 1D actions.
+    :param policies: an N x A float array of policy targets.
+    :param outcomes: a float array of N outcomes.
+    :param priorities: an optional float array of N positive priorities. Defaults to the largest
+    priority so far.
+    :return: the updated ReplayBuffer.
+    """
+    capacity = len(buffer.actions)
+    indices = (buffer.next_index + jnp.arange(len(states))) % capacity
+    if priorities is None:
+        priorities = jnp.full(len(states), buffer.max_priority)
+    priorities = jnp.asarray(priorities, dtype='float32')
+    return ReplayBuffer(
+        packed_states=buffer.packed_states.at[indices].set(state_index.pack_states(states)),
+        actions=buffer.actions.at[indices].set(actions_1d),
+        policies=buffer.policies.at[indices].set(policies),
+        outcomes=buffer.outcomes.at[indices].set(outcomes),
+        priority_tree=_set_leaves(buffer.priority_tree, indices, priorities),
+        max_priority=jnp.maximum(buffer.max_priority, jnp.max(priorities)),
+        next_index=(buffer.next_index + len(states)) % capacity,
+        size=jnp.minimum(buffer.size + len(states), capacity))
+
+
+@functools.partial(jax.jit, static_argnames='batch_size')
+def sample(buffer: ReplayBuffer, rng_key: jnp.ndarray, batch_size: int) -> Samples:
+    """
+    Samples positions with probability proportional to their priorities.
+
+    Draws are stratified: the total priority is split into N equal segments and one position is
+    sampled from each.
+
+    :param buffer: a non-empty ReplayBuffer.
+    :param rng_key: JAX RNG key.
+    :param batch_size: batch size (N).
+    :return: Samples.
+    """
+    num_leaves = len(buffer.priority_tree) // 2
+    total = buffer.priority_tree[1]
+    targets = (jnp.arange(batch_size) + jax.random.uniform(rng_key, (batch_size,))) * (
+            total / batch_size)
+    nodes = jnp.ones(batch_size, dtype='int32')
+    for _ in range(num_leaves.bit_length() - 1):
+        left_sums = buffer.priority_tree[2 * nodes]
+        right_sums = buffer.priority_tree[2 * nodes + 1]
+        # Rounding can leave a target at or past the mass of the node, so go right only if the
+        # right child has mass, and keep the target strictly inside the chosen child.
+        go_right = ((targets >= left_sums) & (right_sums > 0)) | (left_sums <= 0)
+        targets = jnp.where(go_right, targets - left_sums, targets)
+        child_sums = jnp.where(go_right, right_sums, left_sums)
+        targets = jnp.clip(targets, 0, jnp.nextafter(child_sums, 0))
+        nodes = 2 * nodes + go_right
+    indices = nodes - num_leaves
+    board_size = math.isqrt(buffer.policies.shape[1] - 1)
+    return Samples(indices=indices,
+                   probabilities=buffer.priority_tree[indices + num_leaves] / total,
+                   states=state_index.unpack_states(buffer.packed_states[indices], board_size),
+                   actions=buffer.actions[indices], policies=buffer.policies[indices],
+                   outcomes=buffer.outcomes[indices])
+
+
+@functools.partial(jax.jit, donate_argnums=0)
+def update_priorities(buffer: ReplayBuffer, indices: jnp.ndarray,
+                      priorities: jnp.ndarray) -> ReplayBuffer:
+    """
+    Updates the priorities of sampled positions, e.g. to their new training losses.
+
+    The buffer is donated like in `add`.
+
+    :param buffer: a ReplayBuffer.
+    :param indices: an integer array of N buffer slots from `sample`.
+    :param priorities: a float array of N positive priorities.
+    :return: the updated ReplayBuffer.
+    """
+    priorities = jnp.asarray(priorities, dtype='float32')
+    return buffer._replace(priority_tree=_set_leaves(buffer.priority_tree, indices, priorities),
+                           max_priority=jnp.maximum(buffer.max_priority, jnp.max(priorities)))
@@ -64,6 +64,72 @@ def sample_non_occupied_actions1d(states, logits, rng_key):
     return jax.random.categorical(rng_key, action_logits)
 
 
+def _get_legal_logits(states, logits, temperatures, board_masks):
+    """Scales the logits by the temperatures and masks the illegal actions with -inf."""
+    legal_actions = gojax.compute_legal_actions1d(states, board_masks)
+    temperatures = jnp.reshape(jnp.broadcast_to(jnp.asarray(temperatures, dtype=logits.dtype),
+                                                (len(logits),)), (-1, 1))
+    scaled_logits = logits / jnp.where(temperatures > 0, temperatures, 1)
+    return legal_actions, jnp.where(legal_actions, scaled_logits, float('-inf')), temperatures
+
+
+def sample_legal_actions1d(states, logits, rng_key, temperatures=1., dirichlet_alpha=None,
+                           dirichlet_fraction=0.25, board_masks=None):
+    """
+    Samples legal 1D actions with probability equal to softmax(logits / temperature).
+
+    Unlike `sample_non_occupied_actions1d`, suicides and moves blocked by ko are never sampled.
+    Passing is always legal.
+
+    :param states: a batch array of N Go games.
+    :param logits: an N x A float array of logits.
+    :param rng_key: JAX RNG key.
+    :param temperatures: a float or an array of N floats. A temperature of 0 picks the legal
+    action with the highest logit.
+    :param dirichlet_alpha: if set, the probabilities are mixed with Dirichlet(alpha) noise over
+    the legal actions, as for AlphaZero root exploration.
+    :param dirichlet_fraction: the weight of the Dirichlet noise.
+    :param board_masks: an optional N x B x B boolean array of on-board points.
+    :return: an integer array of length N in range [A].
+    """
+    noise_key, sample_key = jax.random.split(rng_key)
+    legal_actions, legal_logits, temperatures = _get_legal_logits(states, logits, temperatures,
+                                                                  board_masks)
+    if dirichlet_alpha is not None:
+        gammas = jax.random.gamma(noise_key, dirichlet_alpha, logits.shape) * legal_actions
+        noise = gammas / jnp.sum(gammas, axis=1, keepdims=True)
+        probs = (1 - dirichlet_fraction) * jax.nn.softmax(legal_logits, axis=1) + \
+                dirichlet_fraction * noise
+        legal_logits = jnp.where(legal_actions, jnp.log(probs), float('-inf'))
+    return jnp.where(jnp.squeeze(temperatures, 1) > 0,
+                     jax.random.categorical(sample_key, legal_logits),
+                     jnp.argmax(legal_logits, axis=1))
+
+
+def sample_gumbel_top_k_actions1d(states, logits, rng_key, k, temperatures=1.,
+                                  board_masks=None):
+    """
+    Samples k distinct legal 1D actions per game without replacement with the Gumbel-top-k trick.
+
+    The candidates are ordered as if sampled one after another from softmax(logits / temperature)
+    without replacement.
+
+    :param states: a batch array of N Go games.
+    :param logits: an N x A float array of logits.
+    :param rng_key: JAX RNG key.
+    :param k: the number of candidates per game (static).
+    :param temperatures: a float or an array of N floats. A temperature of 0 picks the k legal
+    actions with the highest logits.
+    :param board_masks: an optional N x B x B boolean array of on-board points.
+    :return: an N x k integer array of actions and an N x k boolean array indicating which
+    candidates are legal. A game with fewer than k legal actions has invalid trailing candidates.
+    """
+    _, legal_logits, temperatures = _get_legal_logits(states, logits, temperatures, board_masks)
+    gumbels = jax.random.gumbel(rng_key, logits.shape) * (temperatures > 0)
+    scores, actions_1d = lax.top_k(legal_logits + gumbels, k)
+    return actions_1d, scores > float('-inf')
+
+
 def sample_next_states(step, states, logits, rng_key,
                        sampling_fn=sample_non_occupied_indicator_actions):
     """
@@ -91,8 +157,8 @@ def sample_next_states_v2(step, states, logits, rng_key,
     :param states: a batch array of N Go games.
     :param logits: an N x A float array of logits.
     :param rng_key: JAX RNG key.
-    :param actions1d_sampling_fn: sampling function. Either sample_all_actions or
-    sample_non_occupied_indicator_actions.
+    :param actions1d_sampling_fn: a 1D action sampling function, e.g.
+    sample_non_occupied_actions1d or sample_legal_actions1d.
     :return: a batch array of N Go games.
     """
     return gojax.next_states(states, actions1d_sampling_fn(states, logits,
@@ -100,7 +166,7 @@ def sample_next_states_v2(step, states, logits, rng_key,
 
 
 def sample_random_state(board_size, batch_size, num_steps, logits, rng_key,
-                        sampling_fn=sample_non_occupied_indicator_actions):
+                        sampling_fn=sample_non_occupied_indicator_actions, initial_states=None):
     """
     Samples a random state by with `num_steps` sequential uniform random actions.
 
@@ -111,16 +177,20 @@ def sample_random_state(board_size, batch_size, num_steps, logits, rng_key,
     :param rng_key: JAX RNG key.
     :param sampling_fn: sampling function. Either sample_all_actions or
     sample_non_occupied_indicator_actions.
+    :param initial_states: an optional batch array of N Go games to start from, e.g. sampled with
+    `sample_openings`. Defaults to new games.
     :return: the final state of the game (trajectory).
     """
     return lax.fori_loop(0, num_steps,
                          jax.tree_util.Partial(sample_next_states, logits=logits, rng_key=rng_key,
                                                sampling_fn=sampling_fn),
-                         gojax.new_states(board_size, batch_size))
+                         gojax.new_states(board_size, batch_size) if initial_states is None
+                         else initial_states)
 
 
 def sample_random_state_v2(board_size, batch_size, num_steps, logits, rng_key,
-                           actions1d_sampling_fn=sample_non_occupied_actions1d):
+                           actions1d_sampling_fn=sample_non_occupied_actions1d,
+                           initial_states=None):
     """
     Samples a random state by with `num_steps` sequential uniform random actions.
 
@@ -131,9 +201,12 @@ def sample_random_state_v2(board_size, batch_size, num_steps, logits, rng_key,
     :param rng_key: JAX RNG key.
     :param actions1d_sampling_fn: sampling function. Either sample_all_actions or
     sample_non_occupied_indicator_actions.
+    :param initial_states: an optional batch array of N Go games to start from, e.g. sampled with
+    `sample_openings`. Defaults to new games.
     :return: the final state of the game (trajectory).
     """
     return lax.fori_loop(0, num_steps, jax.tree_util.Partial(sample_next_states_v2, logits=logits,
                                                              rng_key=rng_key,
                                                              actions1d_sampling_fn=actions1d_sampling_fn),
-                         gojax.new_states(board_size, batch_size))
+                         gojax.new_states(board_size, batch_size) if initial_states is None
+                         else initial_states)
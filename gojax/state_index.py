@@ -5,6 +5,7 @@ from typing import Union
 from jax import numpy as jnp
 
 from gojax import constants
+from gojax import go_state
 
 
 def get_action_size(states):
@@ -13,9 +14,11 @@ def get_action_size(states):
 
     If states is N x B1 x B2, then the action size is B1 x B2 + 1.
 
-    :param states: an array of N Go games.
+    :param states: an array of N Go games, or a GoState.
     :return: a scalar integer.
     """
+    if isinstance(states, go_state.GoState):
+        states = states.pieces
     b1, b2 = states.shape[-2:]
     return b1 * b2 + 1
 
@@ -37,20 +40,25 @@ def get_turns(states):
     """
     Gets the turn for each state in states.
 
-    :param states: a batch array of N Go games.
+    The turn channel is a constant plane, so only its first point is read.
+
+    :param states: a batch array of N Go games, or a GoState.
     :return: a boolean array of length N indicating whose turn it is for each state.
     """
-
-    return jnp.alltrue(states[:, constants.TURN_CHANNEL_INDEX], axis=(1, 2))
+    if isinstance(states, go_state.GoState):
+        return states.turns
+    return states[:, constants.TURN_CHANNEL_INDEX, 0, 0]
 
 
 def get_killed(states):
     """
     Gets the previously killed pieces for each state in states.
 
-    :param states: a batch array of N Go games.
+    :param states: a batch array of N Go games, or a GoState, which only knows the ko point.
     :return: an N x B x B boolean array.
     """
+    if isinstance(states, go_state.GoState):
+        return go_state.from_go_state(states)[:, constants.KILLED_CHANNEL_INDEX]
 
     return states[:, constants.KILLED_CHANNEL_INDEX]
 
@@ -59,21 +67,24 @@ def get_passes(states):
     """
     Gets passes for each state in states.
 
-    :param states: a batch array of N Go games.
+    :param states: a batch array of N Go games, or a GoState.
     :return: a boolean array of length N indicating which state was passed.
     """
-
-    return jnp.alltrue(states[:, constants.PASS_CHANNEL_INDEX], axis=(1, 2))
+    if isinstance(states, go_state.GoState):
+        return states.passes
+    return states[:, constants.PASS_CHANNEL_INDEX, 0, 0]
 
 
 def get_ended(states):
     """
     Indicates which states have ended.
 
-    :param states: a batch array of N Go games.
+    :param states: a batch array of N Go games, or a GoState.
     :return: a boolean array of length N indicating which state ended.
     """
-    return jnp.alltrue(states[:, constants.END_CHANNEL_INDEX], axis=(1, 2))
+    if isinstance(states, go_state.GoState):
+        return states.ended
+    return states[:, constants.END_CHANNEL_INDEX, 0, 0]
 
 
 def get_empty_spaces(states, keepdims=False):
@@ -177,3 +188,62 @@ def action_indicator_to_1d(indicator_actions: jnp.ndarray):
         (jnp.reshape(indicator_actions, (len(indicator_actions), -1)), jnp.expand_dims(passes, 1)),
         axis=1)
     return jnp.argmax(one_hot_actions, axis=1)
+
+
+def action_1d_to_padded(actions_1d: jnp.ndarray, board_sizes: jnp.ndarray,
+                        max_board_size: int) -> jnp.ndarray:
+    """
+    Converts 1D actions of games of mixed sizes into 1D actions of their padded boards.
+
+    See `gojax.new_board_masks`.
+
+    :param actions_1d: an integer array of N 1D actions in range [0, b^2], where b is the board size
+    of the respective game.
+    :param board_sizes: an integer array of N board sizes.
+    :param max_board_size: the padded board size (B).
+    :return: an integer array of N 1D actions in range [0, B^2].
+    """
+    rows, cols = jnp.divmod(actions_1d, board_sizes)
+    return jnp.where(actions_1d == board_sizes ** 2, max_board_size ** 2,
+                     rows * max_board_size + cols)
+
+
+def padded_action_1d_to_local(actions_1d: jnp.ndarray, board_sizes: jnp.ndarray,
+                              max_board_size: int) -> jnp.ndarray:
+    """
+    Converts 1D actions of padded boards into 1D actions of games of mixed sizes.
+
+    The inverse of `action_1d_to_padded`.
+
+    :param actions_1d: an integer array of N 1D actions in range [0, B^2].
+    :param board_sizes: an integer array of N board sizes.
+    :param max_board_size: the padded board size (B).
+    :return: an integer array of N 1D actions in range [0, b^2], where b is the board size of the
+    respective game.
+    """
+    rows, cols = jnp.divmod(actions_1d, max_board_size)
+    return jnp.where(actions_1d == max_board_size ** 2, board_sizes ** 2, rows * board_sizes + cols)
+
+
+def pack_states(states: jnp.ndarray) -> jnp.ndarray:
+    """
+    Packs the boolean Go states into bits.
+
+    :param states: a batch array of N Go games.
+    :return: an N x ceil(C x B x B / 8) uint8 array.
+    """
+    return jnp.packbits(jnp.reshape(states, (len(states), -1)), axis=1)
+
+
+def unpack_states(packed_states: jnp.ndarray, board_size: int) -> jnp.ndarray:
+    """
+    Unpacks Go states packed with `pack_states`.
+
+    :param packed_states: an N x ceil(C x B x B / 8) uint8 array.
+    :param board_size: board size (B).
+    :return: a batch array of N Go games.
+    """
+    num_bits = constants.NUM_CHANNELS * board_size * board_size
+    return jnp.reshape(jnp.unpackbits(packed_states, axis=1, count=num_bits),
+                       (len(packed_states), constants.NUM_CHANNELS, board_size,
+                        board_size)).astype(bool)
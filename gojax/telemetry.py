@@ -0,0 +1,123 @@
+"""Telemetry of the flood fill iteration counts of Go states."""
+
+from typing import Dict, Tuple
+
+import jax
+import jax.numpy as jnp
+import numpy as np
+
+from gojax import go
+from gojax import state_index
+
+FREE_GROUPS = 'free_groups'
+AREAS = 'areas'
+
+
+@jax.jit
+def compute_fill_iterations(states: jnp.ndarray,
+                            board_masks: jnp.ndarray = None) -> Dict[str, jnp.ndarray]:
+    """
+    Computes the `paint_fill` iteration counts the states need.
+
+    :param states: a batch array of N Go games.
+    :param board_masks: an optional N x B x B boolean array of on-board points.
+    :return: a dictionary mapping FREE_GROUPS to an N x 2 integer array of the free group fills of
+    the player to move and the opponent, and AREAS to an N x 2 integer array of the black and
+    white area fills.
+    """
+    turns = state_index.get_turns(states)
+    _, player_iterations = go.compute_free_groups(states, turns, board_masks,
+                                                  return_iterations=True)
+    _, opponent_iterations = go.compute_free_groups(states, ~turns, board_masks,
+                                                    return_iterations=True)
+    _, area_iterations = go.compute_areas(states, board_masks, return_iterations=True)
+    return {FREE_GROUPS: jnp.stack((player_iterations, opponent_iterations), axis=1),
+            AREAS: area_iterations}
+
+
+class FillTelemetry:
+    """
+    Aggregates histograms of `paint_fill` iteration counts per fill kind and board size.
+
+    Example:
+    ```
+    telemetry = FillTelemetry()
+    for _ in range(num_moves):
+        states = gojax.next_states(states, actions_1d)
+        telemetry.record_states(states)
+    print(telemetry.summary())
+    ```
+    """
+
+    def __init__(self):
+        self._histograms: Dict[Tuple[str, int], np.ndarray] = {}
+
+    def record(self, kind: str, board_sizes, iterations):
+        """
+        Records iteration counts.
+
+        :param kind: the fill kind, e.g. FREE_GROUPS or AREAS.
+        :param board_sizes: an integer or an integer array of N board sizes.
+        :param iterations: an integer array of N iteration counts, or N x M counts of M fills per
+        game.
+        """
+        iterations = np.asarray(iterations)
+        iterations = np.reshape(iterations, (len(iterations), -1))
+        board_sizes = np.broadcast_to(np.asarray(board_sizes), (len(iterations),))
+        for board_size in np.unique(board_sizes):
+            counts = np.bincount(np.ravel(iterations[board_sizes == board_size]))
+            key = (kind, int(board_size))
+            histogram = self._histograms.get(key, np.zeros(0, dtype='int64'))
+            if len(counts) > len(histogram):
+                histogram = np.pad(histogram, (0, len(counts) - len(histogram)))
+            histogram[:len(counts)] += counts
+            self._histograms[key] = histogram
+
+    def record_states(self, states: jnp.ndarray, board_masks: jnp.ndarray = None):
+        """
+        Records the iteration counts of the free group and area fills of the states.
+
+        :param states: a batch array of N Go games.
+        :param board_masks: an optional N x B x B boolean array of on-board points. The board size
+        of each game is read from its mask.
+        """
+        if board_masks is None:
+            board_sizes = states.shape[2]
+        else:
+            board_sizes = np.sum(np.asarray(board_masks)[:, 0], axis=1)
+        for kind, iterations in jax.device_get(
+                compute_fill_iterations(states, board_masks)).items():
+            self.record(kind, board_sizes, iterations)
+
+    def histogram(self, kind: str, board_size: int) -> np.ndarray:
+        """
+        Gets a histogram of iteration counts.
+
+        :param kind: the fill kind.
+        :param board_size: the board size.
+        :return: an integer array whose i-th entry is the number of fills that took i iterations.
+        """
+        return self._histograms.get((kind, board_size), np.zeros(0, dtype='int64')).copy()
+
+    def summary(self) -> Dict[Tuple[str, int], Dict[str, float]]:
+        """
+        Summarizes every histogram.
+
+        :return: a dictionary mapping (kind, board size) to the count, mean, median, 99th
+        percentile and maximum of the iteration counts.
+        """
+        summary = {}
+        for key, histogram in sorted(self._histograms.items()):
+            num_fills = int(np.sum(histogram))
+            cumulative = np.cumsum(histogram)
+            summary[key] = {
+                'count': num_fills,
+                'mean': float(np.dot(np.arange(len(histogram)), histogram) / num_fills),
+                'p50': int(np.searchsorted(cumulative, 0.5 * num_fills)),
+                'p99': int(np.searchsorted(cumulative, 0.99 * num_fills)),
+                'max': int(np.flatnonzero(histogram)[-1])}
+        return summary
+
+    def reset(self):
+        """Clears every histogram."""
+        self._histograms.clear()
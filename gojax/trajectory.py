@@ -0,0 +1,130 @@
+"""Compact action-only storage of Go games with batched deterministic replay."""
+
+import functools
+from typing import NamedTuple
+
+import jax
+import jax.numpy as jnp
+from jax import lax
+
+from gojax import go
+from gojax import state_index
+
+
+class Trajectories(NamedTuple):
+    """
+    T Go games stored as their 1D actions.
+
+    Games are fully determined by their actions, so positions are reconstructed on demand with
+    `replay_states` instead of being stored.
+
+    actions: a T x L int16 array of 1D actions. Plies past a game's length are ignored.
+    outcomes: a T int8 array of final results (1 = black won, 0 = tie, -1 = white won).
+    lengths: a T int16 array of the number of plies of each game.
+    """
+    actions: jnp.ndarray
+    outcomes: jnp.ndarray
+    lengths: jnp.ndarray
+
+
+def new_trajectories(actions_1d: jnp.ndarray, outcomes: jnp.ndarray,
+                     lengths: jnp.ndarray = None) -> Trajectories:
+    """
+    Creates compact trajectories.
+
+    :param actions_1d: a T x L integer array of 1D actions.
+    :param outcomes: a T integer array of final results.
+    :param lengths: an optional T integer array of the number of plies of each game. Defaults to L.
+    :return: Trajectories.
+    """
+    actions_1d = jnp.asarray(actions_1d)
+    if lengths is None:
+        lengths = jnp.full(len(actions_1d), actions_1d.shape[1])
+    return Trajectories(actions=actions_1d.astype('int16'),
+                        outcomes=jnp.asarray(outcomes).astype('int8'),
+                        lengths=jnp.asarray(lengths).astype('int16'))
+
+
+def _step_until(states: jnp.ndarray, actions_1d: jnp.ndarray, start_plies: jnp.ndarray,
+                end_plies: jnp.ndarray, num_steps: int) -> jnp.ndarray:
+    """
+    Plays the actions from the start plies up to (excluding) the end plies.
+
+    :param states: a batch array of N Go games at their start plies.
+    :param actions_1d: an N x L integer array of 1D actions.
+    :param start_plies: an integer array of N start plies.
+    :param end_plies: an integer array of N end plies.
+    :param num_steps: the maximum number of plies to play.
+    :return: a batch array of N Go games at their end plies.
+    """
+    batch_indices = jnp.arange(len(states))
+    max_ply = actions_1d.shape[1] - 1
+
+    def _step(states_, step):
+        plies = start_plies + step
+        next_states = go.next_states(states_, actions_1d[batch_indices, jnp.minimum(plies,
+                                                                                    max_ply)])
+        return jnp.where(jnp.expand_dims(plies < end_plies, (1, 2, 3)), next_states, states_), None
+
+    return lax.scan(_step, states, jnp.arange(num_steps))[0]
+
+
+@functools.partial(jax.jit, static_argnames=('board_size', 'checkpoint_interval'))
+def compute_checkpoints(trajectories: Trajectories, board_size: int,
+                        checkpoint_interval: int) -> jnp.ndarray:
+    """
+    Computes packed checkpoint states every `checkpoint_interval` plies of every trajectory.
+
+    :param trajectories: Trajectories of T games.
+    :param board_size: board size (B).
+    :param checkpoint_interval: the number of plies between checkpoints (k).
+    :return: a T x (ceil(L / k) + 1) x P uint8 array of packed states (see
+    `gojax.pack_states`) at plies 0, k, 2k, ...
+    """
+    num_games, max_length = trajectories.actions.shape
+    num_checkpoints = -(-max_length // checkpoint_interval) + 1
+    lengths = trajectories.lengths.astype('int32')
+
+    def _next_checkpoint(states, checkpoint_index):
+        start_plies = jnp.full(num_games, checkpoint_index * checkpoint_interval)
+        states = _step_until(states, trajectories.actions.astype('int32'), start_plies,
+                             jnp.minimum(start_plies + checkpoint_interval, lengths),
+                             checkpoint_interval)
+        return states, state_index.pack_states(states)
+
+    initial_states = go.new_states(board_size, num_games)
+    _, checkpoints = lax.scan(_next_checkpoint, initial_states,
+                              jnp.arange(num_checkpoints - 1))
+    checkpoints = jnp.concatenate(
+        (jnp.expand_dims(state_index.pack_states(initial_states), 0), checkpoints))
+    return jnp.swapaxes(checkpoints, 0, 1)
+
+
+@functools.partial(jax.jit, static_argnames=('board_size', 'checkpoint_interval'))
+def replay_states(trajectories: Trajectories, trajectory_ids: jnp.ndarray, plies: jnp.ndarray,
+                  board_size: int, checkpoints: jnp.ndarray = None,
+                  checkpoint_interval: int = None) -> jnp.ndarray:
+    """
+    Reconstructs the states of the given trajectories at the given plies.
+
+    Without checkpoints every query replays up to L plies. With checkpoints every query replays at
+    most `checkpoint_interval` plies from the closest preceding checkpoint.
+
+    :param trajectories: Trajectories of T games.
+    :param trajectory_ids: an integer array of N trajectory indices.
+    :param plies: an integer array of N plies. The state at ply p is the state after the first p
+    actions. Plies past a game's length yield its final state.
+    :param board_size: board size (B).
+    :param checkpoints: optional checkpoints from `compute_checkpoints`.
+    :param checkpoint_interval: the checkpoint interval used to compute the checkpoints.
+    :return: a batch array of N Go games.
+    """
+    actions_1d = trajectories.actions[trajectory_ids].astype('int32')
+    end_plies = jnp.minimum(plies, trajectories.lengths[trajectory_ids].astype('int32'))
+    if checkpoints is None:
+        return _step_until(go.new_states(board_size, len(trajectory_ids)), actions_1d,
+                           jnp.zeros_like(end_plies), end_plies, actions_1d.shape[1])
+    checkpoint_indices = end_plies // checkpoint_interval
+    states = state_index.unpack_states(checkpoints[trajectory_ids, checkpoint_indices], board_size)
+    return _step_until(states, actions_1d, checkpoint_indices * checkpoint_interval, end_plies,
+                       checkpoint_interval)
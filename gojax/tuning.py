@@ -0,0 +1,119 @@
+"""Auto-tuning of the `paint_fill` unroll depth per backend and board size."""
+
+import functools
+import json
+import os
+import time
+from typing import Dict, Sequence, Tuple
+
+import jax
+import numpy as np
+
+DEFAULT_EXPANSIONS_PER_ITERATION = 3
+_CACHE_FILENAME = 'paint_fill_tuning.json'
+_cache = None
+
+
+def get_cache_path() -> str:
+    """
+    The path of the tuning cache. Set the `GOJAX_CACHE_DIR` environment variable to override the
+    `~/.cache/gojax` directory.
+    """
+    cache_dir = os.environ.get('GOJAX_CACHE_DIR',
+                               os.path.join(os.path.expanduser('~'), '.cache', 'gojax'))
+    return os.path.join(cache_dir, _CACHE_FILENAME)
+
+
+@functools.lru_cache(maxsize=None)
+def _get_backend_key() -> str:
+    device = jax.devices()[0]
+    return f'{device.platform}:{device.device_kind}'
+
+
+def _load_cache() -> Dict[str, int]:
+    global _cache  # pylint: disable=global-statement
+    if _cache is None:
+        try:
+            with open(get_cache_path(), encoding='utf-8') as file:
+                _cache = json.load(file)
+        except (OSError, ValueError):
+            _cache = {}
+    return _cache
+
+
+def clear_cache(delete_file: bool = False):
+    """
+    Forgets the loaded tuning cache so it is re-read on next use.
+
+    Already compiled functions keep the unroll depth they were traced with.
+
+    :param delete_file: whether to also delete the cache file.
+    """
+    global _cache  # pylint: disable=global-statement
+    _cache = None
+    if delete_file and os.path.exists(get_cache_path()):
+        os.remove(get_cache_path())
+
+
+def get_expansions_per_iteration(board_size: int) -> int:
+    """
+    Gets the tuned number of expansions per `paint_fill` loop iteration on the current backend.
+
+    :param board_size: board size (B).
+    :return: the cached tuned value, or DEFAULT_EXPANSIONS_PER_ITERATION if the board size was
+    never tuned on this backend.
+    """
+    return _load_cache().get(f'{_get_backend_key()}/{board_size}',
+                             DEFAULT_EXPANSIONS_PER_ITERATION)
+
+
+def _new_fill_problems(board_size: int, batch_size: int, seed: int) -> Tuple[np.ndarray,
+                                                                            np.ndarray]:
+    """Samples random areas of about half the board with a single seed each."""
+    rng = np.random.default_rng(seed)
+    areas = rng.random((batch_size, 1, board_size, board_size)) < 0.55
+    seeds = np.zeros_like(areas)
+    for i in range(batch_size):
+        points = np.argwhere(areas[i, 0])
+        if len(points):
+            row, col = points[rng.integers(len(points))]
+            seeds[i, 0, row, col] = True
+    return seeds, areas
+
+
+def tune_paint_fill(board_size: int, batch_size: int = 128,
+                    candidates: Sequence[int] = (1, 2, 3, 4, 6, 8), num_repeats: int = 20,
+                    save: bool = True) -> Tuple[int, Dict[int, float]]:
+    """
+    Times `paint_fill` with every candidate unroll depth on random positions and picks the fastest.
+
+    :param board_size: board size (B).
+    :param batch_size: the batch size to time with.
+    :param candidates: the numbers of expansions per loop iteration to try.
+    :param num_repeats: the number of timed calls per candidate.
+    :param save: whether to write the chosen value to the tuning cache.
+    :return: the fastest candidate and a dictionary of the mean seconds per call of every
+    candidate.
+    """
+    from gojax import go  # pylint: disable=import-outside-toplevel
+
+    seeds, areas = jax.device_put(_new_fill_problems(board_size, batch_size, seed=0))
+    timings = {}
+    for expansions_per_iteration in candidates:
+        fill_fn = jax.jit(lambda seeds_, areas_, k=expansions_per_iteration: go.paint_fill(
+            seeds_, areas_, expansions_per_iteration=k))
+        fill_fn(seeds, areas).block_until_ready()
+        start = time.perf_counter()
+        for _ in range(num_repeats):
+            fill_fn(seeds, areas).block_until_ready()
+        timings[expansions_per_iteration] = (time.perf_counter() - start) / num_repeats
+    best = min(timings, key=timings.get)
+
+    if save:
+        cache = dict(_load_cache())
+        cache[f'{_get_backend_key()}/{board_size}'] = best
+        os.makedirs(os.path.dirname(get_cache_path()), exist_ok=True)
+        with open(get_cache_path(), 'w', encoding='utf-8') as file:
+            json.dump(cache, file, indent=2, sort_keys=True)
+        clear_cache()
+    return best, timings
@@ -0,0 +1,82 @@
+"""Tests the multi-process actor pool."""
+
+# pylint: disable=missing-function-docstring,no-self-use,duplicate-code
+
+import functools
+import time
+import unittest
+
+import chex
+import jax
+import jax.numpy as jnp
+import numpy as np
+
+import gojax
+from gojax import actor_pool
+
+_ROLLOUT_FN = functools.partial(actor_pool.random_rollout, board_size=3, batch_size=4,
+                                max_length=12)
+
+
+class ActorPoolTestCase(chex.TestCase):
+    """Tests rollouts, shared-memory exchange, backpressure and restarts."""
+
+    def test_random_rollout_plays_legal_games(self):
+        trajectories = jax.jit(_ROLLOUT_FN)(jax.random.PRNGKey(42))
+        chex.assert_shape(trajectories.actions, (4, 12))
+        states = gojax.new_states(board_size=3, batch_size=4)
+        for ply in range(12):
+            in_game = ply < trajectories.lengths
+            legal_actions = gojax.compute_legal_actions1d(states)
+            actions_1d = trajectories.actions[:, ply].astype('int32')
+            self.assertTrue(np.all(legal_actions[jnp.arange(4), actions_1d] | ~in_game))
+            states = gojax.next_states(states, actions_1d)
+
+    def test_read_trajectories_from_workers(self):
+        with actor_pool.ActorPool(_ROLLOUT_FN, num_workers=2, num_slots=2) as pool:
+            outcomes = []
+            for _ in range(4):
+                with pool.read(timeout=120) as trajectories:
+                    chex.assert_shape(trajectories.actions, (4, 12))
+                    self.assertIsInstance(trajectories.actions, np.ndarray)
+                    outcomes.append(np.copy(trajectories.outcomes))
+                    final_states = gojax.replay_states(
+                        gojax.new_trajectories(trajectories.actions, trajectories.outcomes,
+                                               trajectories.lengths),
+                        jnp.arange(4), jnp.full(4, 12), board_size=3)
+                    np.testing.assert_array_equal(gojax.compute_winning(final_states),
+                                                  trajectories.outcomes)
+            metrics = pool.metrics()
+        self.assertEqual(metrics['num_consumed'], 4)
+        self.assertGreaterEqual(metrics['num_produced'], 4)
+        self.assertGreater(metrics['num_positions'], 0)
+
+    def test_full_rings_block_workers(self):
+        with actor_pool.ActorPool(_ROLLOUT_FN, num_workers=1, num_slots=2) as pool:
+            with pool.read(timeout=120):
+                pass
+            deadline = time.perf_counter() + 120
+            while pool.metrics()['num_buffered'] < 2 and time.perf_counter() < deadline:
+                time.sleep(0.05)
+            time.sleep(0.5)
+            metrics = pool.metrics()
+        self.assertEqual(metrics['num_produced'], 3)
+        self.assertEqual(metrics['num_buffered'], 2)
+        self.assertGreater(metrics['stall_seconds'], 0)
+
+    def test_dead_workers_are_restarted(self):
+        with actor_pool.ActorPool(_ROLLOUT_FN, num_workers=1, num_slots=2) as pool:
+            with pool.read(timeout=120):
+                pass
+            # pylint: disable=protected-access
+            pool._processes[0].kill()
+            pool._processes[0].join()
+            self.assertEqual(pool.restart_dead_workers(), 1)
+            for _ in range(3):
+                with pool.read(timeout=120) as trajectories:
+                    chex.assert_shape(trajectories.actions, (4, 12))
+            self.assertEqual(pool.metrics()['num_restarts'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
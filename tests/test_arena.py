@@ -0,0 +1,70 @@
+"""Tests the policy evaluation arena."""
+
+# pylint: disable=missing-function-docstring,no-self-use,duplicate-code
+
+import unittest
+
+import chex
+import jax
+import jax.numpy as jnp
+import numpy as np
+
+import gojax
+from gojax import arena
+
+
+def _pass_policy(states, _):
+    return jnp.full(len(states), states.shape[-1] ** 2)
+
+
+def _first_legal_policy(states, _):
+    legal_actions = gojax.compute_legal_actions1d(states)
+    return jnp.argmax(legal_actions, axis=1)
+
+
+class ArenaTestCase(chex.TestCase):
+    """Tests match play and standings."""
+
+    def test_play_match_balances_colors(self):
+        results = arena.play_match((_pass_policy, arena.random_policy, _first_legal_policy),
+                                   jax.random.PRNGKey(42), board_size=3, games_per_pairing=2,
+                                   max_length=20)
+        chex.assert_shape(results.winning, (12,))
+        np.testing.assert_array_equal(np.bincount(results.black_ids), [4, 4, 4])
+        np.testing.assert_array_equal(np.bincount(results.white_ids), [4, 4, 4])
+        self.assertTrue(np.all(results.black_ids != results.white_ids))
+
+    def test_play_match_picks_the_policy_to_move(self):
+        results = arena.play_match((_pass_policy, _first_legal_policy), jax.random.PRNGKey(42),
+                                   board_size=3, games_per_pairing=1, max_length=20)
+        # The passing policy never places a stone, so the other policy always wins on area.
+        np.testing.assert_array_equal(results.black_ids, [0, 1])
+        np.testing.assert_array_equal(results.winning, [-1, 1])
+        self.assertTrue(np.all((results.lengths > 0) & (results.lengths <= 20)))
+
+    def test_compute_standings(self):
+        results = arena.MatchResults(black_ids=np.array([0, 0, 1, 1]),
+                                     white_ids=np.array([1, 1, 0, 0]),
+                                     winning=np.array([1, 0, 1, -1]), lengths=np.zeros(4))
+        standings = arena.compute_standings(results, num_policies=2)
+        np.testing.assert_array_equal(standings['num_games'], [[0, 4], [4, 0]])
+        np.testing.assert_array_equal(standings['scores'], [[0, 2.5], [1.5, 0]])
+        np.testing.assert_allclose(standings['win_rates'], [[0, 0.625], [0.375, 0]])
+        lower, upper = standings['win_rate_intervals'][0, 1]
+        self.assertLess(lower, 0.625)
+        self.assertGreater(upper, 0.625)
+        self.assertEqual(standings['elo'][0], 0)
+        self.assertLess(standings['elo'][1], 0)
+
+    def test_compute_standings_stronger_policy_has_higher_elo(self):
+        results = arena.play_match((_pass_policy, arena.random_policy), jax.random.PRNGKey(42),
+                                   board_size=3, games_per_pairing=16, max_length=30)
+        standings = arena.compute_standings(results, num_policies=2)
+        self.assertGreater(standings['win_rates'][1, 0], 0.5)
+        self.assertGreater(standings['elo'][1], 0)
+        np.testing.assert_allclose(standings['win_rates'] + standings['win_rates'].T,
+                                   1 - np.eye(2))
+
+
+if __name__ == '__main__':
+    unittest.main()
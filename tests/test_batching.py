@@ -0,0 +1,89 @@
+"""Tests dynamic request batching."""
+
+# pylint: disable=missing-function-docstring,no-self-use,duplicate-code
+
+import asyncio
+import unittest
+
+import chex
+import jax.numpy as jnp
+import numpy as np
+
+import gojax
+from gojax import batching
+
+
+class BatchingTestCase(chex.TestCase):
+    """Tests the batching service."""
+
+    def test_concurrent_next_states_are_coalesced(self):
+        states = gojax.new_states(board_size=3, batch_size=3)
+        actions = [0, 4, 9]
+
+        async def _run():
+            async with batching.BatchingService(board_size=3, max_batch_size=4,
+                                                max_latency=1.) as service:
+                results = await asyncio.gather(
+                    *[service.next_states(np.asarray(state), action) for state, action in
+                      zip(states, actions)])
+                return results, service.metrics[batching.NEXT_STATES]
+
+        results, metrics = asyncio.run(_run())
+        np.testing.assert_array_equal(np.stack(results),
+                                      gojax.next_states(states, jnp.array(actions)))
+        self.assertEqual(metrics.num_batches, 1)
+        self.assertEqual(metrics.num_requests, 3)
+        self.assertAlmostEqual(metrics.fill_ratio, 0.75)
+
+    def test_legal_actions_and_scores(self):
+        state = np.asarray(gojax.decode_states("""
+                                               B _ _
+                                               _ _ _
+                                               _ _ _
+                                               """)[0])
+
+        async def _run():
+            async with batching.BatchingService(board_size=3, max_latency=0.) as service:
+                return await asyncio.gather(service.legal_actions(state),
+                                            service.scores(state, 0.5))
+
+        legal_actions, score = asyncio.run(_run())
+        np.testing.assert_array_equal(legal_actions, [False] + [True] * 9)
+        self.assertEqual(score, 8.5)
+
+    def test_int_and_float_komis_share_one_compilation(self):
+        state = np.asarray(gojax.new_states(board_size=3)[0])
+
+        async def _run():
+            async with batching.BatchingService(board_size=3, max_latency=0.) as service:
+                scores = [await service.scores(state, 7), await service.scores(state, 0.5)]
+                # pylint: disable=protected-access
+                return scores, service._batch_fns[batching.SCORES]._cache_size()
+
+        scores, cache_size = asyncio.run(_run())
+        self.assertEqual(scores, [-7., -0.5])
+        self.assertEqual(cache_size, 1)
+
+    def test_malformed_request_fails_alone(self):
+        states = gojax.new_states(board_size=3, batch_size=2)
+
+        async def _run():
+            async with batching.BatchingService(board_size=3, max_batch_size=4,
+                                                max_latency=1.) as service:
+                results = await asyncio.gather(
+                    service.next_states(np.asarray(states[0]), 0),
+                    service.next_states(np.zeros((2, 2), dtype=bool), 0),
+                    service.next_states(np.asarray(states[1]), 4), return_exceptions=True)
+                # The worker keeps serving later requests.
+                results.append(await service.next_states(np.asarray(states[0]), 8))
+                return results
+
+        results = asyncio.run(_run())
+        self.assertIsInstance(results[1], ValueError)
+        np.testing.assert_array_equal(results[0], gojax.next_states(states[:1], jnp.array([0]))[0])
+        np.testing.assert_array_equal(results[2], gojax.next_states(states[1:], jnp.array([4]))[0])
+        np.testing.assert_array_equal(results[3], gojax.next_states(states[:1], jnp.array([8]))[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
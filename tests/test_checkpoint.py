@@ -0,0 +1,40 @@
+"""Tests delta-encoded checkpointing."""
+
+# pylint: disable=missing-function-docstring,no-self-use,duplicate-code
+
+import tempfile
+import unittest
+
+import chex
+import jax.numpy as jnp
+import numpy as np
+
+import gojax
+from gojax import checkpoint
+
+
+class CheckpointTestCase(chex.TestCase):
+    """Tests the delta checkpoint writer and restore."""
+
+    def test_restore_every_snapshot(self):
+        states = gojax.new_states(board_size=4, batch_size=3)
+        snapshots = []
+        for actions in ([0, 5, 16], [1, 16, 16], [4, 16, 2], [16, 3, 16], [16, 6, 16]):
+            states = gojax.next_states(states, jnp.array(actions))
+            snapshots.append(np.asarray(states))
+        with tempfile.TemporaryDirectory() as directory:
+            writer = checkpoint.DeltaCheckpointWriter(directory, base_interval=2, codec='zlib')
+            for snapshot in snapshots:
+                self.assertGreater(writer.write(snapshot), 0)
+            for i, snapshot in enumerate(snapshots):
+                np.testing.assert_array_equal(checkpoint.restore_checkpoint(directory, i),
+                                              snapshot)
+
+    def test_unknown_codec(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with self.assertRaises(ValueError):
+                checkpoint.DeltaCheckpointWriter(directory, codec='foo')
+
+
+if __name__ == '__main__':
+    unittest.main()
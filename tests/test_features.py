@@ -0,0 +1,69 @@
+"""Tests neural network input features."""
+
+# pylint: disable=missing-function-docstring,no-self-use,duplicate-code
+
+import unittest
+
+import chex
+import jax.numpy as jnp
+import numpy as np
+
+import gojax
+
+
+class FeaturesTestCase(chex.TestCase):
+    """Tests feature planes and the history ring buffer."""
+
+    def test_compute_liberty_counts(self):
+        states = gojax.decode_states("""
+                                     B B W
+                                     _ W _
+                                     _ _ _
+                                     """)
+        np.testing.assert_array_equal(gojax.compute_liberty_counts(states), [
+            [[[1, 1, 0], [0, 0, 0], [0, 0, 0]], [[0, 0, 1], [0, 3, 0], [0, 0, 0]]]])
+
+    def test_history_is_most_recent_first(self):
+        states = gojax.new_states(board_size=3)
+        history = gojax.new_history(states, history_size=2)
+        for action in (0, 1, 2):
+            states = gojax.next_states(states, jnp.array([action]))
+            history = gojax.update_history(history, states)
+        history_pieces = gojax.get_history_pieces(history)
+        np.testing.assert_array_equal(history_pieces[0, 0], states[0, :2])
+        np.testing.assert_array_equal(jnp.sum(history_pieces[0, 1], axis=(1, 2)), [1, 1])
+
+    def test_reset_history_clears_only_reset_games(self):
+        states = gojax.new_states(board_size=3, batch_size=2)
+        history = gojax.new_history(states, history_size=3)
+        for action in (0, 1):
+            states = gojax.next_states(states, jnp.array([action, action]))
+            history = gojax.update_history(history, states)
+        history = gojax.reset_history(history, jnp.array([False, True]))
+        history_pieces = gojax.get_history_pieces(history)
+        self.assertFalse(np.any(history_pieces[1]))
+        np.testing.assert_array_equal(history_pieces[0, 0], states[0, :2])
+        np.testing.assert_array_equal(jnp.sum(history_pieces[0, 1], axis=(1, 2)), [1, 0])
+
+    def test_make_features(self):
+        states = gojax.decode_states("""
+                                     B B W
+                                     _ W _
+                                     _ _ _
+                                     """, turn=gojax.WHITES_TURN)
+        features = gojax.make_features(states, gojax.new_history(states, history_size=1))
+        chex.assert_shape(features, (1, gojax.get_num_feature_channels(1), 3, 3))
+        chex.assert_type(features, bool)
+        # Player (white) pieces.
+        np.testing.assert_array_equal(features[0, 0], [[0, 0, 1], [0, 1, 0], [0, 0, 0]])
+        # Opponent (black) pieces in atari.
+        np.testing.assert_array_equal(features[0, 5], [[1, 1, 0], [0, 0, 0], [0, 0, 0]])
+        # White captures black at the bottom left of the black group.
+        np.testing.assert_array_equal(features[0, 8], [[0, 0, 0], [1, 0, 0], [0, 0, 0]])
+        np.testing.assert_array_equal(features[0, 9], [[0, 0, 0], [1, 0, 1], [1, 1, 1]])
+        self.assertFalse(jnp.any(features[0, 10]))
+        self.assertTrue(jnp.all(features[0, 11]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,10 +1,13 @@
 """Tests general Go functions."""
 
 # pylint: disable=missing-function-docstring,too-many-public-methods,no-self-use,duplicate-code
+import functools
 import textwrap
 import unittest
+from unittest import mock
 
 import chex
+import jax
 import jax.numpy as jnp
 import numpy as np
 from absl.testing import parameterized
@@ -13,6 +16,7 @@ from jax import nn
 
 import gojax
 import serialize
+from gojax import go
 import state_index
 
 
@@ -176,6 +180,87 @@ class GoTestCase(chex.TestCase):
             [[[[1, 1, 0, 0, 0], [0, 0, 0, 0, 0], [1, 1, 0, 0, 0], [0, 1, 1, 0, 0], [0, 0, 0, 0, 0]]]], dtype=bool)
         np.testing.assert_array_equal(gojax.paint_fill(seeds, x), expected_fill)
 
+    def test_expand_cardinally(self):
+        masks = jnp.array([[[1, 0, 0], [0, 0, 0], [0, 0, 1]]], dtype=bool)
+        np.testing.assert_array_equal(gojax.expand_cardinally(masks),
+                                      [[[1, 1, 0], [1, 0, 1], [0, 1, 1]]])
+
+    def test_neighbor_captures_match_full_board_free_groups(self):
+        board_size, batch_size = 5, 16
+        states = gojax.new_states(board_size, batch_size)
+        rng = np.random.default_rng(0)
+        for _ in range(30):
+            actions_1d = jnp.array(rng.integers(0, board_size ** 2 + 1, batch_size))
+            invalid, partial_next_states = gojax.compute_actions1d_are_invalid(states, actions_1d)
+            # Reference: fill the free groups of the whole board.
+            turns = gojax.get_turns(states)
+            passed = actions_1d == board_size ** 2
+            piece_added = states.at[jnp.arange(batch_size), turns.astype('uint8'),
+                                    actions_1d // board_size, actions_1d % board_size].set(~passed)
+            opponents_removed = state_index.at_pieces_per_turn(piece_added, ~turns).set(
+                gojax.compute_free_groups(piece_added, ~turns))
+            expected_killed = state_index.get_pieces_per_turn(
+                piece_added, ~turns) & ~state_index.get_pieces_per_turn(opponents_removed, ~turns)
+            expected_suicides = jnp.any(state_index.get_pieces_per_turn(
+                opponents_removed, turns) & ~gojax.compute_free_groups(opponents_removed, turns),
+                                        axis=(1, 2))
+            valid = ~invalid
+            np.testing.assert_array_equal(partial_next_states[valid, gojax.KILLED_CHANNEL_INDEX],
+                                          expected_killed[valid])
+            np.testing.assert_array_equal(partial_next_states[valid, :2],
+                                          opponents_removed[valid, :2])
+            self.assertFalse(jnp.any(valid & expected_suicides))
+            states = gojax.next_states(states, actions_1d)
+
+    def test_next_states_legacy_matches_next_states(self):
+        board_size, batch_size = 4, 8
+        states = gojax.new_states(board_size, batch_size)
+        board_masks = gojax.new_board_masks(jnp.array([3, 4] * 4), board_size)
+        actions = np.random.default_rng(0).integers(0, board_size ** 2 + 1, (12, batch_size))
+        for actions_1d in jnp.array(actions):
+            indicator_actions = gojax.action_1d_to_indicator(actions_1d, board_size, board_size)
+            legacy_states = gojax.next_states_legacy(states, indicator_actions, board_masks)
+            states = gojax.next_states(states, actions_1d, board_masks)
+            np.testing.assert_array_equal(legacy_states, states)
+
+    def test_paint_fill_iterations(self):
+        areas = jnp.ones((2, 1, 1, 9), dtype=bool)
+        seeds = jnp.zeros((2, 1, 1, 9), dtype=bool).at[0, 0, 0, 0].set(True).at[1].set(True)
+        fill, iterations = gojax.paint_fill(seeds, areas, return_iterations=True,
+                                             expansions_per_iteration=3)
+        np.testing.assert_array_equal(fill, areas)
+        # The first game grows 1 -> 2 -> 5 -> 8 -> 9 -> 9 and the second game is already filled.
+        np.testing.assert_array_equal(iterations, [4, 0])
+
+    @parameterized.parameters(1, 3, 8)
+    def test_paint_fill_compact_matches_default(self, batch_size):
+        rng = np.random.default_rng(batch_size)
+        areas = jnp.array(rng.random((batch_size, 1, 7, 7)) < 0.6)
+        seeds = areas & jnp.array(rng.random((batch_size, 1, 7, 7)) < 0.05)
+        fill, iterations = gojax.paint_fill(seeds, areas, return_iterations=True)
+        compact_fill, compact_iterations = jax.jit(
+            lambda seeds_, areas_: gojax.paint_fill(seeds_, areas_, return_iterations=True,
+                                                    compact=True))(seeds, areas)
+        np.testing.assert_array_equal(compact_fill, fill)
+        np.testing.assert_array_equal(compact_iterations, iterations)
+
+    def test_compute_free_groups_and_areas_iterations(self):
+        states = serialize.decode_states("""
+                                        B _ _
+                                        _ _ _
+                                        _ _ W
+                                        """)
+        free_groups, iterations = gojax.compute_free_groups(states, jnp.array([gojax.BLACKS_TURN]),
+                                                            return_iterations=True)
+        np.testing.assert_array_equal(free_groups,
+                                      gojax.compute_free_groups(states,
+                                                                jnp.array([gojax.BLACKS_TURN])))
+        self.assertEqual(iterations.shape, (1,))
+        areas, area_iterations = gojax.compute_areas(states, return_iterations=True)
+        np.testing.assert_array_equal(areas, gojax.compute_areas(states))
+        self.assertEqual(area_iterations.shape, (1, 2))
+        self.assertTrue(jnp.all(area_iterations > 0))
+
     def test_compute_free_groups_shape(self):
         state_str = """
             _ _
@@ -454,6 +539,167 @@ class GoTestCase(chex.TestCase):
                                             """)))
         np.testing.assert_array_equal(gojax.compute_winning(states), [0, 1])
 
+    def test_compute_scores_with_komi(self):
+        states = serialize.decode_states("""
+                                         B _ _
+                                         _ _ _
+                                         _ _ _
+
+                                         B _ W
+                                         _ _ _
+                                         _ _ _
+                                         """)
+        np.testing.assert_array_equal(gojax.compute_scores(states, komi=jnp.array([6.5, 0.5])),
+                                      [2.5, -0.5])
+
+    def test_compute_territories(self):
+        states = serialize.decode_states("""
+                                         _ B W
+                                         B B W
+                                         _ W _
+                                         """)
+        np.testing.assert_array_equal(gojax.compute_territories(states), [[
+            [[True, False, False], [False, False, False], [False, False, False]],
+            [[False, False, False], [False, False, False], [False, False, True]]]])
+
+    def test_compute_area_and_territory_scores(self):
+        states = serialize.decode_states("""
+                                         _ B W
+                                         B B W
+                                         _ W _
+                                         """)
+        # Black has 4 area and 1 territory, white has 4 area and 1 territory.
+        np.testing.assert_array_equal(
+            gojax.compute_area_and_territory_scores(states, prisoners=jnp.array([[0, 3]]),
+                                                    komi=0.5),
+            [[-0.5, -3.5]])
+        np.testing.assert_array_equal(
+            gojax.compute_territory_scores(states, prisoners=jnp.array([[2, 0]])), [2.])
+
+    def test_next_states_accumulates_prisoners(self):
+        states = serialize.decode_states("""
+                                         _ B W
+                                         B W _
+                                         _ _ _
+                                         """)
+        prisoners = jnp.array([[1, 2]])
+        states, prisoners = gojax.next_states(states, jnp.array([5]), prisoners=prisoners)
+        np.testing.assert_array_equal(prisoners, [[2, 2]])
+        # Invalid moves capture nothing.
+        _, prisoners = gojax.next_states(states, jnp.array([0]), prisoners=prisoners)
+        np.testing.assert_array_equal(prisoners, [[2, 2]])
+
+    def test_next_states_prisoners_match_go_state(self):
+        states = gojax.new_states(board_size=4, batch_size=8)
+        go_states = gojax.to_go_state(states)
+        prisoners = jnp.zeros((8, 2), dtype='int32')
+        rng_key = jax.random.PRNGKey(7)
+        for step in range(40):
+            actions_1d = jax.random.randint(jax.random.fold_in(rng_key, step), (8,), 0, 17)
+            states, prisoners = gojax.next_states(states, actions_1d, prisoners=prisoners)
+            go_states = gojax.next_states(go_states, actions_1d)
+        np.testing.assert_array_equal(prisoners, go_states.prisoners)
+        np.testing.assert_array_equal(gojax.compute_territory_scores(states, prisoners),
+                                      gojax.compute_territory_scores(go_states))
+
+    def test_undo_states_restores_parents(self):
+        states = gojax.new_states(board_size=4, batch_size=8)
+        prisoners = jnp.zeros((8, 2), dtype='int32')
+        history = []
+        rng_key = jax.random.PRNGKey(3)
+        step_fn = jax.jit(functools.partial(gojax.next_states, return_undo=True))
+        for step in range(40):
+            actions_1d = jax.random.randint(jax.random.fold_in(rng_key, step), (8,), 0, 17)
+            history.append((states, prisoners))
+            states, prisoners, undo_record = step_fn(states, actions_1d, prisoners=prisoners)
+            history[-1] += (undo_record,)
+        self.assertTrue(np.any(prisoners))
+        for parents, parent_prisoners, undo_record in reversed(history):
+            states, prisoners = gojax.undo_states(states, undo_record, prisoners)
+            np.testing.assert_array_equal(states, parents)
+            np.testing.assert_array_equal(prisoners, parent_prisoners)
+
+    def test_undo_record_is_compact(self):
+        states = gojax.new_states(board_size=19)
+        _, undo_record = gojax.next_states(states, jnp.array([0]), return_undo=True)
+        chex.assert_shape(undo_record.captured, (1, 46))
+        chex.assert_type(undo_record.captured, jnp.uint8)
+        np.testing.assert_array_equal(undo_record.actions_1d, [0])
+
+    def test_compute_winning_per_game_komi(self):
+        states = serialize.decode_states("""
+                                         B _ _
+                                         _ _ _
+                                         _ _ _
+
+                                         B _ _
+                                         _ _ _
+                                         _ _ _
+                                         """)
+        np.testing.assert_array_equal(gojax.compute_winning(states, komi=jnp.array([7.5, 9.])),
+                                      [1, 0])
+
+    def test_set_handicaps(self):
+        states = gojax.set_handicaps(gojax.new_states(board_size=9, batch_size=3),
+                                     handicaps=jnp.array([0, 2, 5]))
+        np.testing.assert_array_equal(jnp.sum(states[:, gojax.BLACK_CHANNEL_INDEX], axis=(1, 2)),
+                                      [0, 2, 5])
+        np.testing.assert_array_equal(gojax.get_turns(states),
+                                      [gojax.BLACKS_TURN, gojax.WHITES_TURN, gojax.WHITES_TURN])
+        self.assertTrue(states[1, gojax.BLACK_CHANNEL_INDEX, 6, 2])
+        self.assertTrue(states[1, gojax.BLACK_CHANNEL_INDEX, 2, 6])
+        self.assertTrue(states[2, gojax.BLACK_CHANNEL_INDEX, 4, 4])
+
+    def test_set_handicaps_small_boards(self):
+        for board_size in (3, 4, 5, 6):
+            states = gojax.set_handicaps(gojax.new_states(board_size, batch_size=2),
+                                         handicaps=jnp.array([2, 4]))
+            np.testing.assert_array_equal(states, gojax.new_states(board_size, batch_size=2))
+        states = gojax.set_handicaps(gojax.new_states(board_size=7, batch_size=2),
+                                     handicaps=jnp.array([4, 9]))
+        np.testing.assert_array_equal(jnp.sum(states[:, gojax.BLACK_CHANNEL_INDEX], axis=(1, 2)),
+                                      [4, 4])
+        np.testing.assert_array_equal(states[0, gojax.BLACK_CHANNEL_INDEX], [
+            [0, 0, 0, 0, 0, 0, 0], [0, 0, 0, 0, 0, 0, 0], [0, 0, 1, 0, 1, 0, 0],
+            [0, 0, 0, 0, 0, 0, 0], [0, 0, 1, 0, 1, 0, 0], [0, 0, 0, 0, 0, 0, 0],
+            [0, 0, 0, 0, 0, 0, 0]])
+
+    def test_mixed_board_sizes_capture_at_padded_edge(self):
+        states = serialize.decode_states("""
+                                         _ _ _ _ _
+                                         _ _ _ _ _
+                                         _ _ _ B _
+                                         _ _ _ W _
+                                         _ _ _ _ _
+
+                                         _ _ _ _ _
+                                         _ _ _ _ _
+                                         _ _ _ B _
+                                         _ _ _ W _
+                                         _ _ _ _ _
+                                         """)
+        board_masks = gojax.new_board_masks(jnp.array([4, 5]), max_board_size=5)
+        next_states = gojax.next_states(states, jnp.array([17, 17]), board_masks)
+        np.testing.assert_array_equal(next_states[:, gojax.WHITE_CHANNEL_INDEX, 3, 3],
+                                      [False, True])
+
+    def test_mixed_board_sizes_off_board_action_is_pass(self):
+        states = gojax.new_states(board_size=5, batch_size=2)
+        board_masks = gojax.new_board_masks(jnp.array([3, 5]), max_board_size=5)
+        actions = gojax.action_1d_to_padded(jnp.array([9, 4]), jnp.array([3, 5]), 5)
+        np.testing.assert_array_equal(actions, [25, 4])
+        next_states = gojax.next_states(states, jnp.array([4, 4]), board_masks)
+        np.testing.assert_array_equal(gojax.get_passes(next_states), [True, False])
+        np.testing.assert_array_equal(
+            gojax.padded_action_1d_to_local(jnp.array([12, 25]), jnp.array([3, 5]), 5), [8, 25])
+
+    def test_mixed_board_sizes_compute_area_sizes(self):
+        states = gojax.new_states(board_size=5, batch_size=2)
+        states = states.at[:, gojax.BLACK_CHANNEL_INDEX, 0, 0].set(True)
+        board_masks = gojax.new_board_masks(jnp.array([3, 5]), max_board_size=5)
+        np.testing.assert_array_equal(gojax.compute_area_sizes(states, board_masks),
+                                      [[9, 0], [25, 0]])
+
     def test_swap_perspectives_black_to_white(self):
         state = serialize.decode_states("""
                         B _ _
@@ -551,6 +797,59 @@ class GoTestCase(chex.TestCase):
 
         np.testing.assert_array_equal(children, jnp.expand_dims(expected_children, 0))
 
+    def test_dedupe_states(self):
+        states = gojax.new_states(board_size=3, batch_size=5)
+        states = gojax.next_states(states, jnp.array([0, 4, 0, 9, 4]))
+        unique_states, inverse_indices, counts, num_unique = jax.jit(gojax.dedupe_states)(states)
+        self.assertEqual(int(num_unique), 3)
+        np.testing.assert_array_equal(unique_states[inverse_indices], states)
+        np.testing.assert_array_equal(inverse_indices[0], inverse_indices[2])
+        np.testing.assert_array_equal(inverse_indices[1], inverse_indices[4])
+        self.assertLen(set(inverse_indices.tolist()), 3)
+        np.testing.assert_array_equal(np.sort(counts[:3]), [1, 2, 2])
+        np.testing.assert_array_equal(counts[3:], [0, 0])
+
+    def test_dedupe_states_distinguishes_flags(self):
+        states = gojax.new_states(board_size=2, batch_size=2)
+        states = states.at[1, gojax.PASS_CHANNEL_INDEX].set(True)
+        _, inverse_indices, _, num_unique = gojax.dedupe_states(states)
+        self.assertEqual(int(num_unique), 2)
+        self.assertNotEqual(int(inverse_indices[0]), int(inverse_indices[1]))
+
+    def test_dedupe_states_merges_duplicates_despite_hash_collisions(self):
+        states = gojax.new_states(board_size=3, batch_size=4)
+        states = states.at[1::2, gojax.BLACK_CHANNEL_INDEX, 0, 0].set(True)
+        with mock.patch.object(go, '_hash_words',
+                               lambda words, _: jnp.zeros(len(words), dtype='uint32')):
+            _, inverse_indices, counts, num_unique = gojax.dedupe_states(states)
+        self.assertEqual(int(num_unique), 2)
+        np.testing.assert_array_equal(inverse_indices[::2], inverse_indices[0])
+        np.testing.assert_array_equal(inverse_indices[1::2], inverse_indices[1])
+        np.testing.assert_array_equal(counts[:2], [2, 2])
+
+    def test_get_children_dedupe(self):
+        states = serialize.decode_states("""
+                                         B B _
+                                         B W W
+                                         _ W _
+                                         """)
+        states = jnp.concatenate((states, states))
+        unique_children, inverse_indices, counts, num_unique = gojax.get_children(states,
+                                                                                  dedupe=True)
+        chex.assert_shape(inverse_indices, (2, 10))
+        # The 2 valid moves and the pass child are shared by both identical games.
+        self.assertEqual(int(num_unique), 3)
+        self.assertEqual(int(np.sum(counts)), 20)
+        legal_actions = gojax.compute_legal_actions1d(states)
+        children = gojax.get_children(states)
+        for game in range(2):
+            for action in range(10):
+                child = unique_children[inverse_indices[game, action]]
+                if legal_actions[game, action]:
+                    np.testing.assert_array_equal(child, children[game, action])
+                else:
+                    np.testing.assert_array_equal(child, children[game, 9])
+
     def test_get_children_batches(self):
         """Test get_children works with two states."""
         action_size = 10
@@ -0,0 +1,125 @@
+"""Tests the GoState pytree form of Go states."""
+
+# pylint: disable=missing-function-docstring,no-self-use,duplicate-code
+
+import functools
+import unittest
+
+import chex
+import jax
+import jax.numpy as jnp
+import numpy as np
+
+import gojax
+import serialize
+
+
+def _assert_same_games(go_states, states):
+    np.testing.assert_array_equal(gojax.from_go_state(go_states)[:, :3], states[:, :3])
+    np.testing.assert_array_equal(gojax.from_go_state(go_states)[:, 4:], states[:, 4:])
+    np.testing.assert_array_equal(go_states.ko_points,
+                                  gojax.get_ko_points(states[:, gojax.KILLED_CHANNEL_INDEX]))
+
+
+class GoStateTestCase(chex.TestCase):
+    """Tests conversions and the GoState forms of the Go functions."""
+
+    def test_new_go_states_round_trip(self):
+        go_states = gojax.new_go_states(board_size=3, batch_size=2)
+        np.testing.assert_array_equal(gojax.from_go_state(go_states), gojax.new_states(3, 2))
+        chex.assert_trees_all_equal(gojax.to_go_state(gojax.from_go_state(go_states)), go_states)
+
+    def test_to_go_state_reads_flags_and_ko(self):
+        states = serialize.decode_states("""
+                                         _ B W
+                                         B W _
+                                         _ _ _
+                                         TURN=W;PASS=TRUE;KOMI=2,1
+                                         """)
+        go_states = gojax.to_go_state(states)
+        np.testing.assert_array_equal(go_states.turns, [gojax.WHITES_TURN])
+        np.testing.assert_array_equal(go_states.passes, [True])
+        np.testing.assert_array_equal(go_states.ended, [False])
+        np.testing.assert_array_equal(go_states.ko_points, [7])
+        np.testing.assert_array_equal(gojax.get_killed(go_states),
+                                      states[:, gojax.KILLED_CHANNEL_INDEX])
+
+    def test_next_states_matches_array_form(self):
+        board_size, batch_size = 4, 8
+        states = gojax.new_states(board_size, batch_size)
+        board_masks = gojax.new_board_masks(jnp.array([3, 4] * 4), board_size)
+        go_states = gojax.to_go_state(states)
+        step_fn = jax.jit(gojax.next_states)
+        rng = np.random.default_rng(0)
+        for _ in range(40):
+            actions_1d = jnp.array(rng.integers(0, board_size ** 2 + 1, batch_size))
+            states = step_fn(states, actions_1d, board_masks)
+            go_states = step_fn(go_states, actions_1d, board_masks)
+            _assert_same_games(go_states, states)
+        np.testing.assert_array_equal(gojax.compute_scores(go_states, 0.5, board_masks),
+                                      gojax.compute_scores(states, 0.5, board_masks))
+        np.testing.assert_array_equal(gojax.compute_legal_actions1d(go_states, board_masks),
+                                      gojax.compute_legal_actions1d(states, board_masks))
+
+    def test_prisoners_and_move_numbers(self):
+        states = serialize.decode_states("""
+                                         _ B _
+                                         B W _
+                                         _ B _
+                                         """)
+        go_states = gojax.next_states(gojax.to_go_state(states), jnp.array([5]))
+        np.testing.assert_array_equal(go_states.prisoners, [[1, 0]])
+        np.testing.assert_array_equal(go_states.ko_points, [4])
+        np.testing.assert_array_equal(go_states.move_numbers, [1])
+        go_states = gojax.next_states(go_states, jnp.array([9]))
+        go_states = gojax.next_states(go_states, jnp.array([9]))
+        np.testing.assert_array_equal(go_states.ended, [True])
+        go_states = gojax.next_states(go_states, jnp.array([0]))
+        np.testing.assert_array_equal(go_states.move_numbers, [3])
+
+    def test_get_children_matches_array_form(self):
+        states = gojax.next_states(gojax.new_states(3, 2), jnp.array([4, 9]))
+        children = gojax.get_children(gojax.to_go_state(states))
+        self.assertEqual(children.pieces.shape, (2, 10, 2, 3, 3))
+        array_children = gojax.get_children(states)
+        np.testing.assert_array_equal(
+            jnp.reshape(children.pieces, (20, 2, 3, 3)),
+            jnp.reshape(array_children, (20, gojax.NUM_CHANNELS, 3, 3))[:, :2])
+        np.testing.assert_array_equal(children.turns, array_children[:, :, gojax.TURN_CHANNEL_INDEX,
+                                                                     0, 0])
+
+    def test_get_children_dedupe_matches_array_form(self):
+        states = gojax.next_states(gojax.new_states(3, 2), jnp.array([4, 4]))
+        children, inverse_indices, counts, num_unique = gojax.get_children(
+            gojax.to_go_state(states), dedupe=True)
+        array_children, array_inverse_indices, array_counts, array_num_unique = \
+            gojax.get_children(states, dedupe=True)
+        self.assertEqual(int(num_unique), int(array_num_unique))
+        np.testing.assert_array_equal(counts[inverse_indices], array_counts[array_inverse_indices])
+        np.testing.assert_array_equal(children.pieces[inverse_indices],
+                                      array_children[array_inverse_indices][:, :, :2])
+
+    def test_undo_states_restores_parents(self):
+        states = gojax.new_go_states(board_size=4, batch_size=8)
+        history = []
+        rng_key = jax.random.PRNGKey(3)
+        step_fn = jax.jit(functools.partial(gojax.next_states, return_undo=True))
+        for step in range(40):
+            actions_1d = jax.random.randint(jax.random.fold_in(rng_key, step), (8,), 0, 17)
+            parents = states
+            states, undo_record = step_fn(states, actions_1d)
+            history.append((parents, undo_record))
+        self.assertTrue(np.any(states.prisoners))
+        for parents, undo_record in reversed(history):
+            states = gojax.undo_states(states, undo_record)
+            chex.assert_trees_all_equal(states, parents)
+
+    def test_swap_perspectives_swaps_prisoners(self):
+        go_states = gojax.new_go_states(3).replace(prisoners=jnp.array([[2, 5]]))
+        swapped = gojax.swap_perspectives(go_states)
+        np.testing.assert_array_equal(swapped.prisoners, [[5, 2]])
+        np.testing.assert_array_equal(swapped.turns, [gojax.WHITES_TURN])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+"""Tests the GTP engine."""
+
+# pylint: disable=missing-function-docstring,no-self-use,duplicate-code
+
+import unittest
+
+import chex
+import jax.numpy as jnp
+import numpy as np
+
+import gojax
+from gojax import gtp
+
+
+class GTPTestCase(chex.TestCase):
+    """Tests the GTP engine."""
+
+    def setUp(self):
+        self.engine = gtp.GTPEngine(board_size=5, komi=0.5)
+
+    def test_protocol_commands(self):
+        self.assertEqual(self.engine.handle('protocol_version'), '= 2\n\n')
+        self.assertEqual(self.engine.handle('3 known_command genmove'), '=3 true\n\n')
+        self.assertEqual(self.engine.handle('known_command foo'), '= false\n\n')
+        self.assertEqual(self.engine.handle('foo'), '? unknown command\n\n')
+        self.assertIsNone(self.engine.handle('# comment'))
+
+    def test_showboard(self):
+        self.engine.handle('play b A5')
+        response = self.engine.handle('1 showboard')
+        self.assertTrue(response.startswith('=1 \n'), response)
+        self.assertIn('Turn: WHITE', response)
+
+    def test_unexpected_errors_become_failures(self):
+        self.engine.execute = lambda command, args: 1 / 0
+        self.assertEqual(self.engine.handle('2 showboard'),
+                         '?2 ZeroDivisionError: division by zero\n\n')
+
+    def test_play_and_undo(self):
+        self.assertEqual(self.engine.handle('play b A5'), '=\n\n')
+        self.assertTrue(self.engine.states[0, gojax.BLACK_CHANNEL_INDEX, 0, 0])
+        self.assertEqual(self.engine.handle('play w A5'), '? illegal move\n\n')
+        self.engine.handle('play w E1')
+        self.assertTrue(self.engine.states[0, gojax.WHITE_CHANNEL_INDEX, 4, 4])
+        self.engine.handle('undo')
+        self.assertFalse(self.engine.states[0, gojax.WHITE_CHANNEL_INDEX, 4, 4])
+
+    def test_undo_out_of_turn_move_restores_turn(self):
+        self.assertEqual(self.engine.handle('play w E1'), '=\n\n')
+        self.assertEqual(self.engine.handle('undo'), '=\n\n')
+        np.testing.assert_array_equal(gojax.get_turns(self.engine.states), [gojax.BLACKS_TURN])
+        self.assertFalse(np.any(self.engine.states[0, :2]))
+
+    def test_genmove_plays_legal_move(self):
+        response = self.engine.handle('genmove b')
+        self.assertTrue(response.startswith('= '))
+        self.assertEqual(int(jnp.sum(self.engine.states[0, gojax.BLACK_CHANNEL_INDEX])), 1)
+        np.testing.assert_array_equal(gojax.get_turns(self.engine.states), [gojax.WHITES_TURN])
+
+    def test_final_score(self):
+        self.engine.handle('play b C3')
+        self.assertEqual(self.engine.handle('final_score'), '= B+24.5\n\n')
+
+    def test_playout_move_generator_captures(self):
+        engine = gtp.GTPEngine(board_size=3, komi=0.5,
+                               move_generator=gtp.make_playout_move_generator(4, 8))
+        for command in ['play b B2', 'play w A3', 'play b A2']:
+            engine.handle(command)
+        self.assertEqual(engine.handle('genmove b'), '= B3\n\n')
+
+
+if __name__ == '__main__':
+    unittest.main()
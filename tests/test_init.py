@@ -0,0 +1,26 @@
+"""Tests the lazy `gojax` namespace."""
+
+# pylint: disable=missing-function-docstring,no-self-use,duplicate-code
+
+import unittest
+
+import chex
+
+import gojax
+
+
+class InitTestCase(chex.TestCase):
+    """Tests the names the package exports."""
+
+    def test_dir_lists_lazy_constants(self):
+        self.assertIn('CARDINALLY_CONNECTED_KERNEL', dir(gojax))
+        self.assertIn('CARDINALLY_CONNECTED_KERNEL', gojax.__all__)
+
+    def test_star_import_matches_dir(self):
+        namespace = {}
+        exec('from gojax import *', namespace)  # pylint: disable=exec-used
+        self.assertEqual(set(dir(gojax)), set(namespace) - {'__builtins__'})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+"""Tests atari and ladder detection."""
+
+# pylint: disable=missing-function-docstring,no-self-use,duplicate-code
+
+import unittest
+
+import chex
+import numpy as np
+
+import gojax
+
+LADDER_STATES = """
+                _ _ _ _ _ _ _
+                _ _ B _ _ _ _
+                _ B W {} _ _ _
+                _ B _ _ _ _ _
+                _ _ _ _ _ _ _
+                _ _ _ _ _ _ _
+                _ _ _ _ _ _ _
+
+                _ _ _ _ _ _ _
+                _ _ B _ _ _ _
+                _ B W {} _ _ _
+                _ B _ _ _ _ _
+                _ _ _ _ _ _ _
+                _ _ _ _ _ W _
+                _ _ _ _ _ _ _
+                """
+
+
+class LaddersTestCase(chex.TestCase):
+    """Tests atari and ladder detection."""
+
+    def test_compute_atari(self):
+        states = gojax.decode_states("""
+                                     B W _
+                                     _ _ _
+                                     W _ _
+                                     """)
+        np.testing.assert_array_equal(gojax.compute_atari(states), [
+            [[[True, False, False], [False, False, False], [False, False, False]],
+             [[False, False, False], [False, False, False], [False, False, False]]]])
+
+    def test_compute_ladders_capture_with_and_without_breaker(self):
+        captures, escapes = gojax.compute_ladders(gojax.decode_states(LADDER_STATES.format('_', '_')))
+        expected_captures = np.zeros((2, 7, 7), dtype=bool)
+        expected_captures[0, 2, 3] = True
+        np.testing.assert_array_equal(captures, expected_captures)
+        np.testing.assert_array_equal(escapes, np.zeros((2, 7, 7), dtype=bool))
+
+    def test_compute_ladders_escape_with_and_without_breaker(self):
+        captures, escapes = gojax.compute_ladders(
+            gojax.decode_states(LADDER_STATES.format('B', 'B'), turn=gojax.WHITES_TURN))
+        expected_escapes = np.zeros((2, 7, 7), dtype=bool)
+        expected_escapes[1, 3, 2] = True
+        np.testing.assert_array_equal(escapes, expected_escapes)
+        np.testing.assert_array_equal(captures, np.zeros((2, 7, 7), dtype=bool))
+
+    def test_compute_ladders_hunter_ataris_from_the_connecting_side(self):
+        # After B 7-8 and W 8-7, ataring at 8-6 lets white connect to 6-7, but ataring at 7-7
+        # drives white along the edge into the corner.
+        states = gojax.decode_states("""
+                                     _ _ _ _ _ _ _ _ _
+                                     _ _ _ _ _ _ _ _ _
+                                     _ _ _ _ _ _ _ _ _
+                                     _ _ _ _ _ _ _ _ _
+                                     _ _ _ _ _ _ _ _ _
+                                     _ _ _ _ _ _ _ _ _
+                                     _ _ _ _ _ _ _ W _
+                                     _ _ _ _ _ _ _ _ _
+                                     _ _ _ _ _ _ _ _ W
+                                     """)
+        captures, escapes = gojax.compute_ladders(states)
+        expected_captures = np.zeros((1, 9, 9), dtype=bool)
+        expected_captures[0, 7, 8] = True
+        np.testing.assert_array_equal(captures, expected_captures)
+        np.testing.assert_array_equal(escapes, np.zeros((1, 9, 9), dtype=bool))
+
+
+if __name__ == '__main__':
+    unittest.main()
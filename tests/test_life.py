@@ -0,0 +1,65 @@
+"""Tests unconditional life analysis."""
+
+# pylint: disable=missing-function-docstring,no-self-use,duplicate-code
+
+import unittest
+
+import chex
+import numpy as np
+
+import gojax
+
+
+class LifeTestCase(chex.TestCase):
+    """Tests Benson's algorithm."""
+
+    def test_compute_pass_alive_empty_board(self):
+        states = gojax.new_states(board_size=3)
+        np.testing.assert_array_equal(gojax.compute_pass_alive(states),
+                                      np.zeros((1, 2, 3, 3), dtype=bool))
+
+    def test_compute_pass_alive_two_eyes(self):
+        states = gojax.decode_states("""
+                                     _ B _ B _
+                                     B B B B B
+                                     _ _ _ _ _
+                                     _ _ W _ _
+                                     _ _ _ _ _
+                                     """)
+        pass_alive = gojax.compute_pass_alive(states)
+        np.testing.assert_array_equal(pass_alive[0, 0], [[True, True, True, True, True],
+                                                         [True, True, True, True, True],
+                                                         [False, False, False, False, False],
+                                                         [False, False, False, False, False],
+                                                         [False, False, False, False, False]])
+        np.testing.assert_array_equal(pass_alive[0, 1], np.zeros((5, 5), dtype=bool))
+
+    def test_compute_pass_alive_one_eye(self):
+        states = gojax.decode_states("""
+                                     B _ B B B
+                                     B B B B B
+                                     _ _ _ _ _
+                                     _ _ _ _ _
+                                     _ _ _ _ _
+                                     """)
+        np.testing.assert_array_equal(gojax.compute_pass_alive(states),
+                                      np.zeros((1, 2, 5, 5), dtype=bool))
+
+    def test_compute_pass_alive_batch(self):
+        states = gojax.decode_states("""
+                                     _ W _
+                                     W W W
+                                     W W W
+
+                                     _ B _
+                                     B B B
+                                     _ W _
+                                     """)
+        pass_alive = gojax.compute_pass_alive(states)
+        np.testing.assert_array_equal(pass_alive[0, 1], np.ones((3, 3), dtype=bool))
+        np.testing.assert_array_equal(pass_alive[1, 0], np.ones((3, 3), dtype=bool))
+        np.testing.assert_array_equal(pass_alive[1, 1], np.zeros((3, 3), dtype=bool))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+"""Tests the device-resident opening book."""
+
+# pylint: disable=missing-function-docstring,no-self-use,duplicate-code
+
+import unittest
+
+import chex
+import jax
+import jax.numpy as jnp
+import numpy as np
+
+import gojax
+
+
+class OpeningBookTestCase(chex.TestCase):
+    """Tests building, sampling and resetting from opening books."""
+
+    def setUp(self):
+        self.actions_1d = jnp.array([[0, 4, 8], [2, 6, 0], [4, 9, 0]])
+        self.lengths = jnp.array([3, 2, 1])
+        self.openings = []
+        for actions, length in zip(self.actions_1d, self.lengths):
+            states = gojax.new_states(board_size=3)
+            for action_1d in actions[:length]:
+                states = gojax.next_states(states, jnp.array([action_1d]))
+            self.openings.append(states[0])
+        self.openings = jnp.stack(self.openings)
+
+    def _assert_all_openings(self, states):
+        for state in states:
+            self.assertTrue(np.any(np.all(self.openings == state, axis=(1, 2, 3))))
+
+    def test_new_opening_book_from_actions_replays_prefixes(self):
+        book = gojax.new_opening_book_from_actions(self.actions_1d, board_size=3,
+                                                   lengths=self.lengths)
+        np.testing.assert_array_equal(gojax.unpack_states(book.packed_states, board_size=3),
+                                      self.openings)
+
+    def test_sample_openings_respects_weights(self):
+        book = gojax.new_opening_book(self.openings, weights=jnp.array([0., 1., 0.]))
+        states = gojax.sample_openings(book, jax.random.PRNGKey(42), batch_size=4, board_size=3)
+        chex.assert_shape(states, (4, gojax.NUM_CHANNELS, 3, 3))
+        np.testing.assert_array_equal(states, jnp.repeat(self.openings[1:2], 4, axis=0))
+
+    def test_sample_openings_covers_book(self):
+        book = gojax.new_opening_book(self.openings)
+        states = gojax.sample_openings(book, jax.random.PRNGKey(42), batch_size=64, board_size=3)
+        self._assert_all_openings(states)
+        self.assertLen(np.unique(np.reshape(states, (64, -1)), axis=0), 3)
+
+    def test_reset_ended_states_only_resets_ended_games(self):
+        book = gojax.new_opening_book(self.openings)
+        states = gojax.new_states(board_size=3, batch_size=2)
+        states = gojax.next_states(gojax.next_states(states, jnp.array([9, 0])),
+                                   jnp.array([9, 9]))
+        np.testing.assert_array_equal(gojax.get_ended(states), [True, False])
+        reset_states = gojax.reset_ended_states(states, book, jax.random.PRNGKey(42))
+        self._assert_all_openings(reset_states[:1])
+        np.testing.assert_array_equal(reset_states[1], states[1])
+
+    def test_sample_random_state_from_openings(self):
+        book = gojax.new_opening_book(self.openings, weights=jnp.array([1., 0., 0.]))
+        initial_states = gojax.sample_openings(book, jax.random.PRNGKey(1), batch_size=1,
+                                               board_size=3)
+        states = gojax.sample_random_state_v2(3, 1, 0, jnp.zeros((1, 10)), jax.random.PRNGKey(2),
+                                              initial_states=initial_states)
+        np.testing.assert_array_equal(states, self.openings[:1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+"""Tests the profiling helpers."""
+
+# pylint: disable=missing-function-docstring,no-self-use,duplicate-code
+
+import os
+import tempfile
+import unittest
+
+import chex
+import jax
+import jax.numpy as jnp
+
+import gojax
+
+
+class ProfilingTestCase(chex.TestCase):
+    """Tests the profiler trace and cost analysis."""
+
+    def test_profile_writes_trace(self):
+        states = gojax.new_states(board_size=3, batch_size=2)
+        with tempfile.TemporaryDirectory() as log_dir:
+            with gojax.profile(log_dir):
+                gojax.next_states(states, jnp.array([0, 9])).block_until_ready()
+            trace_files = [name for _, _, names in os.walk(log_dir) for name in names]
+        self.assertNotEmpty(trace_files)
+
+    def test_cost_analysis_next_states(self):
+        report = gojax.cost_analysis(gojax.next_states,
+                                     jax.ShapeDtypeStruct((8, gojax.NUM_CHANNELS, 5, 5), bool),
+                                     jax.ShapeDtypeStruct((8,), jnp.int32))
+        self.assertGreater(report['flops'], 0)
+        self.assertGreater(report['bytes_accessed'], 0)
+        for key in ('argument_bytes', 'output_bytes', 'temp_bytes'):
+            self.assertGreaterEqual(report[key], 0)
+
+    def test_named_scopes_in_compiled_program(self):
+        states = gojax.new_states(board_size=3, batch_size=2)
+        hlo_text = jax.jit(gojax.next_states).lower(states, jnp.array([0, 9])).compile().as_text()
+        for scope in ('next_states/', 'compute_actions1d_are_invalid/', 'neighbor_captures/',
+                      'ko/', 'occupied/', 'invalid_fallback/'):
+            self.assertIn(scope, hlo_text)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+"""Tests the on-device replay buffer."""
+
+# pylint: disable=missing-function-docstring,no-self-use,duplicate-code
+
+import unittest
+
+import chex
+import jax
+import jax.numpy as jnp
+import numpy as np
+
+import gojax
+from gojax import replay_buffer
+
+
+class ReplayBufferTestCase(chex.TestCase):
+    """Tests inserting, sampling and reprioritizing positions."""
+
+    def setUp(self):
+        states = gojax.new_states(board_size=3, batch_size=5)
+        self.states = gojax.next_states(states, jnp.arange(5))
+        self.actions_1d = jnp.arange(5) + 1
+        self.policies = jax.nn.one_hot(self.actions_1d, 10)
+        self.outcomes = jnp.array([1., -1., 0., 1., -1.])
+
+    def test_add_and_sample_round_trip(self):
+        buffer = replay_buffer.new_replay_buffer(capacity=8, board_size=3)
+        buffer = replay_buffer.add(buffer, self.states, self.actions_1d, self.policies,
+                                   self.outcomes)
+        self.assertEqual(int(buffer.size), 5)
+        samples = replay_buffer.sample(buffer, jax.random.PRNGKey(42), batch_size=16)
+        indices = np.asarray(samples.indices)
+        self.assertTrue(np.all(indices < 5))
+        np.testing.assert_array_equal(samples.states, self.states[indices])
+        np.testing.assert_array_equal(samples.actions, self.actions_1d[indices])
+        np.testing.assert_array_equal(samples.policies, self.policies[indices])
+        np.testing.assert_array_equal(samples.outcomes, self.outcomes[indices])
+        np.testing.assert_allclose(samples.probabilities, np.full(16, 0.2))
+
+    def test_add_wraps_around(self):
+        buffer = replay_buffer.new_replay_buffer(capacity=6, board_size=3)
+        for _ in range(2):
+            buffer = replay_buffer.add(buffer, self.states, self.actions_1d, self.policies,
+                                       self.outcomes)
+        self.assertEqual(int(buffer.size), 6)
+        self.assertEqual(int(buffer.next_index), 4)
+        np.testing.assert_array_equal(buffer.actions, [2, 3, 4, 5, 5, 1])
+        self.assertAlmostEqual(float(buffer.priority_tree[1]), 6.)
+
+    def test_sample_follows_priorities(self):
+        buffer = replay_buffer.new_replay_buffer(capacity=5, board_size=3)
+        buffer = replay_buffer.add(buffer, self.states, self.actions_1d, self.policies,
+                                   self.outcomes, priorities=jnp.array([1., 0., 3., 0., 0.]))
+        samples = replay_buffer.sample(buffer, jax.random.PRNGKey(42), batch_size=400)
+        counts = np.bincount(samples.indices, minlength=5)
+        np.testing.assert_array_equal(counts, [100, 0, 300, 0, 0])
+        np.testing.assert_allclose(samples.probabilities,
+                                   np.where(samples.indices == 0, 0.25, 0.75))
+
+    def test_sample_never_picks_zero_priorities(self):
+        buffer = replay_buffer.new_replay_buffer(capacity=8, board_size=3)
+        buffer = replay_buffer.add(buffer, self.states, self.actions_1d, self.policies,
+                                   self.outcomes,
+                                   priorities=jnp.array([0.1, 1e-7, 0.7, 0.3, 0.]))
+        for seed in range(20):
+            samples = replay_buffer.sample(buffer, jax.random.PRNGKey(seed), batch_size=64)
+            self.assertTrue(np.all(samples.probabilities > 0))
+            self.assertTrue(np.all(samples.indices < 4))
+
+    def test_update_priorities(self):
+        buffer = replay_buffer.new_replay_buffer(capacity=5, board_size=3)
+        buffer = replay_buffer.add(buffer, self.states, self.actions_1d, self.policies,
+                                   self.outcomes)
+        buffer = replay_buffer.update_priorities(buffer, jnp.array([0, 1, 2, 3]),
+                                                 jnp.array([0., 0., 0., 0.]))
+        samples = replay_buffer.sample(buffer, jax.random.PRNGKey(42), batch_size=8)
+        np.testing.assert_array_equal(samples.indices, np.full(8, 4))
+        self.assertAlmostEqual(float(buffer.priority_tree[1]), 1.)
+        buffer = replay_buffer.update_priorities(buffer, jnp.array([1]), jnp.array([5.]))
+        self.assertAlmostEqual(float(buffer.max_priority), 5.)
+        self.assertAlmostEqual(float(buffer.priority_tree[1]), 6.)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -62,6 +62,96 @@ class RNGTestCase(chex.TestCase):
                                                                 _ W B
                                                                 """))
 
+    def test_sample_legal_actions1d_never_samples_suicide(self):
+        states = serialize.decode_states("""
+                                         _ B _
+                                         B B B
+                                         B B B
+                                         TURN=W
+                                         """)
+        logits = jnp.zeros((1, 10)).at[0, 0].set(100).at[0, 2].set(100)
+        sampled_actions = rng.sample_legal_actions1d(states, logits, jax.random.PRNGKey(42))
+        np.testing.assert_array_equal(sampled_actions, [9])
+
+    def test_sample_legal_actions1d_never_samples_ko(self):
+        states = serialize.decode_states("""
+                                         _ B W _
+                                         B W _ W
+                                         _ B W _
+                                         _ _ _ _
+                                         """)
+        states = gojax.next_states(states, jnp.array([6]))
+        logits = jnp.zeros((1, 17)).at[0, 5].set(100)
+        sampled_actions = rng.sample_legal_actions1d(states, logits, jax.random.PRNGKey(42))
+        self.assertNotEqual(int(sampled_actions[0]), 5)
+
+    def test_sample_legal_actions1d_zero_temperature_is_greedy(self):
+        states = gojax.new_states(board_size=3, batch_size=2)
+        logits = jnp.array([[0, 1, 2, 0, 0, 0, 0, 0, 0, 0], [0] * 9 + [3]], dtype=float)
+        sampled_actions = rng.sample_legal_actions1d(states, logits, jax.random.PRNGKey(42),
+                                                     temperatures=jnp.array([0., 0.]))
+        np.testing.assert_array_equal(sampled_actions, [2, 9])
+
+    def test_sample_legal_actions1d_per_game_temperature(self):
+        states = gojax.new_states(board_size=3, batch_size=2)
+        logits = jnp.zeros((2, 10)).at[:, 4].set(2)
+        sampled_actions = jax.vmap(
+            lambda key: rng.sample_legal_actions1d(states, logits, key,
+                                                   temperatures=jnp.array([0.1, 100.])))(
+            jax.random.split(jax.random.PRNGKey(42), 200))
+        self.assertGreater(np.mean(sampled_actions[:, 0] == 4), 0.99)
+        self.assertLess(np.mean(sampled_actions[:, 1] == 4), 0.3)
+
+    def test_sample_legal_actions1d_dirichlet_noise_stays_legal(self):
+        states = serialize.decode_states("""
+                                         _ B _
+                                         B B B
+                                         B B B
+                                         TURN=W
+                                         """)
+        sampled_actions = jax.jit(
+            lambda key: rng.sample_legal_actions1d(states, jnp.zeros((1, 10)), key,
+                                                   dirichlet_alpha=0.3, dirichlet_fraction=1.))(
+            jax.random.PRNGKey(42))
+        np.testing.assert_array_equal(sampled_actions, [9])
+
+    def test_sample_gumbel_top_k_actions1d_distinct_and_legal(self):
+        states = gojax.next_states(gojax.new_states(board_size=3, batch_size=8),
+                                   jnp.arange(8))
+        actions_1d, valid = jax.jit(rng.sample_gumbel_top_k_actions1d, static_argnums=3)(
+            states, jnp.zeros((8, 10)), jax.random.PRNGKey(42), 5)
+        self.assertEqual(actions_1d.shape, (8, 5))
+        self.assertTrue(np.all(valid))
+        legal_actions = np.asarray(gojax.compute_legal_actions1d(states))
+        for game in range(8):
+            self.assertLen(set(actions_1d[game].tolist()), 5)
+            self.assertTrue(np.all(legal_actions[game, actions_1d[game]]))
+
+    def test_sample_gumbel_top_k_actions1d_marks_missing_candidates(self):
+        states = serialize.decode_states("""
+                                         _ B _
+                                         B B B
+                                         B B B
+                                         TURN=W
+                                         """)
+        actions_1d, valid = rng.sample_gumbel_top_k_actions1d(states, jnp.zeros((1, 10)),
+                                                              jax.random.PRNGKey(42), k=3)
+        self.assertEqual(int(actions_1d[0, 0]), 9)
+        np.testing.assert_array_equal(valid, [[True, False, False]])
+
+    def test_sample_gumbel_top_k_actions1d_zero_temperature_is_greedy(self):
+        states = gojax.new_states(board_size=3)
+        logits = jnp.arange(10, dtype=float)[None]
+        actions_1d, _ = rng.sample_gumbel_top_k_actions1d(states, logits, jax.random.PRNGKey(42),
+                                                          k=3, temperatures=0.)
+        np.testing.assert_array_equal(actions_1d, [[9, 8, 7]])
+
+    def test_sample_next_states_v2_with_legal_sampler(self):
+        states = rng.sample_next_states_v2(0, gojax.new_states(board_size=3), jnp.zeros((1, 10)),
+                                           jax.random.PRNGKey(42),
+                                           actions1d_sampling_fn=rng.sample_legal_actions1d)
+        self.assertEqual(states.shape, (1, gojax.NUM_CHANNELS, 3, 3))
+
 
 if __name__ == '__main__':
     unittest.main()
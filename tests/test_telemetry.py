@@ -0,0 +1,47 @@
+"""Tests the flood fill telemetry."""
+
+# pylint: disable=missing-function-docstring,no-self-use,duplicate-code
+
+import unittest
+
+import chex
+import jax.numpy as jnp
+import numpy as np
+
+import gojax
+from gojax import telemetry
+
+
+class TelemetryTestCase(chex.TestCase):
+    """Tests the fill iteration histograms."""
+
+    def test_record_histograms_per_board_size(self):
+        fill_telemetry = telemetry.FillTelemetry()
+        fill_telemetry.record(telemetry.FREE_GROUPS, [5, 5, 9], [1, 3, 2])
+        fill_telemetry.record(telemetry.FREE_GROUPS, 5, [3])
+        np.testing.assert_array_equal(fill_telemetry.histogram(telemetry.FREE_GROUPS, 5),
+                                      [0, 1, 0, 2])
+        np.testing.assert_array_equal(fill_telemetry.histogram(telemetry.FREE_GROUPS, 9),
+                                      [0, 0, 1])
+        summary = fill_telemetry.summary()[(telemetry.FREE_GROUPS, 5)]
+        self.assertEqual(summary['count'], 3)
+        self.assertAlmostEqual(summary['mean'], 7 / 3)
+        self.assertEqual(summary['p50'], 3)
+        self.assertEqual(summary['max'], 3)
+
+    def test_record_states_mixed_board_sizes(self):
+        board_masks = gojax.new_board_masks(jnp.array([3, 5]), 5)
+        states = gojax.next_states(gojax.new_states(5, 2), jnp.array([0, 0]), board_masks)
+        fill_telemetry = telemetry.FillTelemetry()
+        fill_telemetry.record_states(states, board_masks)
+        self.assertEqual(set(fill_telemetry.summary()), {
+            (telemetry.FREE_GROUPS, 3), (telemetry.FREE_GROUPS, 5), (telemetry.AREAS, 3),
+            (telemetry.AREAS, 5)})
+        # Two fills per game.
+        self.assertEqual(np.sum(fill_telemetry.histogram(telemetry.AREAS, 3)), 2)
+        fill_telemetry.reset()
+        self.assertEmpty(fill_telemetry.summary())
+
+
+if __name__ == '__main__':
+    unittest.main()
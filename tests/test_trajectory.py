@@ -0,0 +1,66 @@
+"""Tests action-only trajectory storage and replay."""
+
+# pylint: disable=missing-function-docstring,no-self-use,duplicate-code
+
+import unittest
+
+import chex
+import jax
+import jax.numpy as jnp
+import numpy as np
+
+import gojax
+
+
+class TrajectoryTestCase(chex.TestCase):
+    """Tests trajectory replay."""
+
+    def setUp(self):
+        board_size = 3
+        states = gojax.new_states(board_size, batch_size=2)
+        self.all_states = [states]
+        actions = []
+        rng_key = jax.random.PRNGKey(1)
+        for step in range(7):
+            action_1d = gojax.sample_non_occupied_actions1d(
+                states, jnp.zeros((2, 10)), jax.random.fold_in(rng_key, step))
+            states = gojax.next_states(states, action_1d)
+            actions.append(action_1d)
+            self.all_states.append(states)
+        self.trajectories = gojax.new_trajectories(jnp.stack(actions, axis=1),
+                                                   gojax.compute_winning(states),
+                                                   lengths=jnp.array([7, 5]))
+
+    def test_pack_states_round_trip(self):
+        packed_states = gojax.pack_states(self.all_states[-1])
+        chex.assert_type(packed_states, jnp.uint8)
+        np.testing.assert_array_equal(gojax.unpack_states(packed_states, board_size=3),
+                                      self.all_states[-1])
+
+    def test_new_trajectories_dtypes(self):
+        chex.assert_type(self.trajectories.actions, jnp.int16)
+        chex.assert_type(self.trajectories.outcomes, jnp.int8)
+
+    def test_replay_states(self):
+        states = gojax.replay_states(self.trajectories, jnp.array([0, 1, 0, 1]),
+                                     jnp.array([0, 3, 7, 7]), board_size=3)
+        np.testing.assert_array_equal(states[0], self.all_states[0][0])
+        np.testing.assert_array_equal(states[1], self.all_states[3][1])
+        np.testing.assert_array_equal(states[2], self.all_states[7][0])
+        # Plies past the length of the game yield its final state.
+        np.testing.assert_array_equal(states[3], self.all_states[5][1])
+
+    def test_replay_states_from_checkpoints(self):
+        checkpoints = gojax.compute_checkpoints(self.trajectories, board_size=3,
+                                                checkpoint_interval=2)
+        chex.assert_shape(checkpoints, (2, 5, None))
+        trajectory_ids = jnp.array([0, 0, 1, 1])
+        plies = jnp.array([6, 7, 4, 6])
+        np.testing.assert_array_equal(
+            gojax.replay_states(self.trajectories, trajectory_ids, plies, board_size=3,
+                                checkpoints=checkpoints, checkpoint_interval=2),
+            gojax.replay_states(self.trajectories, trajectory_ids, plies, board_size=3))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+"""Tests the paint fill auto-tuning."""
+
+# pylint: disable=missing-function-docstring,no-self-use,duplicate-code
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import chex
+import numpy as np
+from absl.testing import parameterized
+
+import gojax
+from gojax import tuning
+
+
+class TuningTestCase(chex.TestCase):
+    """Tests the unroll depth of paint fill and its tuning cache."""
+
+    def setUp(self):
+        super().setUp()
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.enter_context(mock.patch.dict(os.environ, {'GOJAX_CACHE_DIR': self.cache_dir.name}))
+        tuning.clear_cache()
+
+    def tearDown(self):
+        tuning.clear_cache()
+        self.cache_dir.cleanup()
+        super().tearDown()
+
+    @parameterized.parameters(1, 2, 3, 5, 8)
+    def test_paint_fill_result_is_independent_of_unroll_depth(self, expansions_per_iteration):
+        # pylint: disable=protected-access
+        seeds, areas = tuning._new_fill_problems(board_size=7, batch_size=16, seed=1)
+        np.testing.assert_array_equal(
+            gojax.paint_fill(seeds, areas, expansions_per_iteration=expansions_per_iteration),
+            gojax.paint_fill(seeds, areas, expansions_per_iteration=1))
+
+    def test_default_without_cache(self):
+        self.assertEqual(tuning.get_expansions_per_iteration(9),
+                         tuning.DEFAULT_EXPANSIONS_PER_ITERATION)
+
+    def test_tune_writes_cache(self):
+        best, timings = tuning.tune_paint_fill(5, batch_size=4, candidates=(1, 2), num_repeats=2)
+        self.assertIn(best, (1, 2))
+        self.assertEqual(set(timings), {1, 2})
+        self.assertTrue(os.path.exists(tuning.get_cache_path()))
+        tuning.clear_cache()
+        self.assertEqual(tuning.get_expansions_per_iteration(5), best)
+        self.assertEqual(tuning.get_expansions_per_iteration(9),
+                         tuning.DEFAULT_EXPANSIONS_PER_ITERATION)
+        tuning.clear_cache(delete_file=True)
+        self.assertFalse(os.path.exists(tuning.get_cache_path()))
+
+
+if __name__ == '__main__':
+    unittest.main()